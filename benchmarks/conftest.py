@@ -0,0 +1,193 @@
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Callable, TypedDict
+
+import pytest
+from vtkmodules.vtkImagingCore import vtkRTAnalyticSource
+
+from src.gradient import (
+    compute_gradient_magnitude,
+    get_gradient_cache_filename,
+    write_vti,
+)
+
+BENCH_SIZES_DEFAULT = [64, 128]
+BENCH_ROUNDS_DEFAULT = 5
+
+
+class BenchmarkStats(TypedDict):
+    min: float
+    max: float
+    mean: float
+    median: float
+    stddev: float
+    rounds: int
+
+
+class BenchmarkResult(TypedDict):
+    name: str
+    group: str
+    size: int
+    stats: BenchmarkStats
+
+
+class SyntheticVolume(TypedDict):
+    size: int
+    filename: str
+    gradient_filename: str
+
+
+def pytest_addoption(parser: pytest.Parser):
+    group = parser.getgroup("bench", "pipeline benchmarks")
+    group.addoption(
+        "--bench-sizes",
+        type=int,
+        nargs="+",
+        default=BENCH_SIZES_DEFAULT,
+        help="Set the edge lengths in voxels of the synthetic volumes",
+    )
+    group.addoption(
+        "--bench-rounds",
+        type=int,
+        default=BENCH_ROUNDS_DEFAULT,
+        help="Set the number of times each stage is timed",
+    )
+    group.addoption("--bench-json", help="Save the results to a JSON file")
+    group.addoption(
+        "--bench-compare",
+        help="Compare the results with the ones saved by an earlier run",
+    )
+
+
+def pytest_generate_tests(metafunc: pytest.Metafunc):
+    if "volume_size" in metafunc.fixturenames:
+        sizes: list[int] = metafunc.config.getoption("--bench-sizes")
+        metafunc.parametrize("volume_size", sizes, scope="session")
+
+
+def has_display():
+    return sys.platform != "linux" or any(
+        os.environ.get(name) for name in ("DISPLAY", "WAYLAND_DISPLAY")
+    )
+
+
+class Bench:
+    """Time the stages of a pipeline, in the spirit of the `benchmark` fixture
+    of pytest-benchmark."""
+
+    def __init__(self, results: list[BenchmarkResult], rounds: int):
+        self.results = results
+        self.rounds = rounds
+        self.group = ""
+        self.size = 0
+
+    def __call__(self, name: str, stage: Callable[[int], object], rounds: int = 0):
+        """Call `stage` with the round index `rounds` times and record the wall
+        time of each call."""
+        timings: list[float] = []
+        for i in range(rounds or self.rounds):
+            start = time.perf_counter()
+            stage(i)
+            timings.append(time.perf_counter() - start)
+
+        self.results.append(
+            BenchmarkResult(
+                name=name,
+                group=self.group,
+                size=self.size,
+                stats=BenchmarkStats(
+                    min=min(timings),
+                    max=max(timings),
+                    mean=statistics.mean(timings),
+                    median=statistics.median(timings),
+                    stddev=statistics.stdev(timings) if len(timings) > 1 else 0.0,
+                    rounds=len(timings),
+                ),
+            )
+        )
+
+
+def get_result_key(result: BenchmarkResult):
+    return (result["group"], result["size"], result["name"])
+
+
+_results: list[BenchmarkResult] = []
+
+
+@pytest.fixture
+def bench(request: pytest.FixtureRequest):
+    return Bench(_results, request.config.getoption("--bench-rounds"))
+
+
+@pytest.fixture(scope="session")
+def volume(tmp_path_factory: pytest.TempPathFactory, volume_size: int):
+    """Write a synthetic scalar volume with its gradient magnitude cached next
+    to it, as `read_gradient` expects."""
+    source = vtkRTAnalyticSource()
+    source.SetWholeExtent(0, volume_size - 1, 0, volume_size - 1, 0, volume_size - 1)
+    source.Update()
+
+    filename = str(tmp_path_factory.mktemp("volumes") / f"rt{volume_size}.vti")
+    write_vti(source.GetOutput(), filename)
+    gradient_filename = get_gradient_cache_filename(filename)
+    write_vti(compute_gradient_magnitude(source.GetOutput()), gradient_filename)
+
+    return SyntheticVolume(
+        size=volume_size, filename=filename, gradient_filename=gradient_filename
+    )
+
+
+def pytest_sessionfinish(session: pytest.Session):
+    filename: str | None = session.config.getoption("--bench-json")
+    if filename is None or not _results:
+        return
+
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "datetime": datetime.now().isoformat(),
+                "machine": {
+                    "platform": platform.platform(),
+                    "processor": platform.processor(),
+                    "cpu_count": os.cpu_count(),
+                    "python": platform.python_version(),
+                },
+                "benchmarks": _results,
+            },
+            f,
+            indent=2,
+        )
+
+
+def pytest_terminal_summary(terminalreporter, config: pytest.Config):
+    if not _results:
+        return
+
+    baseline: dict[tuple[str, int, str], BenchmarkResult] = {}
+    compare_filename: str | None = config.getoption("--bench-compare")
+    if compare_filename is not None:
+        with open(compare_filename, "r", encoding="utf-8") as f:
+            baseline = {
+                get_result_key(result): result for result in json.load(f)["benchmarks"]
+            }
+
+    terminalreporter.section("pipeline benchmarks")
+    terminalreporter.write_line(
+        f"{'group':<12}{'size':>6}  {'stage':<24}{'mean (ms)':>12}{'stddev':>10}"
+        + (f"{'vs base':>10}" if baseline else "")
+    )
+    for result in _results:
+        stats = result["stats"]
+        line = (
+            f"{result['group']:<12}{result['size']:>6}  {result['name']:<24}"
+            f"{stats['mean'] * 1000:>12.2f}{stats['stddev'] * 1000:>10.2f}"
+        )
+        base = baseline.get(get_result_key(result))
+        if base is not None:
+            line += f"{stats['mean'] / base['stats']['mean']:>9.2f}x"
+        terminalreporter.write_line(line)
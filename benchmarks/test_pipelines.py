@@ -0,0 +1,255 @@
+import os
+from typing import Any, Callable
+
+import pytest
+from conftest import Bench, SyntheticVolume, has_display
+from vtkmodules.vtkFiltersCore import vtkContourFilter
+from vtkmodules.vtkRenderingCore import (
+    vtkActor,
+    vtkMapper,
+    vtkRenderer,
+    vtkRenderWindow,
+)
+
+import iso2dtf
+import isocomplete
+import isogm
+import isosurface
+from src.contour import CONTOUR_CONFIG_DEFAULT, ContourFilter
+from src.contour_cache import ContourCache
+from src.data_context import build_data_context
+from src.flying_edges import FlyingEdgesContourFilter
+from src.gradient import read_volumes
+from src.read_vti import read_vti
+from src.span_space import BRICK_SIZE_DEFAULT, SpanSpaceContourFilter
+from src.vtk_side_effects import import_for_rendering_core
+from src.vtk_widget import build_default_vtk_renderer
+
+
+def get_steps(value_range: tuple[float, float], count: int):
+    """Return `count` distinct values strictly inside the range, so no stage is
+    measured against a result it already computed."""
+    low, high = value_range
+    return [low + (high - low) * (i + 1) / (count + 1) for i in range(count)]
+
+
+def get_clips(size: int, count: int):
+    return [(clip, clip, clip) for clip in get_steps((size / 2, size - 1), count)]
+
+
+def update_mappers(mappers: list[vtkMapper]):
+    for mapper in mappers:
+        mapper.GetInputAlgorithm().Update()
+
+
+def load(volume: SyntheticVolume):
+    return read_volumes(volume["filename"], None)
+
+
+def bench_pipeline(bench: Bench, build: Callable[[], tuple[Any, ...]]):
+    """Time building the pipeline of an application up to its first extraction,
+    and return what the build returned, starting with the renderer and the
+    mapper."""
+    built: list[tuple[Any, ...]] = []
+
+    def build_and_extract(_: int):
+        built.append(build())
+        update_mappers([built[-1][1]])
+
+    bench("first extraction", build_and_extract)
+    return built[-1]
+
+
+def bench_change(
+    bench: Bench, name: str, mapper: vtkMapper, change: Callable[[int], object]
+):
+    """Time applying a change and updating the mapper input with it, as the
+    pipeline updater does before rendering."""
+
+    def change_and_update(i: int):
+        change(i)
+        update_mappers([mapper])
+
+    bench(name, change_and_update)
+
+
+def bench_render(bench: Bench, renderer: vtkRenderer):
+    if not has_display():
+        pytest.skip("Rendering requires a display.")
+    import_for_rendering_core()
+    window = vtkRenderWindow()
+    window.SetOffScreenRendering(True)
+    window.AddRenderer(renderer)
+    # The first frame compiles shaders and uploads the geometry.
+    window.Render()
+    bench("render", lambda _: window.Render())
+
+
+# pylint: disable=redefined-outer-name too-many-locals
+def test_isosurface(bench: Bench, volume: SyntheticVolume):
+    bench.group, bench.size = "isosurface", volume["size"]
+    bench("load", lambda _: read_vti(volume["filename"]))
+
+    reader = read_vti(volume["filename"])
+    renderer, mapper, _, set_isovalue, set_clips, _ = bench_pipeline(
+        bench,
+        lambda: isosurface.build_pipeline(
+            reader,
+            None,
+            [volume["size"]] * 3,
+            CONTOUR_CONFIG_DEFAULT,
+            ContourCache(0),
+            None,
+            None,
+        ),
+    )
+
+    isovalues = get_steps(reader.GetOutput().GetScalarRange(), bench.rounds)
+    bench_change(
+        bench, "isovalue change", mapper, lambda i: set_isovalue(int(isovalues[i]))
+    )
+    clips = get_clips(volume["size"], bench.rounds)
+    bench_change(bench, "clip change", mapper, lambda i: set_clips(*clips[i]))
+    bench_render(bench, renderer)
+
+
+def test_isogm(bench: Bench, volume: SyntheticVolume):
+    bench.group, bench.size = "isogm", volume["size"]
+    bench("load", lambda _: load(volume))
+
+    isovalue_reader, gradient_reader = load(volume)
+    isovalues = get_steps(isovalue_reader.GetOutput().GetScalarRange(), 3)
+    renderer, mapper, _, set_clips = bench_pipeline(
+        bench,
+        lambda: isogm.build_pipeline(
+            isovalue_reader,
+            gradient_reader,
+            [int(isovalue) for isovalue in isovalues],
+            None,
+            [volume["size"]] * 3,
+            CONTOUR_CONFIG_DEFAULT,
+            ContourCache(0),
+        ),
+    )
+
+    clips = get_clips(volume["size"], bench.rounds)
+    bench_change(bench, "clip change", mapper, lambda i: set_clips(*clips[i]))
+    bench_render(bench, renderer)
+
+
+def test_iso2dtf(bench: Bench, volume: SyntheticVolume):
+    bench.group, bench.size = "iso2dtf", volume["size"]
+    bench("load", lambda _: load(volume))
+
+    isovalue_reader, gradient_reader = load(volume)
+    renderer, mapper, _, set_clips, gradient_range_filter = bench_pipeline(
+        bench,
+        lambda: iso2dtf.build_pipeline(
+            isovalue_reader,
+            gradient_reader,
+            None,
+            [volume["size"]] * 3,
+            CONTOUR_CONFIG_DEFAULT,
+            ContourCache(0),
+        ),
+    )
+
+    clips = get_clips(volume["size"], bench.rounds)
+    bench_change(bench, "clip change", mapper, lambda i: set_clips(*clips[i]))
+    gradient_min, gradient_max = gradient_reader.GetOutput().GetScalarRange()
+    gradmins = get_steps(
+        (gradient_min, (gradient_min + gradient_max) / 2), bench.rounds
+    )
+    bench_change(
+        bench,
+        "gradient range change",
+        mapper,
+        lambda i: gradient_range_filter.SetMinimum(int(gradmins[i])),
+    )
+    bench_render(bench, renderer)
+
+
+def test_contour_filters(bench: Bench, volume: SyntheticVolume):
+    bench.group, bench.size = "contour", volume["size"]
+    reader = read_vti(volume["filename"])
+    isovalues = get_steps(reader.GetOutput().GetScalarRange(), bench.rounds)
+
+    def bench_extraction(name: str, contour_filter: ContourFilter | vtkContourFilter):
+        contour_filter.SetInputConnection(reader.GetOutputPort())
+
+        def extract(i: int):
+            contour_filter.SetValue(0, isovalues[i])
+            contour_filter.Update()
+
+        bench(name, extract)
+
+    bench_extraction("vtkContourFilter", vtkContourFilter())
+    bench_extraction("flying edges", FlyingEdgesContourFilter())
+    bench_extraction(
+        f"bricks of {BRICK_SIZE_DEFAULT}",
+        SpanSpaceContourFilter(BRICK_SIZE_DEFAULT, workers=1),
+    )
+
+
+def test_contour_workers(bench: Bench, volume: SyntheticVolume):
+    bench.group, bench.size = "contour", volume["size"]
+    reader = read_vti(volume["filename"])
+    isovalues = get_steps(reader.GetOutput().GetScalarRange(), bench.rounds)
+
+    def bench_extraction(workers: int):
+        contour_filter = SpanSpaceContourFilter(workers=workers)
+        contour_filter.SetInputConnection(reader.GetOutputPort())
+
+        def extract(i: int):
+            contour_filter.SetValue(0, isovalues[i])
+            contour_filter.Update()
+
+        bench(f"extraction x{workers}", extract)
+
+    for workers in sorted({1, os.cpu_count() or 1}):
+        bench_extraction(workers)
+
+
+def test_isocomplete_actor(bench: Bench, volume: SyntheticVolume):
+    bench.group, bench.size = "isocomplete", volume["size"]
+    bench("load", lambda _: load(volume))
+
+    context, _ = build_data_context(*load(volume), CONTOUR_CONFIG_DEFAULT, None)
+    gradient_range = context["gradient_range"]
+    params = isocomplete.IsovalueParams(
+        value=int(sum(context["scalar_range"]) / 2),
+        gradient_range=gradient_range,
+        color=(1.0, 1.0, 1.0),
+        opacity=1.0,
+    )
+    built: list[tuple[vtkActor, Callable[[float, float, float], None]]] = []
+
+    def build_and_extract(_: int):
+        built.append(
+            isocomplete.build_isosurface_actor(
+                params,
+                context,
+                CONTOUR_CONFIG_DEFAULT,
+                ContourCache(0),
+            )
+        )
+        update_mappers([built[-1][0].GetMapper()])
+
+    bench("first extraction", build_and_extract)
+    actor, set_clips = built[-1]
+    mapper: vtkMapper = actor.GetMapper()
+
+    clips = get_clips(volume["size"], bench.rounds)
+    bench_change(bench, "clip change", mapper, lambda i: set_clips(*clips[i]))
+
+    # The mapper renders the gradient range through the compact surface filter.
+    gradient_range_filter = mapper.GetInputAlgorithm().GetInputAlgorithm()
+    gradmins = get_steps((gradient_range[0], sum(gradient_range) / 2), bench.rounds)
+    bench_change(
+        bench,
+        "gradient range change",
+        mapper,
+        lambda i: gradient_range_filter.SetMinimum(gradmins[i]),
+    )
+
+    bench_render(bench, build_default_vtk_renderer([actor], []))
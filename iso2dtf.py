@@ -10,19 +10,41 @@ from PySide6.QtWidgets import (
     QSlider,
     QWidget,
 )
-from vtkmodules.vtkFiltersCore import vtkClipPolyData, vtkContourFilter, vtkProbeFilter
-from vtkmodules.vtkIOXML import vtkXMLImageDataReader
 from vtkmodules.vtkRenderingAnnotation import vtkScalarBarActor
-from vtkmodules.vtkRenderingCore import vtkActor, vtkDataSetMapper
+from vtkmodules.vtkRenderingCore import vtkActor
 
 from src.clipping import (
     add_axes_clip_args,
     build_axes_clip_sliders,
-    get_axes_clip_filter,
+    get_axes_clip_filters,
+)
+from src.color_map import get_inferno16_color_map, set_mapper_lookup_table
+from src.contour import ContourConfig, add_contour_args, get_contour_config
+from src.contour_cache import (
+    ContourCache,
+    add_contour_cache_args,
+    build_cached_contour_filter,
+    build_contour_cache,
+)
+from src.gradient import (
+    add_gradient_args,
+    build_gradient_filter,
+    get_contour_input,
+    get_volumes_loader,
+)
+from src.gradient_range import GradientRangeFilter
+from src.histogram import (
+    HistogramPanel,
+    JointHistogram,
+    add_histogram_args,
+    get_histogram_loader,
 )
-from src.color_map import get_inferno16_color_map
 from src.isovalue import get_isovalue_mid
-from src.read_vti import read_vti
+from src.loading import show_loading_window
+from src.pipeline_updater import add_pipeline_updater_args, build_pipeline_updater
+from src.profiling import add_profiling_args, build_pipeline_profiler
+from src.read_vti import ImageReader, get_scalar_range
+from src.surface_mapper import build_surface_mapper
 from src.vtk_side_effects import import_for_rendering_core
 from src.vtk_widget import build_default_vtk_renderer, build_default_vtk_widget
 from src.window import WINDOW_HEIGHT, WINDOW_WIDTH
@@ -31,30 +53,49 @@ from src.window import WINDOW_HEIGHT, WINDOW_WIDTH
 def parse_args():
     parser = argparse.ArgumentParser()
     parser.add_argument("-i", "--input", required=True)
-    parser.add_argument("-g", "--grad", required=True)
+    add_gradient_args(parser)
     parser.add_argument("-v", "--value", type=int, required=True)
     add_axes_clip_args(parser)
+    add_contour_args(parser)
+    add_contour_cache_args(parser)
+    add_pipeline_updater_args(parser)
+    add_profiling_args(parser)
+    add_histogram_args(parser)
     return parser.parse_args()
 
 
 # Use GUI widgets to store the state of the application.
-# pylint: disable=too-many-locals too-many-statements
+# pylint: disable=too-many-locals too-many-statements too-many-arguments
 def build_gui(
-    isovalue_reader: vtkXMLImageDataReader,
-    gradient_reader: vtkXMLImageDataReader,
+    readers: tuple[ImageReader, ImageReader],
+    histogram: JointHistogram | None,
     isovalue_default: int | None,
     axes_clip_default: list[int],
+    contour_config: ContourConfig,
+    contour_cache: ContourCache,
+    update_delay: int | None,
+    profile_filename: str | None,
 ):
     def on_axes_clip_changed():
-        change_axes_clip(vtk_widget, *(slider.value() for slider in axes_clip_sliders))
+        change_axes_clip(*(slider.value() for slider in axes_clip_sliders))
 
     def on_gradient_min_changed(value: int):
         change_gradmin(value)
         gradmin_label.setText(str(value))
+        if histogram_panel is not None:
+            histogram_panel.set_gradient_range(value, gradmax_slider.value())
 
     def on_gradient_max_changed(value: int):
         change_gradmax(value)
         gradmax_label.setText(str(value))
+        if histogram_panel is not None:
+            histogram_panel.set_gradient_range(gradmin_slider.value(), value)
+
+    def on_gradient_range_selected(low: float, high: float):
+        gradmin_slider.setValue(round(low))
+        gradmax_slider.setValue(round(high))
+
+    isovalue_reader, gradient_reader = readers
 
     window = QMainWindow()
     window.resize(WINDOW_WIDTH, WINDOW_HEIGHT)
@@ -67,13 +108,29 @@ def build_gui(
         change_gradmin,
         change_gradmax,
     ) = build_vtk_widget(
-        central, isovalue_reader, gradient_reader, isovalue_default, axes_clip_default
+        central,
+        isovalue_reader,
+        gradient_reader,
+        isovalue_default,
+        axes_clip_default,
+        contour_config,
+        contour_cache,
+        update_delay,
+        profile_filename,
     )
     layout.addWidget(vtk_widget, 0, 0, 1, -1)
 
+    histogram_panel: HistogramPanel | None = None
+    if histogram is not None:
+        histogram_panel = HistogramPanel(histogram, on_gradient_range_selected)
+        histogram_panel.set_isovalue(
+            isovalue_default if isovalue_default else get_isovalue_mid(isovalue_reader)
+        )
+        layout.addWidget(histogram_panel, 1, 0, 1, -1, Qt.AlignmentFlag.AlignHCenter)
+
     grad_min: float
     grad_max: float
-    grad_min, grad_max = gradient_reader.GetOutput().GetScalarRange()
+    grad_min, grad_max = get_scalar_range(gradient_reader)
 
     layout.addWidget(QLabel("gradmin"), 2, 0)
     gradmin_slider = QSlider(Qt.Orientation.Horizontal)
@@ -104,82 +161,129 @@ def build_gui(
     return window
 
 
-# pylint: disable=too-many-locals
+# pylint: disable=too-many-locals too-many-arguments
 def build_vtk_widget(
     parent: QObject,
-    isovalue_reader: vtkXMLImageDataReader,
-    gradient_reader: vtkXMLImageDataReader,
+    isovalue_reader: ImageReader,
+    gradient_reader: ImageReader,
     isovalue_default: int | None,
     axes_clips_default: list[int],
+    contour_config: ContourConfig,
+    contour_cache: ContourCache,
+    update_delay: int | None,
+    profile_filename: str | None,
 ):
-    def change_isovalue(value: int):
-        contour_filter.SetValue(contour_index, value)
-        widget.GetRenderWindow().Render()
+    def change_axes_clips(x: float, y: float, z: float):
+        updater.update("clips", lambda: set_axes_clips(x, y, z))
 
     def change_gradmin(value: int):
-        gradmin_clip_filter.SetValue(value)
-        widget.GetRenderWindow().Render()
+        updater.update("gradmin", lambda: gradient_range_filter.SetMinimum(value))
 
     def change_gradmax(value: int):
-        gradmax_clip_filter.SetValue(value)
-        widget.GetRenderWindow().Render()
+        updater.update("gradmax", lambda: gradient_range_filter.SetMaximum(value))
+
+    renderer, mapper, stages, set_axes_clips, gradient_range_filter = build_pipeline(
+        isovalue_reader,
+        gradient_reader,
+        isovalue_default,
+        axes_clips_default,
+        contour_config,
+        contour_cache,
+    )
+
+    widget = build_default_vtk_widget(parent, renderer)
+
+    build_pipeline_profiler(renderer, [mapper], profile_filename, stages)
+
+    updater = build_pipeline_updater(widget, [mapper], update_delay)
+
+    return widget, change_axes_clips, change_gradmin, change_gradmax
+
 
+# pylint: disable=too-many-locals too-many-arguments
+def build_pipeline(
+    isovalue_reader: ImageReader,
+    gradient_reader: ImageReader,
+    isovalue_default: int | None,
+    axes_clips_default: list[int],
+    contour_config: ContourConfig,
+    contour_cache: ContourCache,
+):
+    """Build the pipeline up to its renderer, which needs no display to be
+    updated, returning the function changing its clips and the gradient range
+    filter to change in place."""
     isovalue_mid = get_isovalue_mid(isovalue_reader)
 
-    contour_filter = vtkContourFilter()
+    contour_input = get_contour_input(
+        isovalue_reader, gradient_reader, contour_config["vertex_gradient"]
+    )
+    contour_input, axes_clip_filter, set_axes_clips = get_axes_clip_filters(
+        contour_input, contour_config["voi_clip"]
+    )
+
+    contour_filter = build_cached_contour_filter(contour_config, contour_cache)
     contour_index = 0
 
     # Force the filter to have initial value. If not, the filter will not
     # generate any output even if the value is changed.
     contour_filter.SetValue(contour_index, isovalue_mid)
-    contour_filter.SetInputConnection(isovalue_reader.GetOutputPort())
+    contour_filter.SetInputConnection(contour_input.GetOutputPort())
 
-    axes_clip_filter, change_axes_clips = get_axes_clip_filter()
     axes_clip_filter.SetInputConnection(contour_filter.GetOutputPort())
 
-    probe_filter = vtkProbeFilter()
-    probe_filter.SetInputConnection(axes_clip_filter.GetOutputPort())
-    probe_filter.SetSourceConnection(gradient_reader.GetOutputPort())
-
-    gradient_range: tuple[float, float] = gradient_reader.GetOutput().GetScalarRange()
-    gradmin, gradmax = gradient_range
+    gradient_filter = build_gradient_filter(
+        gradient_reader, contour_config["vertex_gradient"]
+    )
+    gradient_filter.SetInputConnection(axes_clip_filter.GetOutputPort())
 
-    gradmin_clip_filter = vtkClipPolyData()
-    gradmin_clip_filter.SetValue(gradmin)
-    gradmin_clip_filter.SetInputConnection(probe_filter.GetOutputPort())
+    gradient_range = get_scalar_range(gradient_reader)
 
-    gradmax_clip_filter = vtkClipPolyData()
-    gradmax_clip_filter.SetValue(gradmax)
-    gradmax_clip_filter.SetInsideOut(True)
-    gradmax_clip_filter.SetInputConnection(gradmin_clip_filter.GetOutputPort())
+    gradient_range_filter = GradientRangeFilter(gradient_range)
+    gradient_range_filter.SetInputConnection(gradient_filter.GetOutputPort())
 
-    mapper = vtkDataSetMapper()
-    mapper.SetInputConnection(gradmax_clip_filter.GetOutputPort())
+    mapper = build_surface_mapper(gradient_range_filter.GetOutputPort())
 
     actor = vtkActor()
     actor.SetMapper(mapper)
 
     scalar_bar = vtkScalarBarActor()
-    ctf = get_inferno16_color_map(gradient_range)
-    mapper.SetLookupTable(ctf)
-    scalar_bar.SetLookupTable(ctf)
+    lut = get_inferno16_color_map(gradient_range)
+    set_mapper_lookup_table(mapper, lut)
+    scalar_bar.SetLookupTable(lut)
 
     renderer = build_default_vtk_renderer([actor], [scalar_bar])
 
-    widget = build_default_vtk_widget(parent, renderer)
-
     # Set to user defined value if provided.
-    change_isovalue(isovalue_default if isovalue_default else isovalue_mid)
-    # Set to user defined value after we have the widget.
-    change_axes_clips(widget, *axes_clips_default)
+    contour_filter.SetValue(
+        contour_index, isovalue_default if isovalue_default else isovalue_mid
+    )
+    set_axes_clips(*axes_clips_default)
 
-    return widget, change_axes_clips, change_gradmin, change_gradmax
+    stages = {
+        "contour": contour_filter,
+        "axes clip": axes_clip_filter,
+        "gradient": gradient_filter,
+        "gradient range": gradient_range_filter,
+    }
+    return renderer, mapper, stages, set_axes_clips, gradient_range_filter
 
 
 if __name__ == "__main__":
     import_for_rendering_core()
     args = parse_args()
     app = QApplication()
-    gui = build_gui(read_vti(args.input), read_vti(args.grad), args.value, args.clip)
-    gui.show()
+    loading_window = show_loading_window(
+        get_histogram_loader(
+            get_volumes_loader(args), args.input, args.grad, args.histogram
+        ),
+        lambda loaded: build_gui(
+            *loaded,
+            args.value,
+            args.clip,
+            get_contour_config(args),
+            build_contour_cache(args),
+            args.update_delay,
+            args.profile,
+        ),
+    )
     sys.exit(app.exec())
@@ -0,0 +1,49 @@
+import argparse
+import os
+
+from src.batch import read_jobs, render_jobs
+from src.contour import add_contour_args, get_contour_config
+from src.contour_cache import add_contour_cache_args
+from src.render_server import RenderClient, render_jobs_remotely
+from src.surface_store import get_surface_store_config
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Render isosurface screenshots offscreen from a job file."
+    )
+    parser.add_argument("-j", "--jobs", required=True)
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="Set the number of worker processes rendering jobs",
+    )
+    parser.add_argument(
+        "--server",
+        metavar="SOCKET",
+        help="Render the jobs on the render server listening on the Unix socket "
+        "SOCKET (see isoserver.py), ignoring the other options",
+    )
+    add_contour_args(parser)
+    add_contour_cache_args(parser)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    jobs = read_jobs(args.jobs)
+    outputs = (
+        render_jobs_remotely(RenderClient(args.server), jobs)
+        if args.server is not None
+        else render_jobs(
+            jobs,
+            get_contour_config(args),
+            args.cache_size,
+            args.workers,
+            get_surface_store_config(args),
+        )
+    )
+    for output in outputs:
+        print(output)
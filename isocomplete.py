@@ -1,19 +1,35 @@
 import argparse
 import sys
-from typing import Callable, TypedDict
+from typing import Callable
 
 from PySide6.QtCore import QObject
 from PySide6.QtWidgets import QApplication
-from vtkmodules.qt.QVTKRenderWindowInteractor import QVTKRenderWindowInteractor
-from vtkmodules.vtkCommonCore import vtkLookupTable
-from vtkmodules.vtkFiltersCore import vtkClipPolyData, vtkContourFilter, vtkProbeFilter
-from vtkmodules.vtkIOXML import vtkXMLImageDataReader
-from vtkmodules.vtkRenderingCore import vtkActor, vtkDataSetMapper
-
-from src.clipping import (
-    add_axes_clip_args,
-    build_axes_clip_sliders,
-    get_axes_clip_filter,
+from vtkmodules.vtkCommonExecutionModel import vtkAlgorithmOutput
+from vtkmodules.vtkRenderingCore import vtkActor
+
+from src.clipping import add_axes_clip_args, build_axes_clip_sliders
+from src.contour import ContourConfig, add_contour_args, get_contour_config
+from src.contour_cache import ContourCache, add_contour_cache_args, build_contour_cache
+from src.data_context import DataContext, build_data_context, build_probed_isosurface
+from src.gradient import add_gradient_args, get_volumes_loader
+from src.gradient_range import GradientRangeFilter
+from src.level_of_detail import (
+    add_level_of_detail_args,
+    bind_interaction,
+    get_lod_voxels,
+)
+from src.loading import show_loading_window
+from src.multi_contour import IsovalueSplitFilter, get_unique_values
+from src.params import IsovalueParams, read_params
+from src.pipeline_updater import add_pipeline_updater_args, build_pipeline_updater
+from src.profiling import add_profiling_args, build_pipeline_profiler
+from src.read_vti import ImageReader
+from src.surface_mapper import build_surface_mapper
+from src.transparency import (
+    TransparencyConfig,
+    add_transparency_args,
+    get_transparency_config,
+    set_up_transparency,
 )
 from src.vtk_side_effects import import_for_rendering_core
 from src.vtk_widget import build_default_vtk_renderer, build_default_vtk_widget
@@ -23,157 +39,202 @@ from src.window import build_default_window
 def parse_args():
     parser = argparse.ArgumentParser()
     parser.add_argument("-i", "--input", required=True)
-    parser.add_argument("-g", "--grad", required=True)
+    add_gradient_args(parser)
     parser.add_argument("-p", "--params", required=True)
     add_axes_clip_args(parser)
+    add_contour_args(parser)
+    add_contour_cache_args(parser)
+    add_pipeline_updater_args(parser)
+    add_profiling_args(parser)
+    add_level_of_detail_args(parser)
+    add_transparency_args(parser)
+    parser.add_argument(
+        "--single-pass",
+        action="store_true",
+        help="Extract and probe all isovalues at once instead of once per row",
+    )
     return parser.parse_args()
 
 
-def read_params(filename: str):
-    with open(filename, "r", encoding="utf-8") as f:
-        rows = [line.split() for line in f if line and not line.startswith("#")]
-    return [
-        IsovalueParams(
-            value=int(row[0]),
-            gradient_range=tuple(map(float, row[1:3])),
-            color=tuple(map(float, row[3:])),
-        )
-        for row in rows
-    ]
-
-
-class IsovalueParams(TypedDict):
-    value: int
-    gradient_range: tuple[float, float]
-    color: tuple[float, float, float]
-
-
 # Use GUI widgets to store the state of the application.
-# pylint: disable=too-many-locals
+# pylint: disable=too-many-locals too-many-arguments
 def build_gui(
-    isovalue_filename: str,
-    gradient_filename: str,
+    isovalue_reader: ImageReader,
+    gradient_reader: ImageReader,
     params_list: list[IsovalueParams],
     clips_default: list[int],
+    contour_config: ContourConfig,
+    contour_cache: ContourCache,
+    single_pass: bool,
+    update_delay: int | None,
+    lod_voxels: int | None,
+    profile_filename: str | None,
+    transparency_config: TransparencyConfig,
 ):
     def on_clip_changed():
-        change_clip(vtk_widget, *(slider.value() for slider in clip_sliders))
+        change_clip(*(slider.value() for slider in clip_sliders))
 
     window, central, layout = build_default_window()
 
-    vtk_widget, change_clip = build_vtk_widget(
+    vtk_widget, change_clip, change_interacting = build_vtk_widget(
         central,
-        isovalue_filename,
-        gradient_filename,
+        isovalue_reader,
+        gradient_reader,
         params_list,
         clips_default,
+        contour_config,
+        contour_cache,
+        single_pass,
+        update_delay,
+        lod_voxels,
+        profile_filename,
+        transparency_config,
     )
     layout.addWidget(vtk_widget, 0, 0, 1, -1)
 
     clip_sliders = build_axes_clip_sliders(layout, 1, clips_default, on_clip_changed)
 
+    bind_interaction(vtk_widget, clip_sliders, change_interacting)
+
     return window
 
 
 # pylint: disable=too-many-locals too-many-arguments
 def build_vtk_widget(
     parent: QObject,
-    isovalue_filename: str,
-    gradient_filename: str,
+    isovalue_reader: ImageReader,
+    gradient_reader: ImageReader,
     params_list: list[IsovalueParams],
     axes_clips_default: list[int],
+    contour_config: ContourConfig,
+    contour_cache: ContourCache,
+    single_pass: bool,
+    update_delay: int | None,
+    lod_voxels: int | None,
+    profile_filename: str | None,
+    transparency_config: TransparencyConfig,
 ):
-    def change_all_actor_clips(
-        widget: QVTKRenderWindowInteractor, x: float, y: float, z: float
-    ):
-        for change_clip in change_clips_list:
-            change_clip(widget, x, y, z)
+    def set_all_actor_clips(x: float, y: float, z: float):
+        for set_clips in set_clips_list:
+            set_clips(x, y, z)
+
+    def change_all_actor_clips(x: float, y: float, z: float):
+        updater.update("clips", lambda: set_all_actor_clips(x, y, z))
 
-    isovalue_reader = vtkXMLImageDataReader()
-    isovalue_reader.SetFileName(isovalue_filename)
+    def change_interacting(interacting: bool):
+        if peel_budget is not None:
+            peel_budget.set_interacting(interacting)
+        updater.update("interacting", lambda: set_interacting(interacting))
 
-    gradient_reader = vtkXMLImageDataReader()
-    gradient_reader.SetFileName(gradient_filename)
+    context, set_interacting = build_data_context(
+        isovalue_reader, gradient_reader, contour_config, lod_voxels
+    )
 
     actors: list[vtkActor] = []
-    change_clips_list: list[
-        Callable[[QVTKRenderWindowInteractor, float, float, float], None]
-    ] = []
-    for params in params_list:
-        actor, change_clips = build_isosurface_actor(
-            params,
-            isovalue_reader,
-            gradient_reader,
+    set_clips_list: list[Callable[[float, float, float], None]] = []
+    if single_pass:
+        actors, set_clips = build_isosurface_actors(
+            params_list, context, contour_config, contour_cache
         )
-        actors.append(actor)
-        change_clips_list.append(change_clips)
+        set_clips_list.append(set_clips)
+    else:
+        for params in params_list:
+            actor, set_clips = build_isosurface_actor(
+                params, context, contour_config, contour_cache
+            )
+            actors.append(actor)
+            set_clips_list.append(set_clips)
 
     renderer = build_default_vtk_renderer(actors, [])
 
     widget = build_default_vtk_widget(parent, renderer)
 
-    # Set to user defined value after we have the widget.
-    change_all_actor_clips(widget, *axes_clips_default)
+    set_all_actor_clips(*axes_clips_default)
 
-    # Enable depth peeling.
-    widget.GetRenderWindow().SetAlphaBitPlanes(True)
-    widget.GetRenderWindow().SetMultiSamples(0)
-    renderer.SetUseDepthPeeling(True)
-    renderer.SetMaximumNumberOfPeels(100)
-    renderer.SetOcclusionRatio(0.0)
+    mappers = [actor.GetMapper() for actor in actors]
+    build_pipeline_profiler(renderer, mappers, profile_filename)
 
-    return widget, change_all_actor_clips
+    updater = build_pipeline_updater(widget, mappers, update_delay)
+
+    peel_budget = set_up_transparency(
+        widget.GetRenderWindow(), renderer, transparency_config
+    )
+
+    return widget, change_all_actor_clips, change_interacting
 
 
 def build_isosurface_actor(
     params: IsovalueParams,
-    isovalue_reader: vtkXMLImageDataReader,
-    gradient_reader: vtkXMLImageDataReader,
+    context: DataContext,
+    contour_config: ContourConfig,
+    contour_cache: ContourCache,
+):
+    _, gradient_filter, set_axes_clips = build_probed_isosurface(
+        context, [params["value"]], contour_config, contour_cache
+    )
+
+    actor = build_gradient_range_actor(params, gradient_filter.GetOutputPort())
+
+    return actor, set_axes_clips
+
+
+def build_isosurface_actors(
+    params_list: list[IsovalueParams],
+    context: DataContext,
+    contour_config: ContourConfig,
+    contour_cache: ContourCache,
 ):
-    contour_filter = vtkContourFilter()
-    contour_filter.SetValue(0, params["value"])
-    contour_filter.SetInputConnection(isovalue_reader.GetOutputPort())
+    """Build the actors of all isovalues from a single contour, clip and probe
+    pass over the volume, split per isovalue only before gradient filtering."""
+    values = [params["value"] for params in params_list]
+    axes_clip_filter, gradient_filter, set_axes_clips = build_probed_isosurface(
+        context, get_unique_values(values), contour_config, contour_cache
+    )
 
-    axes_clip_filter, change_axes_clips = get_axes_clip_filter()
-    axes_clip_filter.SetInputConnection(contour_filter.GetOutputPort())
+    split_filter = IsovalueSplitFilter(values)
+    split_filter.SetInputConnection(0, axes_clip_filter.GetOutputPort())
+    split_filter.SetInputConnection(1, gradient_filter.GetOutputPort())
 
-    probe_filter = vtkProbeFilter()
-    probe_filter.SetInputConnection(axes_clip_filter.GetOutputPort())
-    probe_filter.SetSourceConnection(gradient_reader.GetOutputPort())
+    actors = [
+        build_gradient_range_actor(params, split_filter.GetOutputPort(i))
+        for i, params in enumerate(params_list)
+    ]
 
-    gradmin_clip_filter = vtkClipPolyData()
-    gradmin_clip_filter.SetValue(params["gradient_range"][0])
-    gradmin_clip_filter.SetInputConnection(probe_filter.GetOutputPort())
+    return actors, set_axes_clips
 
-    gradmax_clip_filter = vtkClipPolyData()
-    gradmax_clip_filter.SetValue(params["gradient_range"][1])
-    gradmax_clip_filter.SetInsideOut(True)
-    gradmax_clip_filter.SetInputConnection(gradmin_clip_filter.GetOutputPort())
 
-    lut = vtkLookupTable()
-    lut.SetNumberOfTableValues(1)
-    lut.SetTableValue(0, *params["color"])
-    lut.Build()
+def build_gradient_range_actor(params: IsovalueParams, input_port: vtkAlgorithmOutput):
+    gradient_range_filter = GradientRangeFilter(params["gradient_range"])
+    gradient_range_filter.SetInputConnection(input_port)
 
-    mapper = vtkDataSetMapper()
-    mapper.SetLookupTable(lut)
-    mapper.SetInputConnection(gradmax_clip_filter.GetOutputPort())
+    # Each row has a single color, so nothing is mapped per vertex.
+    mapper = build_surface_mapper(gradient_range_filter.GetOutputPort(), False)
 
     actor = vtkActor()
     actor.SetMapper(mapper)
+    actor.GetProperty().SetColor(*params["color"])
+    actor.GetProperty().SetOpacity(params["opacity"])
 
-    return actor, change_axes_clips
+    return actor
 
 
 if __name__ == "__main__":
     import_for_rendering_core()
     args = parse_args()
     app = QApplication()
-    gui = build_gui(
-        args.input,
-        args.grad,
-        read_params(args.params),
-        args.clip,
+    loading_window = show_loading_window(
+        get_volumes_loader(args),
+        lambda readers: build_gui(
+            *readers,
+            read_params(args.params),
+            args.clip,
+            get_contour_config(args),
+            build_contour_cache(args),
+            args.single_pass,
+            args.update_delay,
+            get_lod_voxels(args),
+            args.profile,
+            get_transparency_config(args),
+        ),
     )
-    gui.show()
     sys.exit(app.exec())
@@ -0,0 +1,65 @@
+import argparse
+import os
+
+from src.clipping import add_axes_clip_args
+from src.contour import add_contour_args, get_contour_config
+from src.contour_cache import add_contour_cache_args
+from src.gradient import add_gradient_args
+from src.mesh_export import MeshExportConfig, export_meshes
+from src.params import read_params
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Export the isosurfaces of a params file as one PLY or glTF "
+        "mesh, filtered as isocomplete.py shows them."
+    )
+    parser.add_argument("-i", "--input", required=True)
+    add_gradient_args(parser)
+    parser.add_argument("-p", "--params", required=True)
+    parser.add_argument(
+        "-o",
+        "--output",
+        required=True,
+        help="Set the exported file, whose extension (.ply or .gltf) sets its "
+        "format",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="Set the number of worker processes extracting isosurfaces",
+    )
+    parser.add_argument(
+        "--color-by-gradient",
+        action="store_true",
+        help="Color the vertices by gradient magnitude instead of with the color "
+        "of their isosurface",
+    )
+    add_axes_clip_args(parser)
+    add_contour_args(parser)
+    add_contour_cache_args(parser)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    parts = export_meshes(
+        args.output,
+        read_params(args.params),
+        MeshExportConfig(
+            input=args.input,
+            grad=args.grad,
+            clip=args.clip,
+            color_by_gradient=args.color_by_gradient,
+        ),
+        get_contour_config(args),
+        args.cache_size,
+        args.workers,
+    )
+    for part in parts:
+        print(
+            f"{part['params']['value']}: {part['vertex_count']} vertices, "
+            f"{part['triangle_count']} triangles"
+        )
@@ -3,21 +3,38 @@ import sys
 
 from PySide6.QtCore import QObject
 from PySide6.QtWidgets import QApplication
-from vtkmodules.vtkFiltersCore import vtkContourFilter, vtkProbeFilter
-from vtkmodules.vtkIOXML import vtkXMLImageDataReader
 from vtkmodules.vtkRenderingAnnotation import vtkScalarBarActor
-from vtkmodules.vtkRenderingCore import (
-    vtkActor,
-    vtkColorTransferFunction,
-    vtkDataSetMapper,
-)
+from vtkmodules.vtkRenderingCore import vtkActor
 
 from src.clipping import (
     add_axes_clip_args,
     build_axes_clip_sliders,
-    get_axes_clip_filter,
+    get_axes_clip_filters,
+)
+from src.color_map import (
+    build_lookup_table,
+    get_inferno16_color_map,
+    get_value_points,
+    set_mapper_lookup_table,
+)
+from src.contour import ContourConfig, add_contour_args, get_contour_config
+from src.contour_cache import (
+    ContourCache,
+    add_contour_cache_args,
+    build_cached_contour_filter,
+    build_contour_cache,
+)
+from src.gradient import (
+    add_gradient_args,
+    build_gradient_filter,
+    get_contour_input,
+    get_volumes_loader,
 )
-from src.color_map import get_inferno16_color_map
+from src.loading import show_loading_window
+from src.pipeline_updater import add_pipeline_updater_args, build_pipeline_updater
+from src.profiling import add_profiling_args, build_pipeline_profiler
+from src.read_vti import ImageReader, get_scalar_range
+from src.surface_mapper import build_surface_mapper
 from src.vtk_side_effects import import_for_rendering_core
 from src.vtk_widget import build_default_vtk_renderer, build_default_vtk_widget
 from src.window import build_default_window
@@ -26,10 +43,14 @@ from src.window import build_default_window
 def parse_args():
     parser = argparse.ArgumentParser()
     parser.add_argument("-i", "--input", required=True)
-    parser.add_argument("-g", "--grad", required=True)
+    add_gradient_args(parser)
     parser.add_argument("-v", "--value", required=True)
     parser.add_argument("--cmap")
     add_axes_clip_args(parser)
+    add_contour_args(parser)
+    add_contour_cache_args(parser)
+    add_pipeline_updater_args(parser)
+    add_profiling_args(parser)
     return parser.parse_args()
 
 
@@ -48,26 +69,34 @@ def read_color_map(filename: str):
 
 
 # Use GUI widgets to store the state of the application.
-# pylint: disable=too-many-locals
+# pylint: disable=too-many-locals too-many-arguments
 def build_gui(
-    isovalue_filename: str,
-    gradient_filename: str,
+    isovalue_reader: ImageReader,
+    gradient_reader: ImageReader,
     selected_isovalues: list[int],
     color_map: dict[int, tuple[float, float, float]] | None,
     clips_default: list[int],
+    contour_config: ContourConfig,
+    contour_cache: ContourCache,
+    update_delay: int | None,
+    profile_filename: str | None,
 ):
     def on_clip_changed():
-        change_clip(vtk_widget, *(slider.value() for slider in clip_sliders))
+        change_clip(*(slider.value() for slider in clip_sliders))
 
     window, central, layout = build_default_window()
 
     vtk_widget, change_clip = build_vtk_widget(
         central,
-        isovalue_filename,
-        gradient_filename,
+        isovalue_reader,
+        gradient_reader,
         selected_isovalues,
         color_map,
         clips_default,
+        contour_config,
+        contour_cache,
+        update_delay,
+        profile_filename,
     )
     layout.addWidget(vtk_widget, 0, 0, 1, -1)
 
@@ -79,34 +108,72 @@ def build_gui(
 # pylint: disable=too-many-locals too-many-arguments
 def build_vtk_widget(
     parent: QObject,
-    isovalue_filename: str,
-    gradient_filename: str,
+    isovalue_reader: ImageReader,
+    gradient_reader: ImageReader,
     selected_isovalues: list[int],
     color_map: dict[int, tuple[float, float, float]] | None,
     axes_clips_default: list[int],
+    contour_config: ContourConfig,
+    contour_cache: ContourCache,
+    update_delay: int | None,
+    profile_filename: str | None,
 ):
-    isovalue_reader = vtkXMLImageDataReader()
-    isovalue_reader.SetFileName(isovalue_filename)
+    def change_clips(x: float, y: float, z: float):
+        updater.update("clips", lambda: set_clips(x, y, z))
+
+    renderer, mapper, stages, set_clips = build_pipeline(
+        isovalue_reader,
+        gradient_reader,
+        selected_isovalues,
+        color_map,
+        axes_clips_default,
+        contour_config,
+        contour_cache,
+    )
+
+    widget = build_default_vtk_widget(parent, renderer)
+
+    build_pipeline_profiler(renderer, [mapper], profile_filename, stages)
+
+    updater = build_pipeline_updater(widget, [mapper], update_delay)
+
+    return widget, change_clips
 
-    contour_filter = vtkContourFilter()
+
+# pylint: disable=too-many-locals too-many-arguments
+def build_pipeline(
+    isovalue_reader: ImageReader,
+    gradient_reader: ImageReader,
+    selected_isovalues: list[int],
+    color_map: dict[int, tuple[float, float, float]] | None,
+    axes_clips_default: list[int],
+    contour_config: ContourConfig,
+    contour_cache: ContourCache,
+):
+    """Build the pipeline up to its renderer, which needs no display to be
+    updated, returning the function changing its clips in place."""
+    contour_filter = build_cached_contour_filter(contour_config, contour_cache)
     for i, value in enumerate(selected_isovalues):
         contour_filter.SetValue(i, value)
-    contour_filter.SetInputConnection(isovalue_reader.GetOutputPort())
 
-    clip_filter, change_clips = get_axes_clip_filter()
-    clip_filter.SetInputConnection(contour_filter.GetOutputPort())
+    gradient_range = get_scalar_range(gradient_reader)
 
-    gradient_reader = vtkXMLImageDataReader()
-    gradient_reader.SetFileName(gradient_filename)
-    gradient_reader.Update()
-    gradient_range: tuple[float, float] = gradient_reader.GetOutput().GetScalarRange()
+    contour_input = get_contour_input(
+        isovalue_reader, gradient_reader, contour_config["vertex_gradient"]
+    )
+    contour_input, clip_filter, set_clips = get_axes_clip_filters(
+        contour_input, contour_config["voi_clip"]
+    )
+    contour_filter.SetInputConnection(contour_input.GetOutputPort())
+
+    clip_filter.SetInputConnection(contour_filter.GetOutputPort())
 
-    probe_filter = vtkProbeFilter()
-    probe_filter.SetInputConnection(clip_filter.GetOutputPort())
-    probe_filter.SetSourceConnection(gradient_reader.GetOutputPort())
+    gradient_filter = build_gradient_filter(
+        gradient_reader, contour_config["vertex_gradient"]
+    )
+    gradient_filter.SetInputConnection(clip_filter.GetOutputPort())
 
-    mapper = vtkDataSetMapper()
-    mapper.SetInputConnection(probe_filter.GetOutputPort())
+    mapper = build_surface_mapper(gradient_filter.GetOutputPort())
 
     actor = vtkActor()
     actor.SetMapper(mapper)
@@ -114,35 +181,40 @@ def build_vtk_widget(
     scalar_bar = vtkScalarBarActor()
 
     if color_map is None:
-        ctf = get_inferno16_color_map(gradient_range)
+        lut = get_inferno16_color_map(gradient_range)
     else:
-        ctf = vtkColorTransferFunction()
-        for value, color in color_map.items():
-            ctf.AddRGBPoint(value, *color)
+        lut = build_lookup_table(get_value_points(color_map))
 
-    mapper.SetLookupTable(ctf)
-    scalar_bar.SetLookupTable(ctf)
+    set_mapper_lookup_table(mapper, lut)
+    scalar_bar.SetLookupTable(lut)
 
     renderer = build_default_vtk_renderer([actor], [scalar_bar])
 
-    widget = build_default_vtk_widget(parent, renderer)
-
-    # Set to user defined value after we have the widget.
-    change_clips(widget, *axes_clips_default)
+    set_clips(*axes_clips_default)
 
-    return widget, change_clips
+    stages = {
+        "contour": contour_filter,
+        "axes clip": clip_filter,
+        "gradient": gradient_filter,
+    }
+    return renderer, mapper, stages, set_clips
 
 
 if __name__ == "__main__":
     import_for_rendering_core()
     args = parse_args()
     app = QApplication()
-    gui = build_gui(
-        args.input,
-        args.grad,
-        read_selected_isovalues(args.value),
-        read_color_map(args.cmap) if args.cmap else None,
-        args.clip,
+    loading_window = show_loading_window(
+        get_volumes_loader(args),
+        lambda readers: build_gui(
+            *readers,
+            read_selected_isovalues(args.value),
+            read_color_map(args.cmap) if args.cmap else None,
+            args.clip,
+            get_contour_config(args),
+            build_contour_cache(args),
+            args.update_delay,
+            args.profile,
+        ),
     )
-    gui.show()
     sys.exit(app.exec())
@@ -0,0 +1,60 @@
+import argparse
+import os
+import socket
+
+from src.contour import add_contour_args, get_contour_config
+from src.contour_cache import add_contour_cache_args
+from src.render_server import RenderServer
+from src.surface_store import get_surface_store_config
+from src.vtk_side_effects import import_for_rendering_core
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Serve isosurfaces and renderings of volumes loaded once to "
+        "local clients over a Unix socket."
+    )
+    parser.add_argument("-s", "--socket", required=True)
+    parser.add_argument(
+        "--preload",
+        nargs="+",
+        default=[],
+        metavar="INPUT",
+        help="Load the datasets before accepting clients",
+    )
+    add_contour_args(parser)
+    add_contour_cache_args(parser)
+    return parser.parse_args()
+
+
+def remove_stale_socket(socket_path: str):
+    """Remove the socket left by a server that exited without cleaning up,
+    refusing to replace one still serving."""
+    if not os.path.exists(socket_path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socket_path)
+        except ConnectionRefusedError:
+            os.remove(socket_path)
+            return
+    raise SystemExit(f"A server is already listening on {socket_path}.")
+
+
+if __name__ == "__main__":
+    import_for_rendering_core()
+    args = parse_args()
+    remove_stale_socket(args.socket)
+    with RenderServer(
+        args.socket,
+        get_contour_config(args),
+        args.cache_size,
+        get_surface_store_config(args),
+    ) as server:
+        for data_filename in args.preload:
+            server.run(server.get_reader, os.path.abspath(data_filename))
+        print(f"Serving on {args.socket}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -3,23 +3,45 @@ import sys
 
 from PySide6.QtCore import QObject
 from PySide6.QtWidgets import QApplication
-from vtkmodules.vtkFiltersCore import vtkContourFilter
-from vtkmodules.vtkIOXML import vtkXMLImageDataReader
 from vtkmodules.vtkRenderingAnnotation import vtkScalarBarActor
-from vtkmodules.vtkRenderingCore import (
-    vtkActor,
-    vtkColorTransferFunction,
-    vtkDataSetMapper,
-)
+from vtkmodules.vtkRenderingCore import vtkActor
 
 from src.clipping import (
     add_axes_clip_args,
     build_axes_clip_sliders,
-    get_axes_clip_filter,
+    get_axes_clip_filters,
+)
+from src.color_map import (
+    COLOR_MAP_ISOVALUE_DEFAULT,
+    build_lookup_table,
+    get_isovalue_points,
+    set_mapper_lookup_table,
+)
+from src.contour import ContourConfig, add_contour_args, get_contour_config
+from src.contour_cache import (
+    ContourCache,
+    add_contour_cache_args,
+    build_cached_contour_filter,
+    build_contour_cache,
+)
+from src.contour_spectrum import (
+    ContourSpectrum,
+    add_contour_spectrum_args,
+    get_contour_spectrum_loader,
 )
-from src.color_map import COLOR_MAP_ISOVALUE_DEFAULT
 from src.isovalue import build_isovalue_slider, get_isovalue_mid
-from src.read_vti import read_vti
+from src.level_of_detail import (
+    add_level_of_detail_args,
+    bind_interaction,
+    get_level_of_detail_source,
+    get_lod_voxels,
+)
+from src.loading import show_loading_window
+from src.pipeline_updater import add_pipeline_updater_args, build_pipeline_updater
+from src.profiling import add_profiling_args, build_pipeline_profiler
+from src.read_vti import ImageReader, read_vti
+from src.render_server import RemoteContourFilter, RenderClient, add_render_server_args
+from src.surface_mapper import build_surface_mapper
 from src.vtk_side_effects import import_for_rendering_core
 from src.vtk_widget import build_default_vtk_renderer, build_default_vtk_widget
 from src.window import build_default_window
@@ -30,94 +52,190 @@ def parse_args():
     parser.add_argument("-i", "--input", required=True)
     parser.add_argument("--value", type=int)
     add_axes_clip_args(parser)
+    add_contour_args(parser)
+    add_contour_cache_args(parser)
+    add_pipeline_updater_args(parser)
+    add_profiling_args(parser)
+    add_level_of_detail_args(parser)
+    add_contour_spectrum_args(parser)
+    add_render_server_args(parser)
     return parser.parse_args()
 
 
 # Use GUI widgets to store the state of the application.
-# pylint: disable=too-many-locals
+# pylint: disable=too-many-locals too-many-arguments
 def build_gui(
-    reader: vtkXMLImageDataReader,
+    reader: ImageReader,
+    spectrum: ContourSpectrum | None,
     isovalue_default: int | None,
     clips_default: list[int],
+    contour_config: ContourConfig,
+    contour_cache: ContourCache,
+    update_delay: int | None,
+    lod_voxels: int | None,
+    profile_filename: str | None,
+    render_client: RenderClient | None,
 ):
     def on_clip_changed():
-        change_clip(vtk_widget, *(slider.value() for slider in clip_sliders))
+        change_clip(*(slider.value() for slider in clip_sliders))
 
     window, central, layout = build_default_window()
 
-    vtk_widget, change_isovalue, change_clip = build_vtk_widget(
-        central, reader, isovalue_default, clips_default
+    vtk_widget, change_isovalue, change_clip, change_interacting = build_vtk_widget(
+        central,
+        reader,
+        isovalue_default,
+        clips_default,
+        contour_config,
+        contour_cache,
+        update_delay,
+        lod_voxels,
+        profile_filename,
+        render_client,
     )
     layout.addWidget(vtk_widget, 0, 0, 1, -1)
 
     _isovalue_default = (
         isovalue_default if isovalue_default else get_isovalue_mid(reader)
     )
-    build_isovalue_slider(layout, 1, reader, _isovalue_default, change_isovalue)
+    isovalue_slider = build_isovalue_slider(
+        layout, 1, reader, _isovalue_default, change_isovalue, spectrum
+    )
 
     clip_sliders = build_axes_clip_sliders(layout, 2, clips_default, on_clip_changed)
 
+    bind_interaction(vtk_widget, [isovalue_slider, *clip_sliders], change_interacting)
+
     return window
 
 
-# pylint: disable=too-many-locals
+# pylint: disable=too-many-locals too-many-arguments
 def build_vtk_widget(
     parent: QObject,
-    reader: vtkXMLImageDataReader,
+    reader: ImageReader,
     isovalue_default: int | None,
     clips_default: list[int],
+    contour_config: ContourConfig,
+    contour_cache: ContourCache,
+    update_delay: int | None,
+    lod_voxels: int | None,
+    profile_filename: str | None,
+    render_client: RenderClient | None,
 ):
     def change_isovalue(value: int):
-        contour_filter.SetValue(contour_index, value)
-        widget.GetRenderWindow().Render()
+        updater.update("isovalue", lambda: set_isovalue(value))
+
+    def change_clips(x: float, y: float, z: float):
+        updater.update("clips", lambda: set_clips(x, y, z))
+
+    def change_interacting(interacting: bool):
+        updater.update("interacting", lambda: set_interacting(interacting))
+
+    renderer, mapper, stages, set_isovalue, set_clips, set_interacting = build_pipeline(
+        reader,
+        isovalue_default,
+        clips_default,
+        contour_config,
+        contour_cache,
+        lod_voxels,
+        render_client,
+    )
+
+    widget = build_default_vtk_widget(parent, renderer)
+
+    build_pipeline_profiler(renderer, [mapper], profile_filename, stages)
+
+    updater = build_pipeline_updater(widget, [mapper], update_delay)
 
-    isovalue_range: tuple[float, float] = reader.GetOutput().GetScalarRange()
+    return widget, change_isovalue, change_clips, change_interacting
+
+
+# pylint: disable=too-many-locals too-many-arguments
+def build_pipeline(
+    reader: ImageReader,
+    isovalue_default: int | None,
+    clips_default: list[int],
+    contour_config: ContourConfig,
+    contour_cache: ContourCache,
+    lod_voxels: int | None,
+    render_client: RenderClient | None,
+):
+    """Build the pipeline up to its renderer, which needs no display to be
+    updated, returning the functions changing it in place."""
+
+    def set_isovalue(value: int):
+        contour_filter.SetValue(contour_index, value)
 
     isovalue_mid = get_isovalue_mid(reader)
 
-    contour_filter = vtkContourFilter()
+    image_source, set_interacting = get_level_of_detail_source(reader, lod_voxels)
+    contour_input, clip_filter, set_clips = get_axes_clip_filters(
+        image_source, contour_config["voi_clip"]
+    )
+
+    contour_filter = (
+        RemoteContourFilter(render_client, reader.GetFileName())
+        if render_client is not None
+        else build_cached_contour_filter(contour_config, contour_cache)
+    )
     contour_index = 0
 
     # Force the filter to have initial value. If not, the filter will not
     # generate any output even if the value is changed.
     contour_filter.SetValue(contour_index, isovalue_mid)
-    contour_filter.SetInputConnection(reader.GetOutputPort())
+    contour_filter.SetInputConnection(contour_input.GetOutputPort())
 
-    clip_filter, change_clips = get_axes_clip_filter()
     clip_filter.SetInputConnection(contour_filter.GetOutputPort())
 
-    isovalue_color_maps = COLOR_MAP_ISOVALUE_DEFAULT
-    ctf = vtkColorTransferFunction()
-    for mapping in isovalue_color_maps.values():
-        ctf.AddRGBPoint(mapping["value"], *mapping["color"])
+    lut = build_lookup_table(get_isovalue_points(COLOR_MAP_ISOVALUE_DEFAULT))
 
-    mapper = vtkDataSetMapper()
-    mapper.SetScalarRange(isovalue_range)
-    mapper.SetLookupTable(ctf)
-    mapper.SetInputConnection(clip_filter.GetOutputPort())
+    mapper = build_surface_mapper(clip_filter.GetOutputPort())
+    set_mapper_lookup_table(mapper, lut)
 
     actor = vtkActor()
     actor.SetMapper(mapper)
 
     scalar_bar = vtkScalarBarActor()
-    scalar_bar.SetLookupTable(ctf)
+    scalar_bar.SetLookupTable(lut)
 
     renderer = build_default_vtk_renderer([actor], [scalar_bar])
 
-    widget = build_default_vtk_widget(parent, renderer)
-
     # Set to user defined value if provided.
-    change_isovalue(isovalue_default if isovalue_default else isovalue_mid)
-    # Set to user defined value after we have the widget.
-    change_clips(widget, *clips_default)
+    set_isovalue(isovalue_default if isovalue_default else isovalue_mid)
+    set_clips(*clips_default)
 
-    return widget, change_isovalue, change_clips
+    stages = {"contour": contour_filter, "axes clip": clip_filter}
+    return renderer, mapper, stages, set_isovalue, set_clips, set_interacting
 
 
 if __name__ == "__main__":
     import_for_rendering_core()
     args = parse_args()
     app = QApplication()
-    gui = build_gui(read_vti(args.input), args.value, args.clip)
-    gui.show()
+    # A client of the render server holds the geometry of the volume only.
+    client = RenderClient(args.server) if args.server is not None else None
+    loading_window = show_loading_window(
+        get_contour_spectrum_loader(
+            lambda on_progress: client.read_volume(args.input)
+            if client is not None
+            else read_vti(
+                args.input,
+                lambda progress: on_progress(args.input, progress),
+                args.stream_slab,
+            ),
+            args.input,
+            args.spectrum,
+        ),
+        lambda loaded: build_gui(
+            *loaded,
+            args.value,
+            args.clip,
+            get_contour_config(args),
+            build_contour_cache(args),
+            args.update_delay,
+            get_lod_voxels(args) if client is None else None,
+            args.profile,
+            client,
+        ),
+    )
     sys.exit(app.exec())
@@ -0,0 +1,241 @@
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import NotRequired, TypedDict
+
+from vtkmodules.util.numpy_support import vtk_to_numpy
+from vtkmodules.vtkIOImage import vtkPNGWriter
+from vtkmodules.vtkRenderingAnnotation import vtkScalarBarActor
+from vtkmodules.vtkRenderingCore import (
+    vtkActor,
+    vtkRenderer,
+    vtkRenderWindow,
+    vtkWindowToImageFilter,
+)
+
+from src.clipping import AXES_CLIP_MAX, get_axes_clip_filters
+from src.color_map import (
+    COLOR_MAP_ISOVALUE_DEFAULT,
+    build_lookup_table,
+    get_isovalue_points,
+    set_mapper_lookup_table,
+)
+from src.contour import ContourConfig
+from src.contour_cache import ContourCache, build_cached_contour_filter
+from src.isovalue import get_isovalue_mid
+from src.read_vti import ImageReader, read_vti
+from src.surface_mapper import build_surface_mapper
+from src.surface_store import SurfaceStoreConfig, build_surface_store
+from src.vtk_side_effects import import_for_rendering_core
+from src.vtk_widget import build_default_vtk_renderer
+from src.window import WINDOW_HEIGHT, WINDOW_WIDTH
+
+
+class CameraConfig(TypedDict, total=False):
+    position: tuple[float, float, float]
+    focal_point: tuple[float, float, float]
+    view_up: tuple[float, float, float]
+    # Applied in order after the camera above, in degrees and as a factor.
+    azimuth: float
+    elevation: float
+    zoom: float
+
+
+class BatchJob(TypedDict):
+    input: str
+    output: str
+    value: NotRequired[int]
+    clip: NotRequired[list[int]]
+    camera: NotRequired[CameraConfig]
+    size: NotRequired[tuple[int, int]]
+
+
+def read_jobs(filename: str) -> list[BatchJob]:
+    """Read the JSON list of jobs, each naming at least its input dataset and
+    output PNG."""
+    with open(filename, "r", encoding="utf-8") as f:
+        jobs = json.load(f)
+    for i, job in enumerate(jobs):
+        missing = [key for key in ("input", "output") if key not in job]
+        if missing:
+            raise ValueError(f"Job {i} of {filename} misses {', '.join(missing)}.")
+    return jobs
+
+
+def get_job_chunks(jobs: list[BatchJob], workers: int):
+    """Split the jobs into chunks sharing a dataset, small enough to keep every
+    worker busy and large enough to read each dataset as few times as possible."""
+    jobs_by_input: dict[str, list[BatchJob]] = {}
+    for job in jobs:
+        jobs_by_input.setdefault(job["input"], []).append(job)
+
+    chunks: list[list[BatchJob]] = []
+    for input_jobs in jobs_by_input.values():
+        chunk_size = math.ceil(len(input_jobs) / workers)
+        chunks += [
+            input_jobs[start : start + chunk_size]
+            for start in range(0, len(input_jobs), chunk_size)
+        ]
+    return chunks
+
+
+def set_camera(renderer: vtkRenderer, camera_config: CameraConfig):
+    renderer.ResetCamera()
+    camera = renderer.GetActiveCamera()
+    if "position" in camera_config:
+        camera.SetPosition(*camera_config["position"])
+    if "focal_point" in camera_config:
+        camera.SetFocalPoint(*camera_config["focal_point"])
+    if "view_up" in camera_config:
+        camera.SetViewUp(*camera_config["view_up"])
+    if "azimuth" in camera_config:
+        camera.Azimuth(camera_config["azimuth"])
+    if "elevation" in camera_config:
+        camera.Elevation(camera_config["elevation"])
+    if "zoom" in camera_config:
+        camera.Zoom(camera_config["zoom"])
+    renderer.ResetCameraClippingRange()
+
+
+class IsosurfaceScene:
+    """The isosurface of a dataset colored by isovalue, as shown by
+    `isosurface.py`, rendered into an offscreen window."""
+
+    def __init__(
+        self,
+        data_filename: str,
+        contour_config: ContourConfig,
+        cache: ContourCache,
+        reader: ImageReader | None = None,
+    ):
+        self.reader = reader or read_vti(
+            data_filename, stream_slab=contour_config["stream_slab"]
+        )
+        self.isovalue_mid = get_isovalue_mid(self.reader)
+
+        contour_input, clip_filter, self.set_clips = get_axes_clip_filters(
+            self.reader, contour_config["voi_clip"]
+        )
+        self.contour_filter = build_cached_contour_filter(contour_config, cache)
+        self.contour_filter.SetValue(0, self.isovalue_mid)
+        self.contour_filter.SetInputConnection(contour_input.GetOutputPort())
+        clip_filter.SetInputConnection(self.contour_filter.GetOutputPort())
+
+        lut = build_lookup_table(get_isovalue_points(COLOR_MAP_ISOVALUE_DEFAULT))
+
+        mapper = build_surface_mapper(clip_filter.GetOutputPort())
+        set_mapper_lookup_table(mapper, lut)
+
+        actor = vtkActor()
+        actor.SetMapper(mapper)
+
+        scalar_bar = vtkScalarBarActor()
+        scalar_bar.SetLookupTable(lut)
+
+        self.renderer = build_default_vtk_renderer([actor], [scalar_bar])
+        self.window = vtkRenderWindow()
+        self.window.SetOffScreenRendering(True)
+        self.window.AddRenderer(self.renderer)
+
+    def set_job(self, job: BatchJob):
+        self.contour_filter.SetValue(0, job.get("value", self.isovalue_mid))
+        self.set_clips(*job.get("clip", AXES_CLIP_MAX))
+        self.window.SetSize(*job.get("size", (WINDOW_WIDTH, WINDOW_HEIGHT)))
+        set_camera(self.renderer, job.get("camera", CameraConfig()))
+
+    def write_png(self, job: BatchJob, writer: vtkPNGWriter):
+        self.set_job(job)
+        self.window.Render()
+
+        window_to_image = vtkWindowToImageFilter()
+        window_to_image.SetInput(self.window)
+        window_to_image.ReadFrontBufferOff()
+        writer.SetInputConnection(window_to_image.GetOutputPort())
+        writer.Write()
+
+    def render(self, job: BatchJob):
+        writer = vtkPNGWriter()
+        writer.SetFileName(job["output"])
+        self.write_png(job, writer)
+
+    def render_to_memory(self, job: BatchJob) -> bytes:
+        """Render the job ignoring its output, returning the PNG instead."""
+        writer = vtkPNGWriter()
+        writer.SetWriteToMemory(True)
+        self.write_png(job, writer)
+        return vtk_to_numpy(writer.GetResult()).tobytes()
+
+
+class BatchRenderer:
+    """Render jobs, keeping the scene of every dataset seen so far so later jobs
+    reuse its volume and the isosurfaces already extracted from it."""
+
+    def __init__(
+        self,
+        contour_config: ContourConfig,
+        cache_size: int,
+        store_config: SurfaceStoreConfig | None = None,
+    ):
+        self.contour_config = contour_config
+        self.cache = ContourCache(cache_size, build_surface_store(store_config))
+        self.scenes: dict[str, IsosurfaceScene] = {}
+
+    def get_scene(self, data_filename: str, reader: ImageReader | None = None):
+        if data_filename not in self.scenes:
+            self.scenes[data_filename] = IsosurfaceScene(
+                data_filename, self.contour_config, self.cache, reader
+            )
+        return self.scenes[data_filename]
+
+    def render(self, jobs: list[BatchJob]):
+        for job in jobs:
+            self.get_scene(job["input"]).render(job)
+        return [job["output"] for job in jobs]
+
+
+# Each worker process keeps its own renderer across the chunks it is given.
+_worker_renderer: BatchRenderer | None = None
+
+
+def _init_worker(
+    contour_config: ContourConfig,
+    cache_size: int,
+    store_config: SurfaceStoreConfig | None,
+):
+    global _worker_renderer  # pylint: disable=global-statement
+    import_for_rendering_core()
+    _worker_renderer = BatchRenderer(contour_config, cache_size, store_config)
+
+
+def _render_chunk(jobs: list[BatchJob]):
+    assert _worker_renderer is not None
+    return _worker_renderer.render(jobs)
+
+
+def render_jobs(
+    jobs: list[BatchJob],
+    contour_config: ContourConfig,
+    cache_size: int,
+    workers: int,
+    store_config: SurfaceStoreConfig | None = None,
+):
+    """Render the jobs on a pool of worker processes, yielding the written
+    filenames as their chunks finish. The processes share the surface store."""
+    if workers <= 1:
+        import_for_rendering_core()
+        yield from BatchRenderer(contour_config, cache_size, store_config).render(jobs)
+        return
+
+    # Share the CPUs between the processes instead of giving each all of them.
+    if contour_config["workers"] == 0:
+        contour_config = ContourConfig(
+            **{**contour_config, "workers": max((os.cpu_count() or 1) // workers, 1)}
+        )
+    with ProcessPoolExecutor(
+        workers,
+        initializer=_init_worker,
+        initargs=(contour_config, cache_size, store_config),
+    ) as executor:
+        for outputs in executor.map(_render_chunk, get_job_chunks(jobs, workers)):
+            yield from outputs
@@ -1,11 +1,23 @@
 import argparse
+import math
 from typing import Callable, TypedDict
 
 from PySide6.QtCore import Qt
 from PySide6.QtWidgets import QGridLayout, QLabel, QSlider
-from vtkmodules.qt.QVTKRenderWindowInteractor import QVTKRenderWindowInteractor
-from vtkmodules.vtkCommonDataModel import vtkPlanes
+from vtkmodules.util.vtkAlgorithm import VTKPythonAlgorithmBase
+from vtkmodules.vtkCommonCore import vtkInformation, vtkInformationVector
+from vtkmodules.vtkCommonDataModel import (
+    vtkDataObject,
+    vtkImageData,
+    vtkPlanes,
+    vtkPolyData,
+)
+from vtkmodules.vtkCommonExecutionModel import (
+    vtkAlgorithm,
+    vtkStreamingDemandDrivenPipeline,
+)
 from vtkmodules.vtkFiltersCore import vtkClipPolyData
+from vtkmodules.vtkImagingCore import vtkExtractVOI
 
 
 class AxesClipConfig(TypedDict):
@@ -73,35 +85,197 @@ def build_axes_clip_sliders(
 
 
 def get_axes_clip_filter():
-    def change_axes_clips(
-        widget: QVTKRenderWindowInteractor, x: float, y: float, z: float
-    ):
-        clip_planes.SetBounds(
-            AXES_CLIP_MIN[0] - 1,
-            x,
-            AXES_CLIP_MIN[1] - 1,
-            y,
-            AXES_CLIP_MIN[2] - 1,
-            z,
-        )
-        widget.GetRenderWindow().Render()
+    def set_axes_clips(x: float, y: float, z: float):
+        clip_planes.SetBounds(*get_axes_clip_bounds(x, y, z))
 
     clip_planes = vtkPlanes()
-    clip_planes.SetBounds(
-        AXES_CLIP_MIN[0] - 1,
-        AXES_CLIP_MAX[0],
-        AXES_CLIP_MIN[1] - 1,
-        AXES_CLIP_MAX[1],
-        AXES_CLIP_MIN[2] - 1,
-        AXES_CLIP_MAX[2],
-    )
+    clip_planes.SetBounds(*get_axes_clip_bounds(*AXES_CLIP_MAX))
 
     clip_filter = vtkClipPolyData()
     clip_filter.SetClipFunction(clip_planes)
     clip_filter.SetInsideOut(True)
     clip_filter.SetGenerateClipScalars(False)
 
-    return clip_filter, change_axes_clips
+    return clip_filter, set_axes_clips
+
+
+def get_axes_clip_bounds(x: float, y: float, z: float):
+    return (
+        AXES_CLIP_MIN[0] - 1,
+        x,
+        AXES_CLIP_MIN[1] - 1,
+        y,
+        AXES_CLIP_MIN[2] - 1,
+        z,
+    )
+
+
+def get_voi(
+    bounds: tuple[float, float, float, float, float, float],
+    whole_extent: tuple[int, int, int, int, int, int],
+    origin: tuple[float, float, float],
+    spacing: tuple[float, float, float],
+):
+    """Return the smallest extent whose cells cover the bounds."""
+    voi: list[int] = []
+    for axis in range(3):
+        low = math.floor((bounds[2 * axis] - origin[axis]) / spacing[axis])
+        high = math.ceil((bounds[2 * axis + 1] - origin[axis]) / spacing[axis])
+        extent_min, extent_max = whole_extent[2 * axis : 2 * axis + 2]
+        low = min(max(low, extent_min), extent_max)
+        high = min(max(high, low), extent_max)
+        voi += [low, high]
+    return tuple(voi)
+
+
+class AxesTrimFilter(VTKPythonAlgorithmBase):
+    """Clip a surface to the axes clip box, passing it through untouched when it
+    already lies inside the box."""
+
+    def __init__(self):
+        super().__init__(
+            nInputPorts=1,
+            inputType="vtkPolyData",
+            nOutputPorts=1,
+            outputType="vtkPolyData",
+        )
+        self.clip_planes = vtkPlanes()
+        self.clip_planes.SetBounds(*get_axes_clip_bounds(*AXES_CLIP_MAX))
+        self.clip_filter = vtkClipPolyData()
+        self.clip_filter.SetClipFunction(self.clip_planes)
+        self.clip_filter.SetInsideOut(True)
+        self.clip_filter.SetGenerateClipScalars(False)
+        self.bounds = get_axes_clip_bounds(*AXES_CLIP_MAX)
+
+    # pylint: disable=invalid-name
+    def SetBounds(self, *bounds: float):
+        if self.bounds != bounds:
+            self.bounds = bounds
+            self.clip_planes.SetBounds(*bounds)
+            self.Modified()
+
+    def RequestData(
+        self,
+        request: vtkInformation,
+        inInfo: tuple[vtkInformationVector],
+        outInfo: vtkInformationVector,
+    ):
+        surface = vtkPolyData.GetData(inInfo[0])
+        output = vtkPolyData.GetData(outInfo)
+
+        surface_bounds = surface.GetBounds()
+        if surface.GetNumberOfPoints() == 0 or all(
+            self.bounds[2 * axis] <= surface_bounds[2 * axis]
+            and surface_bounds[2 * axis + 1] <= self.bounds[2 * axis + 1]
+            for axis in range(3)
+        ):
+            output.ShallowCopy(surface)
+            return 1
+
+        self.clip_filter.SetInputData(surface)
+        self.clip_filter.Update()
+        output.ShallowCopy(self.clip_filter.GetOutput())
+        return 1
+
+
+class AxesVOIFilter(VTKPythonAlgorithmBase):
+    """Crop image data to the smallest extent covering the axes clip box.
+
+    The extent is derived from the input geometry on every update, so the
+    filter follows inputs whose resolution changes (e.g. level of detail).
+    """
+
+    def __init__(self):
+        super().__init__(
+            nInputPorts=1,
+            inputType="vtkImageData",
+            nOutputPorts=1,
+            outputType="vtkImageData",
+        )
+        self.bounds = get_axes_clip_bounds(*AXES_CLIP_MAX)
+
+    # pylint: disable=invalid-name
+    def SetBounds(self, *bounds: float):
+        if self.bounds != bounds:
+            self.bounds = bounds
+            self.Modified()
+
+    def GetVOI(self, image_info: vtkInformation):
+        return get_voi(
+            self.bounds,
+            image_info.Get(vtkStreamingDemandDrivenPipeline.WHOLE_EXTENT()),
+            image_info.Get(vtkDataObject.ORIGIN()),
+            image_info.Get(vtkDataObject.SPACING()),
+        )
+
+    def RequestInformation(
+        self,
+        request: vtkInformation,
+        inInfo: tuple[vtkInformationVector],
+        outInfo: vtkInformationVector,
+    ):
+        outInfo.GetInformationObject(0).Set(
+            vtkStreamingDemandDrivenPipeline.WHOLE_EXTENT(),
+            self.GetVOI(inInfo[0].GetInformationObject(0)),
+            6,
+        )
+        return 1
+
+    def RequestUpdateExtent(
+        self,
+        request: vtkInformation,
+        inInfo: tuple[vtkInformationVector],
+        outInfo: vtkInformationVector,
+    ):
+        # Request the whole volume so moving the clip box never re-reads it.
+        image_info = inInfo[0].GetInformationObject(0)
+        image_info.Set(
+            vtkStreamingDemandDrivenPipeline.UPDATE_EXTENT(),
+            image_info.Get(vtkStreamingDemandDrivenPipeline.WHOLE_EXTENT()),
+            6,
+        )
+        return 1
+
+    def RequestData(
+        self,
+        request: vtkInformation,
+        inInfo: tuple[vtkInformationVector],
+        outInfo: vtkInformationVector,
+    ):
+        voi_filter = vtkExtractVOI()
+        voi_filter.SetInputData(vtkImageData.GetData(inInfo[0]))
+        voi_filter.SetVOI(*self.GetVOI(inInfo[0].GetInformationObject(0)))
+        voi_filter.Update()
+        vtkImageData.GetData(outInfo).ShallowCopy(voi_filter.GetOutput())
+        return 1
+
+
+def get_axes_voi_clip_filters(image_source: vtkAlgorithm):
+    def set_axes_clips(x: float, y: float, z: float):
+        bounds = get_axes_clip_bounds(x, y, z)
+        voi_filter.SetBounds(*bounds)
+        trim_filter.SetBounds(*bounds)
+
+    voi_filter = AxesVOIFilter()
+    voi_filter.SetInputConnection(image_source.GetOutputPort())
+    trim_filter = AxesTrimFilter()
+
+    return voi_filter, trim_filter, set_axes_clips
+
+
+def get_axes_clip_filters(image_source: vtkAlgorithm, voi_clip: bool):
+    """Return the algorithm to contour, the filter clipping the contour output
+    and the function setting the clip values.
+
+    With `voi_clip`, the volume is cropped to the clip box before contouring and
+    the isosurface only needs trimming when the box does not end on grid
+    points.
+    """
+    if not voi_clip:
+        clip_filter, set_axes_clips = get_axes_clip_filter()
+        return image_source, clip_filter, set_axes_clips
+
+    return get_axes_voi_clip_filters(image_source)
 
 
 # pylint: disable=too-many-arguments
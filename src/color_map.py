@@ -1,6 +1,17 @@
+import functools
 from typing import TypedDict
 
-from vtkmodules.vtkRenderingCore import vtkColorTransferFunction
+import numpy as np
+import numpy.typing as npt
+from vtkmodules.util.numpy_support import numpy_to_vtk
+from vtkmodules.vtkCommonCore import vtkLookupTable
+from vtkmodules.vtkRenderingCore import vtkMapper
+
+COLOR_TABLE_SIZE = 256
+COLOR_TABLE_CACHE_SIZE = 16
+
+# Scalar values in increasing order with their RGB colors.
+ColorPoints = tuple[tuple[float, tuple[float, float, float]], ...]
 
 
 class IsovalueColorMapping(TypedDict):
@@ -36,30 +47,97 @@ COLOR_MAP_ISOVALUE_DEFAULT: dict[str, IsovalueColorMapping] = {
 }
 
 
-def get_inferno16_color_map(scale_range: tuple[float, float]):
-    colors = (
-        (0.001462, 0.000466, 0.013866),
-        (0.046915, 0.030324, 0.150164),
-        (0.142378, 0.046242, 0.308553),
-        (0.258234, 0.038571, 0.406485),
-        (0.366529, 0.071579, 0.431994),
-        (0.472328, 0.110547, 0.428334),
-        (0.578304, 0.148039, 0.404411),
-        (0.682656, 0.189501, 0.360757),
-        (0.780517, 0.243327, 0.299523),
-        (0.865006, 0.316822, 0.226055),
-        (0.929644, 0.411479, 0.145367),
-        (0.970919, 0.522853, 0.058367),
-        (0.987622, 0.64532, 0.039886),
-        (0.978806, 0.774545, 0.176037),
-        (0.950018, 0.903409, 0.380271),
-        (0.988362, 0.998364, 0.644924),
+INFERNO16_COLORS = (
+    (0.001462, 0.000466, 0.013866),
+    (0.046915, 0.030324, 0.150164),
+    (0.142378, 0.046242, 0.308553),
+    (0.258234, 0.038571, 0.406485),
+    (0.366529, 0.071579, 0.431994),
+    (0.472328, 0.110547, 0.428334),
+    (0.578304, 0.148039, 0.404411),
+    (0.682656, 0.189501, 0.360757),
+    (0.780517, 0.243327, 0.299523),
+    (0.865006, 0.316822, 0.226055),
+    (0.929644, 0.411479, 0.145367),
+    (0.970919, 0.522853, 0.058367),
+    (0.987622, 0.64532, 0.039886),
+    (0.978806, 0.774545, 0.176037),
+    (0.950018, 0.903409, 0.380271),
+    (0.988362, 0.998364, 0.644924),
+)
+
+
+def get_inferno16_points(scale_range: tuple[float, float]) -> ColorPoints:
+    return tuple(
+        (
+            scale_range[0]
+            + i * (scale_range[1] - scale_range[0]) / (len(INFERNO16_COLORS) - 1),
+            color,
+        )
+        for i, color in enumerate(INFERNO16_COLORS)
     )
-    ctf = vtkColorTransferFunction()
-    for i, color in enumerate(colors):
-        ctf.AddRGBPoint(
-            scale_range[0] + i * (scale_range[1] - scale_range[0]) / (len(colors) - 1),
-            *color
+
+
+def get_isovalue_points(mappings: dict[str, IsovalueColorMapping]) -> ColorPoints:
+    return tuple((mapping["value"], mapping["color"]) for mapping in mappings.values())
+
+
+def get_value_points(color_map: dict[int, tuple[float, float, float]]) -> ColorPoints:
+    return tuple(sorted(color_map.items()))
+
+
+@functools.lru_cache(maxsize=COLOR_TABLE_CACHE_SIZE)
+def bake_color_table(
+    points: ColorPoints, size: int = COLOR_TABLE_SIZE
+) -> npt.NDArray[np.uint8]:
+    """Sample the piecewise linear color map at `size` evenly spaced values from
+    its first to its last point into a read-only RGBA table, once per map."""
+    values = np.array([value for value, _ in points], dtype=np.float64)
+    colors = np.array([color for _, color in points], dtype=np.float64)
+    samples = np.linspace(values[0], values[-1], size)
+
+    table = np.full((size, 4), 255, dtype=np.uint8)
+    for channel in range(3):
+        table[:, channel] = np.round(
+            np.interp(samples, values, colors[:, channel]) * 255
         )
+    table.flags.writeable = False
+    return table
+
+
+def map_scalars(
+    table: npt.NDArray[np.uint8],
+    scalar_range: tuple[float, float],
+    scalars: npt.NDArray[np.generic],
+) -> npt.NDArray[np.uint8]:
+    """Return the RGBA color of each scalar, clamped to the range, as the lookup
+    table built from the same table maps it."""
+    low, high = scalar_range
+    # Same binning as vtkLookupTable.
+    scale = len(table) / (high - low) if high > low else 0.0
+    indexes = np.clip(np.floor((scalars - low) * scale), 0, len(table) - 1)
+    return table[indexes.astype(np.intp)]
+
+
+def build_lookup_table(points: ColorPoints, size: int = COLOR_TABLE_SIZE):
+    """Build the lookup table of the baked color map, which maps scalars with a
+    single table lookup instead of searching the points like
+    `vtkColorTransferFunction`."""
+    lut = vtkLookupTable()
+    # SetTable copies the baked table (a few KiB) into an array of its own, so
+    # the baked one is only wrapped for the call.
+    lut.SetTable(numpy_to_vtk(bake_color_table(points, size), deep=False))
+    lut.SetRange(points[0][0], points[-1][0])
+    return lut
+
+
+def get_inferno16_color_map(scale_range: tuple[float, float]):
+    return build_lookup_table(get_inferno16_points(scale_range))
+
 
-    return ctf
+def set_mapper_lookup_table(mapper: vtkMapper, lut: vtkLookupTable):
+    """Color the mapper input by the lookup table over its own range,
+    interpolating the scalars across the triangles in texture space."""
+    mapper.SetLookupTable(lut)
+    mapper.UseLookupTableScalarRangeOn()
+    mapper.InterpolateScalarsBeforeMappingOn()
@@ -0,0 +1,118 @@
+import argparse
+from typing import TypedDict
+
+from src.flying_edges import FlyingEdgesContourFilter
+from src.span_space import (
+    BRICK_SIZE_DEFAULT,
+    SpanSpaceContourFilter,
+    SpanSpaceIndexCache,
+)
+from src.streaming import StreamingContourFilter
+
+ContourFilter = (
+    FlyingEdgesContourFilter | SpanSpaceContourFilter | StreamingContourFilter
+)
+
+
+class ContourConfig(TypedDict):
+    brick_size: int
+    # Interpolate the gradient magnitude at the vertices during extraction
+    # instead of probing the gradient volume afterwards.
+    vertex_gradient: bool
+    # Crop the volume to the axes clip box before extraction instead of clipping
+    # the extracted isosurface.
+    voi_clip: bool
+    # Read and contour the volume this many Z layers at a time instead of
+    # loading it whole (0 to load it).
+    stream_slab: int
+    # Threads contouring the bricks of the span-space index (0 for one per
+    # CPU).
+    workers: int
+
+
+CONTOUR_CONFIG_DEFAULT = ContourConfig(
+    brick_size=0,
+    vertex_gradient=False,
+    voi_clip=False,
+    stream_slab=0,
+    workers=0,
+)
+
+
+def add_contour_args(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--brick-size",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Contour only the bricks of N voxels whose min/max range contains "
+        f"an isovalue (e.g. {BRICK_SIZE_DEFAULT}; 0, the default, to contour "
+        "the whole volume)",
+    )
+    parser.add_argument(
+        "--vertex-gradient",
+        action="store_true",
+        help="Interpolate the gradient magnitude at the isosurface vertices "
+        "during extraction instead of probing the gradient volume",
+    )
+    parser.add_argument(
+        "--voi-clip",
+        action="store_true",
+        help="Crop the volume to the clip values before extraction instead of "
+        "clipping the extracted isosurface",
+    )
+    parser.add_argument(
+        "--stream-slab",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Read and contour the volumes N Z layers at a time to bound memory "
+        "by the slab instead of the volume (implies --vertex-gradient and "
+        "disables --voi-clip, --lod and the isosurface cache)",
+    )
+    parser.add_argument(
+        "--contour-workers",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Set the number of threads contouring the bricks of the volume "
+        "(0 for one per CPU)",
+    )
+
+
+def get_contour_config(args: argparse.Namespace):
+    # Probing and cropping both need the whole volume.
+    return ContourConfig(
+        brick_size=args.brick_size,
+        vertex_gradient=args.vertex_gradient or args.stream_slab > 0,
+        voi_clip=args.voi_clip and args.stream_slab == 0,
+        stream_slab=args.stream_slab,
+        workers=args.contour_workers,
+    )
+
+
+def get_surface_config(config: ContourConfig):
+    """Return the fields of the config the extracted surfaces depend on besides
+    the input: the extractor, which sets the point arrays and their order,
+    whether the gradient is interpolated at the vertices and whether the input
+    is cropped. The level of detail changes the geometry of the input, which
+    its digest covers already."""
+    return {
+        "brick_size": config["brick_size"],
+        "vertex_gradient": config["vertex_gradient"],
+        "voi_clip": config["voi_clip"],
+    }
+
+
+def build_contour_filter(
+    config: ContourConfig, index_cache: SpanSpaceIndexCache | None = None
+) -> ContourFilter:
+    """Build the filter extracting isosurfaces, sharing the span-space indexes
+    of `index_cache` with other filters when given."""
+    if config["stream_slab"] > 0:
+        return StreamingContourFilter(config["stream_slab"])
+    if config["brick_size"] > 0:
+        return SpanSpaceContourFilter(
+            config["brick_size"], index_cache, config["workers"] or None
+        )
+    return FlyingEdgesContourFilter()
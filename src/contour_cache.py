@@ -0,0 +1,197 @@
+import argparse
+from collections import OrderedDict
+from collections.abc import Hashable
+
+from vtkmodules.vtkCommonCore import vtkInformation, vtkInformationVector
+from vtkmodules.vtkCommonDataModel import vtkImageData, vtkPolyData
+
+from src.clipping import AxesVOIFilter
+from src.contour import (
+    CONTOUR_CONFIG_DEFAULT,
+    ContourConfig,
+    ContourFilter,
+    build_contour_filter,
+    get_surface_config,
+)
+from src.contour_values import ContourValuesFilter
+from src.span_space import SpanSpaceIndexCache
+from src.streaming import StreamingContourFilter
+from src.surface_store import (
+    SURFACE_STORE_SIZE_DEFAULT,
+    ImageDigestCache,
+    SurfaceStore,
+    build_surface_store,
+    get_surface_store_config,
+)
+
+CONTOUR_CACHE_SIZE_DEFAULT = 512
+
+
+def add_contour_cache_args(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=CONTOUR_CACHE_SIZE_DEFAULT,
+        metavar="MB",
+        help="Set the memory budget of the extracted isosurface cache (0 to disable)",
+    )
+    parser.add_argument(
+        "--surface-store",
+        metavar="DIR",
+        help="Save extracted isosurfaces to DIR and load them from it on later "
+        "launches instead of extracting them again",
+    )
+    parser.add_argument(
+        "--surface-store-size",
+        type=int,
+        default=SURFACE_STORE_SIZE_DEFAULT,
+        metavar="MB",
+        help="Set the size budget of the isosurface store, deleting the least "
+        "recently used isosurfaces beyond it",
+    )
+
+
+class ContourCache:
+    """LRU cache of extracted isosurfaces keyed by isovalues and the content of
+    the input, backed by the surface store when given one."""
+
+    def __init__(
+        self,
+        memory_budget: int = CONTOUR_CACHE_SIZE_DEFAULT,
+        store: SurfaceStore | None = None,
+    ):
+        # VTK reports memory sizes in kibibytes.
+        self.memory_budget_kb = memory_budget * 1024
+        self.memory_kb = 0
+        self.store = store
+        self.image_digests = ImageDigestCache()
+        self._entries: OrderedDict[Hashable, vtkPolyData] = OrderedDict()
+
+    def __contains__(self, key: Hashable):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Hashable):
+        polydata = self._entries.get(key)
+        if polydata is not None:
+            self._entries.move_to_end(key)
+        return polydata
+
+    def put(self, key: Hashable, polydata: vtkPolyData):
+        if key in self._entries:
+            self.memory_kb -= self._entries.pop(key).GetActualMemorySize()
+
+        size_kb = polydata.GetActualMemorySize()
+        if size_kb > self.memory_budget_kb:
+            return
+
+        self._entries[key] = polydata
+        self.memory_kb += size_kb
+        while self.memory_kb > self.memory_budget_kb:
+            _, evicted = self._entries.popitem(last=False)
+            self.memory_kb -= evicted.GetActualMemorySize()
+
+    def clear(self):
+        self._entries.clear()
+        self.memory_kb = 0
+
+
+class CachedContourFilter(ContourValuesFilter):
+    """Contour image data, reusing the surfaces already extracted at the same
+    isovalues from the same input content."""
+
+    def __init__(
+        self,
+        contour_filter: ContourFilter,
+        cache: ContourCache,
+        config: ContourConfig = CONTOUR_CONFIG_DEFAULT,
+    ):
+        super().__init__()
+        self.contour_filter = contour_filter
+        self.cache = cache
+        # Filters of other configs sharing the cache or the store extract
+        # other surfaces from the same input.
+        self.surface_config = get_surface_config(config)
+
+    # pylint: disable=invalid-name
+    def RequestData(
+        self,
+        request: vtkInformation,
+        inInfo: tuple[vtkInformationVector],
+        outInfo: vtkInformationVector,
+    ):
+        image = vtkImageData.GetData(inInfo[0])
+        output = vtkPolyData.GetData(outInfo)
+        if not self.values:
+            output.ShallowCopy(vtkPolyData())
+            return 1
+
+        values = tuple(self.get_values())
+        # The digest covers the geometry and the point arrays, so volumes of
+        # the same geometry never share surfaces, while the same extent of a
+        # volume cropped or downsampled again still hits the cache.
+        image_digest = self.get_image_digest(image)
+        key = (values, image_digest, tuple(self.surface_config.items()))
+        polydata = self.cache.get(key)
+        if polydata is None:
+            polydata = self.load_or_extract(image, image_digest, values)
+            self.cache.put(key, polydata)
+        output.ShallowCopy(polydata)
+        return 1
+
+    def get_image_digest(self, image: vtkImageData):
+        """Return the digest of the input, derived from the volume and the
+        extent it was cropped to by `AxesVOIFilter` if so."""
+        producer = self.GetInputAlgorithm()
+        if isinstance(producer, AxesVOIFilter):
+            return self.cache.image_digests.get_cropped(
+                producer.GetInputDataObject(0, 0), image.GetExtent()
+            )
+        return self.cache.image_digests.get(image)
+
+    def load_or_extract(
+        self, image: vtkImageData, image_digest: str, values: tuple[float, ...]
+    ):
+        """Load the surface from the store, or extract it and store it."""
+        store = self.cache.store
+        store_key = (
+            store.get_key(image_digest, values, self.surface_config)
+            if store is not None
+            else ""
+        )
+        if store is not None:
+            polydata = store.get(store_key)
+            if polydata is not None:
+                return polydata
+
+        self.contour_filter.SetInputDataObject(0, image)
+        self.contour_filter.SetNumberOfContours(len(values))
+        for i, value in enumerate(values):
+            self.contour_filter.SetValue(i, value)
+        self.contour_filter.Update()
+        polydata = vtkPolyData()
+        polydata.DeepCopy(self.contour_filter.GetOutputDataObject(0))
+        if store is not None:
+            store.put(store_key, polydata)
+        return polydata
+
+
+def build_contour_cache(args: argparse.Namespace):
+    return ContourCache(
+        args.cache_size, build_surface_store(get_surface_store_config(args))
+    )
+
+
+def build_cached_contour_filter(
+    config: ContourConfig,
+    cache: ContourCache,
+    index_cache: SpanSpaceIndexCache | None = None,
+):
+    """Build the filter of `build_contour_filter` behind the cache, except when
+    streaming since the cache takes the whole volume as input."""
+    contour_filter = build_contour_filter(config, index_cache)
+    if isinstance(contour_filter, StreamingContourFilter):
+        return contour_filter
+    return CachedContourFilter(contour_filter, cache, config)
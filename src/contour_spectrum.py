@@ -0,0 +1,310 @@
+import argparse
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, TypedDict
+
+import numpy as np
+import numpy.typing as npt
+from PySide6.QtCore import QPointF, Qt
+from PySide6.QtGui import QColor, QMouseEvent, QPainter, QPaintEvent, QPen, QPolygonF
+from PySide6.QtWidgets import QWidget
+from vtkmodules.vtkCommonDataModel import vtkImageData
+
+from src.gradient import compute_gradient_magnitude
+from src.read_vti import ImageReader, RemoteVolumeReader, StreamingVolumeReader
+from src.span_space import get_image_scalars
+
+CONTOUR_SPECTRUM_SAMPLES_DEFAULT = 256
+CONTOUR_SPECTRUM_SLAB_SIZE = 16
+CONTOUR_SPECTRUM_PLOT_SIZE = (256, 64)
+CONTOUR_SPECTRUM_BOUNDARIES = 3
+CONTOUR_SPECTRUM_COLORS = {
+    "cell_counts": Qt.GlobalColor.yellow,
+    "areas": Qt.GlobalColor.cyan,
+    "mean_gradients": Qt.GlobalColor.magenta,
+}
+
+
+class ContourSpectrum(TypedDict):
+    # Isovalues evenly sampling the scalar range, both ends included.
+    values: npt.NDArray[np.float64]
+    # Cells the isosurface of each value crosses, which its extraction cost
+    # grows with.
+    cell_counts: npt.NDArray[np.int64]
+    # Areas of the isosurfaces, estimated with the coarea formula from the
+    # gradient magnitude of the voxels near each value.
+    areas: npt.NDArray[np.float64]
+    # Gradient magnitudes averaged over the isosurfaces, peaking at material
+    # boundaries.
+    mean_gradients: npt.NDArray[np.float64]
+
+
+def add_contour_spectrum_args(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--spectrum",
+        type=int,
+        nargs="?",
+        const=CONTOUR_SPECTRUM_SAMPLES_DEFAULT,
+        metavar="SAMPLES",
+        help="Plot the crossed cells, area and mean gradient magnitude of the "
+        "isosurfaces of SAMPLES isovalues (default: "
+        f"{CONTOUR_SPECTRUM_SAMPLES_DEFAULT}) beside the isovalue slider, cached "
+        "next to the input (ignored with --stream-slab)",
+    )
+
+
+def get_contour_spectrum_cache_filename(data_filename: str, samples: int):
+    path = Path(data_filename)
+    return str(path.with_name(f"{path.stem}.spectrum{samples}.npz"))
+
+
+def get_cell_ranges(points: npt.NDArray[np.generic]):
+    """Return the minimum and maximum of the corners of every cell of the
+    (z, y, x) point values."""
+    mins = maxs = points
+    for axis in range(3):
+        if points.shape[axis] < 2:
+            continue
+        low = tuple(slice(None, -1) if i == axis else slice(None) for i in range(3))
+        high = tuple(slice(1, None) if i == axis else slice(None) for i in range(3))
+        mins = np.minimum(mins[low], mins[high])
+        maxs = np.maximum(maxs[low], maxs[high])
+    return mins, maxs
+
+
+def count_crossed_cells(
+    cell_mins: npt.NDArray[np.generic],
+    cell_maxs: npt.NDArray[np.generic],
+    values: npt.NDArray[np.float64],
+):
+    """Return the changes in the number of cells crossed from one isovalue to
+    the next, the first isovalue's count being its change from zero."""
+    low, step, samples = values[0], values[1] - values[0], len(values)
+    # The cell is crossed by every isovalue between its minimum and maximum,
+    # counted as +1 at the first one and -1 past the last one.
+    first = np.ceil((cell_mins.ravel() - low) / step).astype(np.int64)
+    last = np.floor((cell_maxs.ravel() - low) / step).astype(np.int64)
+    crossed = first <= last
+    changes = np.bincount(first[crossed], minlength=samples + 1) - np.bincount(
+        last[crossed] + 1, minlength=samples + 1
+    )
+    return changes[:samples]
+
+
+def sum_point_gradients(
+    scalars: npt.NDArray[np.generic],
+    gradients: npt.NDArray[np.generic],
+    values: npt.NDArray[np.float64],
+):
+    """Return the sums of the gradient magnitudes and of their squares over
+    the points nearest to each isovalue."""
+    low, step, samples = values[0], values[1] - values[0], len(values)
+    bins = np.clip(np.rint((scalars.ravel() - low) / step), 0, samples - 1).astype(
+        np.int64
+    )
+    point_gradients = gradients.ravel().astype(np.float64)
+    return (
+        np.bincount(bins, point_gradients, samples),
+        np.bincount(bins, np.square(point_gradients), samples),
+    )
+
+
+def compute_contour_spectrum(
+    image: vtkImageData,
+    gradient_image: vtkImageData | None = None,
+    samples: int = CONTOUR_SPECTRUM_SAMPLES_DEFAULT,
+    slab_size: int = CONTOUR_SPECTRUM_SLAB_SIZE,
+    workers: int | None = None,
+):
+    """Compute the spectrum of the isovalues sampling the scalar range, one Z
+    slab at a time on a thread pool. The gradient magnitude is computed when
+    not given."""
+    if gradient_image is None:
+        gradient_image = compute_gradient_magnitude(image, workers=workers)
+    scalars = get_image_scalars(image)
+    gradients = get_image_scalars(gradient_image)
+    low, high = image.GetScalarRange()
+    values = np.linspace(low, max(high, low + samples - 1), samples)
+
+    def compute_slab(z_start: int):
+        # The cells of the slab span one more point layer than its own points,
+        # which are disjoint from the other slabs' so no voxel counts twice.
+        z_end = min(z_start + slab_size, max(len(scalars) - 1, 0))
+        points_end = z_end if z_end < len(scalars) - 1 else len(scalars)
+        return (
+            count_crossed_cells(*get_cell_ranges(scalars[z_start : z_end + 1]), values),
+            *sum_point_gradients(
+                scalars[z_start:points_end], gradients[z_start:points_end], values
+            ),
+        )
+
+    with ThreadPoolExecutor(workers or os.cpu_count()) as executor:
+        count_changes, gradient_sums, squared_gradient_sums = np.sum(
+            list(
+                executor.map(
+                    compute_slab, range(0, max(len(scalars) - 1, 1), slab_size)
+                )
+            ),
+            axis=0,
+        )
+
+    # Coarea formula: the area of the isosurface is the integral of the
+    # gradient magnitude over the volume between neighbouring isovalues,
+    # divided by their difference.
+    return ContourSpectrum(
+        values=values,
+        cell_counts=np.cumsum(count_changes).astype(np.int64),
+        areas=gradient_sums * math.prod(image.GetSpacing()) / (values[1] - values[0]),
+        mean_gradients=np.divide(
+            squared_gradient_sums,
+            gradient_sums,
+            out=np.zeros(samples),
+            where=gradient_sums > 0,
+        ),
+    )
+
+
+def write_contour_spectrum(spectrum: ContourSpectrum, filename: str):
+    try:
+        np.savez(filename, **spectrum)
+    except OSError:
+        # Failing to write the cache only costs recomputing the spectrum.
+        pass
+
+
+def read_contour_spectrum(filename: str):
+    with np.load(filename) as arrays:
+        return ContourSpectrum(
+            values=arrays["values"],
+            cell_counts=arrays["cell_counts"],
+            areas=arrays["areas"],
+            mean_gradients=arrays["mean_gradients"],
+        )
+
+
+def get_contour_spectrum(
+    data_filename: str,
+    image: vtkImageData,
+    gradient_image: vtkImageData | None = None,
+    samples: int = CONTOUR_SPECTRUM_SAMPLES_DEFAULT,
+):
+    """Return the spectrum of the volume, read from the cache next to the
+    dataset unless the dataset is newer, and computed and cached otherwise."""
+    cache_filename = get_contour_spectrum_cache_filename(data_filename, samples)
+    if os.path.exists(cache_filename) and (
+        os.path.getmtime(cache_filename) >= os.path.getmtime(data_filename)
+    ):
+        return read_contour_spectrum(cache_filename)
+
+    spectrum = compute_contour_spectrum(image, gradient_image, samples)
+    write_contour_spectrum(spectrum, cache_filename)
+    return spectrum
+
+
+def get_contour_spectrum_loader(
+    load_reader: Callable[[Callable[[str, float], None]], ImageReader],
+    data_filename: str,
+    samples: int | None,
+):
+    """Wrap the function loading the volume for `show_loading_window` to
+    return the volume with its spectrum, or None without samples or for
+    streamed and remote volumes, whose voxels are not in memory."""
+
+    def load(on_progress: Callable[[str, float], None]):
+        reader = load_reader(on_progress)
+        if samples is None or isinstance(
+            reader, (StreamingVolumeReader, RemoteVolumeReader)
+        ):
+            return reader, None
+        reader.Update()
+        return reader, get_contour_spectrum(
+            data_filename, reader.GetOutputDataObject(0), samples=samples
+        )
+
+    return load
+
+
+def estimate_cell_count(spectrum: ContourSpectrum, value: float):
+    """Estimate the cells crossed by the isosurface of the value, to predict
+    the cost of extracting it."""
+    return float(np.interp(value, spectrum["values"], spectrum["cell_counts"]))
+
+
+def find_boundary_isovalues(
+    spectrum: ContourSpectrum, count: int = CONTOUR_SPECTRUM_BOUNDARIES
+):
+    """Return the isovalues of the highest local maxima of the mean gradient
+    magnitude, where isosurfaces follow material boundaries."""
+    gradients = spectrum["mean_gradients"]
+    padded = np.pad(gradients, 1, constant_values=-np.inf)
+    peaks = np.flatnonzero(
+        (gradients > padded[:-2]) & (gradients >= padded[2:]) & (gradients > 0)
+    )
+    peaks = peaks[np.argsort(gradients[peaks])[::-1][:count]]
+    return [float(spectrum["values"][peak]) for peak in sorted(peaks)]
+
+
+class ContourSpectrumPlot(QWidget):
+    """Plot the crossed cells (yellow), area (cyan) and mean gradient magnitude
+    (magenta) of the spectrum, each scaled to its maximum, with the boundary
+    isovalues (white) and the current one (red) marked. Clicking selects the
+    isovalue under the cursor."""
+
+    def __init__(
+        self,
+        spectrum: ContourSpectrum,
+        on_value_selected: Callable[[float], None],
+    ):
+        super().__init__()
+        self.spectrum = spectrum
+        self.on_value_selected = on_value_selected
+        self.value: float | None = None
+        self.boundaries = find_boundary_isovalues(spectrum)
+        self.setMinimumSize(*CONTOUR_SPECTRUM_PLOT_SIZE)
+
+    def set_value(self, value: float):
+        self.value = value
+        self.setToolTip(
+            "Crossed cells (yellow), area (cyan) and mean gradient magnitude "
+            f"(magenta) by isovalue, ~{estimate_cell_count(self.spectrum, value):.0f} "
+            "cells crossed at the current one"
+        )
+        self.update()
+
+    def to_x(self, value: float):
+        values = self.spectrum["values"]
+        return (value - values[0]) / ((values[-1] - values[0]) or 1) * self.width()
+
+    # pylint: disable=invalid-name unused-argument
+    def paintEvent(self, event: QPaintEvent):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(Qt.GlobalColor.black))
+        for key, color in CONTOUR_SPECTRUM_COLORS.items():
+            series = np.asarray(self.spectrum[key], dtype=np.float64)
+            scale = series.max() or 1.0
+            painter.setPen(QPen(color))
+            painter.drawPolyline(
+                QPolygonF(
+                    [
+                        QPointF(self.to_x(value), (1 - y / scale) * self.height())
+                        for value, y in zip(self.spectrum["values"], series)
+                    ]
+                )
+            )
+        painter.setPen(QPen(Qt.GlobalColor.white, 1, Qt.PenStyle.DotLine))
+        for boundary in self.boundaries:
+            x = self.to_x(boundary)
+            painter.drawLine(QPointF(x, 0), QPointF(x, self.height()))
+        if self.value is not None:
+            painter.setPen(QPen(Qt.GlobalColor.red))
+            x = self.to_x(self.value)
+            painter.drawLine(QPointF(x, 0), QPointF(x, self.height()))
+        painter.end()
+
+    # pylint: disable=invalid-name
+    def mousePressEvent(self, event: QMouseEvent):
+        values = self.spectrum["values"]
+        fraction = min(max(event.position().x() / self.width(), 0.0), 1.0)
+        self.on_value_selected(values[0] + fraction * (values[-1] - values[0]))
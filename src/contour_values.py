@@ -0,0 +1,32 @@
+from vtkmodules.util.vtkAlgorithm import VTKPythonAlgorithmBase
+
+
+class ContourValuesFilter(VTKPythonAlgorithmBase):  # pylint: disable=abstract-method
+    """Base of the filters contouring image data in place of
+    `vtkContourFilter`, holding the isovalues set as on `vtkContourFilter` for
+    the `RequestData` of subclasses."""
+
+    def __init__(self):
+        super().__init__(
+            nInputPorts=1,
+            inputType="vtkImageData",
+            nOutputPorts=1,
+            outputType="vtkPolyData",
+        )
+        self.values: dict[int, float] = {}
+
+    def SetValue(self, i: int, value: float):  # pylint: disable=invalid-name
+        if self.values.get(i) != value:
+            self.values[i] = value
+            self.Modified()
+
+    # pylint: disable=invalid-name
+    def SetNumberOfContours(self, number: int):
+        values = {i: value for i, value in self.values.items() if i < number}
+        if values != self.values:
+            self.values = values
+            self.Modified()
+
+    def get_values(self):
+        """Return the isovalues by index."""
+        return [self.values[i] for i in sorted(self.values)]
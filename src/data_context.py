@@ -0,0 +1,100 @@
+from typing import Callable, TypedDict
+
+from vtkmodules.vtkCommonExecutionModel import vtkAlgorithm
+
+from src.clipping import get_axes_clip_filters
+from src.contour import ContourConfig
+from src.contour_cache import ContourCache, build_cached_contour_filter
+from src.gradient import build_gradient_filter, get_contour_input
+from src.level_of_detail import get_level_of_detail_source
+from src.read_vti import ImageDataProducer, ImageReader, get_scalar_range
+from src.span_space import SpanSpaceIndexCache
+
+
+class DataContext(TypedDict):
+    """The volumes loaded once and shared by the pipelines of every actor."""
+
+    # The volume to extract isosurfaces from, downsampled while interacting
+    # when a level of detail is set.
+    contour_input: vtkAlgorithm
+    gradient_reader: ImageReader
+    scalar_range: tuple[float, float]
+    gradient_range: tuple[float, float]
+    span_space_indexes: SpanSpaceIndexCache
+
+
+def build_data_context(
+    isovalue_reader: ImageReader,
+    gradient_reader: ImageReader,
+    contour_config: ContourConfig,
+    lod_voxels: int | None,
+) -> tuple[DataContext, Callable[[bool], None]]:
+    """Read both volumes now and wrap what was read, so the pipelines built on
+    the context never execute the readers again however many there are.
+    Streamed volumes are left to be read slab by slab by each pipeline.
+
+    Return the context and the function switching its level of detail.
+    """
+    if contour_config["stream_slab"] > 0:
+        isovalue_source, gradient_source = isovalue_reader, gradient_reader
+    else:
+        isovalue_reader.Update()
+        gradient_reader.Update()
+        isovalue_source = ImageDataProducer(isovalue_reader.GetOutput())
+        gradient_source = ImageDataProducer(gradient_reader.GetOutput())
+
+    contour_input, set_interacting = get_level_of_detail_source(
+        get_contour_input(
+            isovalue_source, gradient_source, contour_config["vertex_gradient"]
+        ),
+        lod_voxels,
+    )
+
+    # Ranges are cached by the arrays once computed, so computing them here
+    # keeps the pipeline updater thread from racing to do it.
+    context = DataContext(
+        contour_input=contour_input,
+        gradient_reader=gradient_source,
+        scalar_range=get_scalar_range(isovalue_source),
+        gradient_range=get_scalar_range(gradient_source),
+        span_space_indexes=SpanSpaceIndexCache(),
+    )
+    if contour_config["brick_size"] > 0 and contour_config["stream_slab"] == 0:
+        context["span_space_indexes"].get(
+            contour_input.GetOutput(), contour_config["brick_size"]
+        )
+
+    return context, set_interacting
+
+
+def build_probed_isosurface(
+    context: DataContext,
+    values: list[int],
+    contour_config: ContourConfig,
+    contour_cache: ContourCache,
+):
+    """Build the pipeline extracting the isosurfaces of the values from the
+    context, clipping them by axes and giving them the gradient magnitude as
+    scalars.
+
+    Return the clip filter, the gradient filter ending the pipeline and the
+    function moving the clips.
+    """
+    contour_filter = build_cached_contour_filter(
+        contour_config, contour_cache, context["span_space_indexes"]
+    )
+    for i, value in enumerate(values):
+        contour_filter.SetValue(i, value)
+    contour_input, axes_clip_filter, set_axes_clips = get_axes_clip_filters(
+        context["contour_input"], contour_config["voi_clip"]
+    )
+    contour_filter.SetInputConnection(contour_input.GetOutputPort())
+
+    axes_clip_filter.SetInputConnection(contour_filter.GetOutputPort())
+
+    gradient_filter = build_gradient_filter(
+        context["gradient_reader"], contour_config["vertex_gradient"]
+    )
+    gradient_filter.SetInputConnection(axes_clip_filter.GetOutputPort())
+
+    return axes_clip_filter, gradient_filter, set_axes_clips
@@ -0,0 +1,47 @@
+from vtkmodules.vtkCommonCore import vtkInformation, vtkInformationVector
+from vtkmodules.vtkCommonDataModel import vtkImageData, vtkPolyData
+from vtkmodules.vtkFiltersCore import vtkContourFilter, vtkFlyingEdges3D
+
+from src.contour_values import ContourValuesFilter
+
+
+class FlyingEdgesContourFilter(ContourValuesFilter):
+    """Drop-in replacement of `vtkContourFilter` for image data extracting with
+    `vtkFlyingEdges3D`, which measured 3 to 4 times faster (see the README).
+
+    The other point arrays (e.g. the gradient magnitude) are interpolated at
+    the vertices as `vtkContourFilter` does. Images `vtkFlyingEdges3D` cannot
+    contour go through `vtkContourFilter` (see `contour_image`).
+    """
+
+    # pylint: disable=invalid-name
+    def RequestData(
+        self,
+        request: vtkInformation,
+        inInfo: tuple[vtkInformationVector],
+        outInfo: vtkInformationVector,
+    ):
+        image = vtkImageData.GetData(inInfo[0])
+        vtkPolyData.GetData(outInfo).ShallowCopy(
+            contour_image(image, self.get_values())
+        )
+        return 1
+
+
+def contour_image(image: vtkImageData, values: list[float]) -> vtkPolyData:
+    """Contour the image with `vtkFlyingEdges3D`, or with `vtkContourFilter`
+    when it is one point thick along an axis (e.g. cropped to a clip plane),
+    which `vtkFlyingEdges3D` rejects, or when its scalars are unnamed, which
+    `vtkFlyingEdges3D` interpolates into an empty array."""
+    scalars = image.GetPointData().GetScalars()
+    if min(image.GetDimensions()) > 1 and scalars is not None and scalars.GetName():
+        contour_filter = vtkFlyingEdges3D()
+        contour_filter.InterpolateAttributesOn()
+    else:
+        contour_filter = vtkContourFilter()
+    contour_filter.SetNumberOfContours(len(values))
+    for i, value in enumerate(values):
+        contour_filter.SetValue(i, value)
+    contour_filter.SetInputData(image)
+    contour_filter.Update()
+    return contour_filter.GetOutput()
@@ -0,0 +1,385 @@
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+from vtkmodules.util.numpy_support import numpy_to_vtk
+from vtkmodules.util.vtkAlgorithm import VTKPythonAlgorithmBase
+from vtkmodules.vtkCommonCore import vtkInformation, vtkInformationVector
+from vtkmodules.vtkCommonDataModel import vtkDataSetAttributes, vtkImageData
+from vtkmodules.vtkCommonExecutionModel import vtkStreamingDemandDrivenPipeline
+from vtkmodules.vtkFiltersCore import vtkAssignAttribute, vtkProbeFilter
+from vtkmodules.vtkIOXML import vtkXMLImageDataReader, vtkXMLImageDataWriter
+
+from src.read_vti import (
+    ImageDataProducer,
+    ImageReader,
+    ProgressCallback,
+    StreamingVolumeReader,
+    VolumeReader,
+    read_vti,
+)
+from src.span_space import get_image_scalars
+from src.streaming import Extent, crop_image, get_piece_extent, get_slab_count
+
+GRADIENT_ARRAY_NAME = "GradientMagnitude"
+GRADIENT_SLAB_SIZE_DEFAULT = 16
+
+
+def get_gradient_cache_filename(data_filename: str):
+    path = Path(data_filename)
+    return str(path.with_name(f"{path.stem}.gradmag.vti"))
+
+
+def compute_gradient_magnitude(
+    image: vtkImageData,
+    slab_size: int = GRADIENT_SLAB_SIZE_DEFAULT,
+    workers: int | None = None,
+):
+    """Compute the gradient magnitude of the point scalars with central
+    differences (one-sided on the boundary), one Z slab at a time."""
+    scalars = get_image_scalars(image)
+    x_spacing, y_spacing, z_spacing = image.GetSpacing()
+    z_size = scalars.shape[0]
+    magnitude = np.empty(scalars.shape, dtype=np.float32)
+
+    def compute_slab(z_start: int):
+        z_end = min(z_start + slab_size, z_size)
+        # Pad the slab with its neighbouring slices so the differences on the
+        # slab faces are the same as over the whole volume.
+        halo_start = max(z_start - 1, 0)
+        halo_end = min(z_end + 1, z_size)
+        slab = scalars[halo_start:halo_end].astype(np.float32)
+        spacings = (z_spacing, y_spacing, x_spacing)
+        axes = tuple(axis for axis in range(3) if slab.shape[axis] > 1)
+        gradients = np.gradient(slab, *(spacings[axis] for axis in axes), axis=axes)
+        if len(axes) == 1:
+            gradients = [gradients]
+
+        squared_sum = np.zeros(slab.shape, dtype=np.float32)
+        for gradient in gradients:
+            squared_sum += np.square(gradient)
+        magnitude[z_start:z_end] = np.sqrt(
+            squared_sum[z_start - halo_start : z_end - halo_start]
+        )
+
+    with ThreadPoolExecutor(workers or os.cpu_count()) as executor:
+        # Consume the iterator to surface exceptions raised in the workers.
+        list(executor.map(compute_slab, range(0, z_size, slab_size)))
+
+    array = numpy_to_vtk(magnitude.ravel(), deep=False)
+    array.SetName(GRADIENT_ARRAY_NAME)
+
+    gradient_image = vtkImageData()
+    gradient_image.CopyStructure(image)
+    gradient_image.GetPointData().SetScalars(array)
+    return gradient_image
+
+
+class GradientMagnitudeFilter(VTKPythonAlgorithmBase):
+    """Compute the gradient magnitude of each piece requested downstream (e.g.
+    by a writer) from its Z slab of the input padded with one layer on both
+    sides, so the volume is never held whole."""
+
+    def __init__(self):
+        super().__init__(
+            nInputPorts=1,
+            inputType="vtkImageData",
+            nOutputPorts=1,
+            outputType="vtkImageData",
+        )
+        self._extent: Extent | None = None
+
+    # pylint: disable=invalid-name
+    def RequestUpdateExtent(
+        self,
+        request: vtkInformation,
+        inInfo: tuple[vtkInformationVector],
+        outInfo: vtkInformationVector,
+    ):
+        in_info = inInfo[0].GetInformationObject(0)
+        out_info = outInfo.GetInformationObject(0)
+        whole_extent = in_info.Get(vtkStreamingDemandDrivenPipeline.WHOLE_EXTENT())
+        self._extent = get_piece_extent(
+            whole_extent,
+            out_info.Get(vtkStreamingDemandDrivenPipeline.UPDATE_PIECE_NUMBER()),
+            out_info.Get(vtkStreamingDemandDrivenPipeline.UPDATE_NUMBER_OF_PIECES()),
+        )
+        in_info.Set(
+            vtkStreamingDemandDrivenPipeline.UPDATE_EXTENT(),
+            (
+                *self._extent[:4],
+                max(self._extent[4] - 1, whole_extent[4]),
+                min(self._extent[5] + 1, whole_extent[5]),
+            ),
+            6,
+        )
+        # The extent above is the whole request, not a piece of it.
+        in_info.Set(vtkStreamingDemandDrivenPipeline.UPDATE_PIECE_NUMBER(), 0)
+        in_info.Set(vtkStreamingDemandDrivenPipeline.UPDATE_NUMBER_OF_PIECES(), 1)
+        return 1
+
+    # pylint: disable=invalid-name
+    def RequestData(
+        self,
+        request: vtkInformation,
+        inInfo: tuple[vtkInformationVector],
+        outInfo: vtkInformationVector,
+    ):
+        gradient_image = compute_gradient_magnitude(vtkImageData.GetData(inInfo[0]))
+        vtkImageData.GetData(outInfo).ShallowCopy(
+            crop_image(gradient_image, self._extent)
+        )
+        return 1
+
+
+def build_vti_writer(data_filename: str):
+    writer = vtkXMLImageDataWriter()
+    writer.SetFileName(data_filename)
+    writer.SetCompressorTypeToNone()
+    writer.SetDataModeToAppended()
+    writer.EncodeAppendedDataOff()
+    return writer
+
+
+def write_atomically(writer: vtkXMLImageDataWriter, data_filename: str):
+    """Write to a partial file of this process first and replace the dataset
+    with it, so concurrent readers and writers never see a partial dataset."""
+    partial_filename = f"{data_filename}.{os.getpid()}.partial"
+    writer.SetFileName(partial_filename)
+    if writer.Write() != 1:
+        if os.path.exists(partial_filename):
+            os.remove(partial_filename)
+        return False
+    os.replace(partial_filename, data_filename)
+    return True
+
+
+def write_vti(image: vtkImageData, data_filename: str):
+    writer = build_vti_writer(data_filename)
+    writer.SetInputData(image)
+    return write_atomically(writer, data_filename)
+
+
+def write_streaming_gradient(
+    data_filename: str, gradient_filename: str, slab_size: int
+):
+    """Compute the gradient magnitude of the dataset and write it one slab of
+    `slab_size` Z layers at a time."""
+    reader = vtkXMLImageDataReader()
+    reader.SetFileName(data_filename)
+    reader.UpdateInformation()
+    gradient_filter = GradientMagnitudeFilter()
+    gradient_filter.SetInputConnection(reader.GetOutputPort())
+
+    writer = build_vti_writer(gradient_filename)
+    writer.SetInputConnection(gradient_filter.GetOutputPort())
+    writer.SetNumberOfPieces(
+        get_slab_count(
+            reader.GetOutputInformation(0).Get(
+                vtkStreamingDemandDrivenPipeline.WHOLE_EXTENT()
+            ),
+            slab_size,
+        )
+    )
+    return write_atomically(writer, gradient_filename)
+
+
+def add_gradient_args(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "-g",
+        "--grad",
+        help="Set the gradient magnitude dataset (computed from the input and "
+        "cached next to it when omitted)",
+    )
+
+
+def get_volumes_loader(args: argparse.Namespace):
+    """Return the function reading the volumes given on the command line for
+    `show_loading_window`."""
+    return lambda on_progress: read_volumes(
+        args.input, args.grad, on_progress, args.stream_slab
+    )
+
+
+def get_gradient_filename(gradient_filename: str | None, data_filename: str):
+    """Return the gradient magnitude dataset to read, which is the cached one
+    when none is given, or None when the gradient has to be computed."""
+    if gradient_filename is not None:
+        return gradient_filename
+
+    cache_filename = get_gradient_cache_filename(data_filename)
+    if os.path.exists(cache_filename) and (
+        os.path.getmtime(cache_filename) >= os.path.getmtime(data_filename)
+    ):
+        return cache_filename
+    return None
+
+
+def read_gradient(
+    gradient_filename: str | None, isovalue_reader: VolumeReader
+) -> ImageReader:
+    """Read the gradient magnitude volume, or derive it from the scalar volume
+    when no file is given, reusing the result cached next to the input."""
+    data_filename: str = isovalue_reader.GetFileName()
+    filename = get_gradient_filename(gradient_filename, data_filename)
+    if filename is not None:
+        return read_vti(filename)
+
+    isovalue_reader.Update()
+    gradient_image = compute_gradient_magnitude(isovalue_reader.GetOutput())
+    # Failing to write the cache (e.g. read-only dataset directory) only costs
+    # recomputing the gradient on the next launch.
+    write_vti(gradient_image, get_gradient_cache_filename(data_filename))
+    return ImageDataProducer(gradient_image)
+
+
+def read_streaming_volumes(
+    isovalue_filename: str,
+    gradient_filename: str | None,
+    slab_size: int,
+    get_progress_callback: Callable[[str], ProgressCallback | None],
+):
+    """Open both volumes for streaming, writing the gradient magnitude next to
+    the scalar volume first when it has to be computed."""
+    filename = get_gradient_filename(gradient_filename, isovalue_filename)
+    if filename is None:
+        filename = get_gradient_cache_filename(isovalue_filename)
+        if not write_streaming_gradient(isovalue_filename, filename, slab_size):
+            raise OSError(f"Failed to write the gradient magnitude to {filename}.")
+
+    isovalue_reader = read_vti(
+        isovalue_filename, get_progress_callback(isovalue_filename), slab_size
+    )
+    return isovalue_reader, read_vti(
+        filename, get_progress_callback(filename), slab_size
+    )
+
+
+def read_volumes(
+    isovalue_filename: str,
+    gradient_filename: str | None,
+    on_progress: Callable[[str, float], None] | None = None,
+    stream_slab: int = 0,
+) -> tuple[ImageReader, ImageReader]:
+    """Read the scalar volume and its gradient magnitude concurrently, unless
+    the gradient has to be computed from the scalar volume.
+
+    `on_progress` is called from the loading threads with the file name and
+    the fraction read. With a `stream_slab`, neither volume is ever read whole
+    (see `read_streaming_vti`).
+    """
+
+    def get_progress_callback(filename: str) -> ProgressCallback | None:
+        if on_progress is None:
+            return None
+        return lambda progress: on_progress(filename, progress)
+
+    if stream_slab > 0:
+        return read_streaming_volumes(
+            isovalue_filename, gradient_filename, stream_slab, get_progress_callback
+        )
+
+    with ThreadPoolExecutor(2) as executor:
+        isovalue_future = executor.submit(
+            read_vti, isovalue_filename, get_progress_callback(isovalue_filename)
+        )
+        filename = get_gradient_filename(gradient_filename, isovalue_filename)
+        if filename is not None:
+            gradient_future = executor.submit(
+                read_vti, filename, get_progress_callback(filename)
+            )
+            gradient_reader: ImageReader = gradient_future.result()
+            return isovalue_future.result(), gradient_reader
+
+    isovalue_reader = isovalue_future.result()
+    return isovalue_reader, read_gradient(None, isovalue_reader)
+
+
+def attach_gradient(isovalue_image: vtkImageData, gradient_image: vtkImageData):
+    """Return the scalar volume carrying the gradient magnitude as an extra point
+    array, sharing the memory of both inputs.
+
+    Contour filters interpolate every point array along the grid edge each
+    vertex is placed on, which is exactly what probing the gradient volume at
+    that vertex computes.
+    """
+    if isovalue_image.GetDimensions() != gradient_image.GetDimensions():
+        raise ValueError(
+            "The gradient magnitude dataset does not match the input dimensions: "
+            f"{gradient_image.GetDimensions()} != {isovalue_image.GetDimensions()}"
+        )
+
+    gradient_scalars = gradient_image.GetPointData().GetScalars()
+    gradient_array = gradient_scalars.NewInstance()
+    gradient_array.ShallowCopy(gradient_scalars)
+    gradient_array.SetName(GRADIENT_ARRAY_NAME)
+
+    image = vtkImageData()
+    image.ShallowCopy(isovalue_image)
+    image.GetPointData().AddArray(gradient_array)
+    return image
+
+
+class GradientAttachFilter(VTKPythonAlgorithmBase):
+    """Attach the gradient magnitude to the scalar volume within the extent
+    requested downstream, for volumes that are streamed instead of loaded."""
+
+    def __init__(self):
+        super().__init__(
+            nInputPorts=2,
+            inputType="vtkImageData",
+            nOutputPorts=1,
+            outputType="vtkImageData",
+        )
+
+    # pylint: disable=invalid-name
+    def RequestData(
+        self,
+        request: vtkInformation,
+        inInfo: tuple[vtkInformationVector, vtkInformationVector],
+        outInfo: vtkInformationVector,
+    ):
+        vtkImageData.GetData(outInfo).ShallowCopy(
+            attach_gradient(
+                vtkImageData.GetData(inInfo[0]), vtkImageData.GetData(inInfo[1])
+            )
+        )
+        return 1
+
+
+def get_contour_input(
+    isovalue_reader: ImageReader, gradient_reader: ImageReader, vertex_gradient: bool
+):
+    if not vertex_gradient:
+        return isovalue_reader
+
+    if isinstance(isovalue_reader, StreamingVolumeReader):
+        attach_filter = GradientAttachFilter()
+        attach_filter.SetInputConnection(0, isovalue_reader.GetOutputPort())
+        attach_filter.SetInputConnection(1, gradient_reader.GetOutputPort())
+        return attach_filter
+
+    isovalue_reader.Update()
+    return ImageDataProducer(
+        attach_gradient(isovalue_reader.GetOutput(), gradient_reader.GetOutput())
+    )
+
+
+def build_gradient_filter(gradient_reader: ImageReader, vertex_gradient: bool):
+    """Build the stage giving an isosurface the gradient magnitude as scalars,
+    expecting its input to come from `get_contour_input`."""
+    if vertex_gradient:
+        assign_filter = vtkAssignAttribute()
+        assign_filter.Assign(
+            GRADIENT_ARRAY_NAME,
+            vtkDataSetAttributes.SCALARS,
+            vtkAssignAttribute.POINT_DATA,
+        )
+        return assign_filter
+
+    probe_filter = vtkProbeFilter()
+    probe_filter.SetSourceConnection(gradient_reader.GetOutputPort())
+    return probe_filter
@@ -0,0 +1,102 @@
+import numpy as np
+from vtkmodules.util.numpy_support import vtk_to_numpy
+from vtkmodules.util.vtkAlgorithm import VTKPythonAlgorithmBase
+from vtkmodules.vtkCommonCore import vtkInformation, vtkInformationVector
+from vtkmodules.vtkCommonDataModel import vtkPolyData
+from vtkmodules.vtkFiltersCore import vtkAppendPolyData, vtkClipPolyData
+
+from src.multi_contour import select_polys
+
+
+def get_cell_scalar_ranges(surface: vtkPolyData):
+    """Return the minimum and maximum point scalar of every polygon."""
+    polys = surface.GetPolys()
+    offsets = vtk_to_numpy(polys.GetOffsetsArray())
+    if len(offsets) < 2:
+        return np.zeros(0), np.zeros(0)
+    connectivity = vtk_to_numpy(polys.GetConnectivityArray())
+    point_scalars = vtk_to_numpy(surface.GetPointData().GetScalars())
+    cell_scalars = point_scalars[connectivity]
+    starts = offsets[:-1]
+    return (
+        np.minimum.reduceat(cell_scalars, starts),
+        np.maximum.reduceat(cell_scalars, starts),
+    )
+
+
+def build_surface_part(surface: vtkPolyData, mask: np.ndarray):
+    """Build a surface sharing the points and point data of the surface and
+    holding only the polygons where `mask` is set."""
+    part = vtkPolyData()
+    part.SetPoints(surface.GetPoints())
+    part.GetPointData().ShallowCopy(surface.GetPointData())
+    part.SetPolys(select_polys(surface.GetPolys(), mask))
+    return part
+
+
+class GradientRangeFilter(VTKPythonAlgorithmBase):
+    """Clip a surface to the points whose scalars lie within a range, like a
+    `vtkClipPolyData` at the minimum followed by an inside out one at the
+    maximum.
+
+    Polygons wholly inside the range are kept and polygons wholly outside it
+    dropped from their scalar range alone, so only the polygons crossing a
+    bound go through the clip filters. Moving the range never executes the
+    filters upstream, whose output is kept by the pipeline.
+    """
+
+    def __init__(self, scalar_range: tuple[float, float]):
+        super().__init__(
+            nInputPorts=1,
+            inputType="vtkPolyData",
+            nOutputPorts=1,
+            outputType="vtkPolyData",
+        )
+        self.range = scalar_range
+        self.min_clip_filter = vtkClipPolyData()
+        self.max_clip_filter = vtkClipPolyData()
+        self.max_clip_filter.SetInsideOut(True)
+        self.max_clip_filter.SetInputConnection(self.min_clip_filter.GetOutputPort())
+
+    # pylint: disable=invalid-name
+    def SetRange(self, low: float, high: float):
+        if self.range != (low, high):
+            self.range = (low, high)
+            self.Modified()
+
+    # pylint: disable=invalid-name
+    def SetMinimum(self, value: float):
+        self.SetRange(value, self.range[1])
+
+    # pylint: disable=invalid-name
+    def SetMaximum(self, value: float):
+        self.SetRange(self.range[0], value)
+
+    # pylint: disable=invalid-name
+    def RequestData(
+        self,
+        request: vtkInformation,
+        inInfo: tuple[vtkInformationVector],
+        outInfo: vtkInformationVector,
+    ):
+        surface = vtkPolyData.GetData(inInfo[0])
+        output = vtkPolyData.GetData(outInfo)
+        low, high = self.range
+
+        cell_mins, cell_maxs = get_cell_scalar_ranges(surface)
+        inside = (cell_mins >= low) & (cell_maxs <= high)
+        crossing = ~inside & (cell_maxs >= low) & (cell_mins <= high)
+        if not crossing.any():
+            output.ShallowCopy(build_surface_part(surface, inside))
+            return 1
+
+        self.min_clip_filter.SetValue(low)
+        self.max_clip_filter.SetValue(high)
+        self.min_clip_filter.SetInputData(build_surface_part(surface, crossing))
+
+        append_filter = vtkAppendPolyData()
+        append_filter.AddInputData(build_surface_part(surface, inside))
+        append_filter.AddInputConnection(self.max_clip_filter.GetOutputPort())
+        append_filter.Update()
+        output.ShallowCopy(append_filter.GetOutput())
+        return 1
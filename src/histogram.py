@@ -0,0 +1,355 @@
+import argparse
+import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterator, TypedDict
+
+import numpy as np
+import numpy.typing as npt
+from PySide6.QtCore import QPointF, Qt
+from PySide6.QtGui import QImage, QMouseEvent, QPainter, QPaintEvent, QPen, QPixmap
+from PySide6.QtWidgets import QLabel
+from vtkmodules.vtkCommonExecutionModel import vtkStreamingDemandDrivenPipeline
+
+from src.read_vti import ImageReader, StreamingVolumeReader, get_scalar_range
+from src.span_space import get_image_scalars
+from src.streaming import Extent
+
+HISTOGRAM_BINS_DEFAULT = 256
+HISTOGRAM_SLAB_SIZE = 16
+HISTOGRAM_PANEL_SIZE = 256
+
+
+class JointHistogram(TypedDict):
+    # Voxel counts by scalar value bin (rows) and gradient magnitude bin
+    # (columns), both bins splitting their range evenly.
+    counts: npt.NDArray[np.int64]
+    value_range: tuple[float, float]
+    gradient_range: tuple[float, float]
+
+
+def add_histogram_args(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--histogram",
+        type=int,
+        nargs="?",
+        const=HISTOGRAM_BINS_DEFAULT,
+        metavar="BINS",
+        help="Show the histogram of scalar values against gradient magnitudes "
+        f"with BINS bins per axis (default: {HISTOGRAM_BINS_DEFAULT}), cached "
+        "next to the input",
+    )
+
+
+def get_histogram_cache_filename(data_filename: str, bins: int):
+    path = Path(data_filename)
+    return str(path.with_name(f"{path.stem}.hist{bins}.npz"))
+
+
+def get_bin_indices(
+    values: npt.ArrayLike, value_range: tuple[float, float], bins: int
+) -> npt.NDArray[np.int64]:
+    """Return the bins of the values, the maximum falling in the last one."""
+    low, high = value_range
+    if high <= low:
+        return np.zeros(np.shape(values), dtype=np.int64)
+    indices = np.floor(
+        (np.asarray(values, dtype=np.float64) - low) * (bins / (high - low))
+    ).astype(np.int64)
+    return np.clip(indices, 0, bins - 1)
+
+
+def count_slab(
+    values: npt.NDArray[np.generic],
+    gradients: npt.NDArray[np.generic],
+    value_range: tuple[float, float],
+    gradient_range: tuple[float, float],
+    bins: int,
+):
+    flat_indices = get_bin_indices(values.ravel(), value_range, bins) * bins
+    flat_indices += get_bin_indices(gradients.ravel(), gradient_range, bins)
+    return np.bincount(flat_indices, minlength=bins * bins)
+
+
+def get_disjoint_slab_extents(whole_extent: Extent, slab_size: int) -> list[Extent]:
+    """Split the extent into Z slabs of `slab_size` point layers, unlike
+    `get_slab_extents` sharing none so no voxel is counted twice."""
+    x_min, x_max, y_min, y_max, z_min, z_max = whole_extent
+    return [
+        (x_min, x_max, y_min, y_max, z, min(z + slab_size - 1, z_max))
+        for z in range(z_min, z_max + 1, slab_size)
+    ]
+
+
+def iter_slab_scalars(
+    isovalue_source: ImageReader, gradient_source: ImageReader, slab_size: int
+) -> Iterator[tuple[npt.NDArray[np.generic], npt.NDArray[np.generic]]]:
+    """Yield the scalars of both volumes one Z slab at a time, reading streamed
+    volumes slab by slab and slicing loaded ones."""
+    if isinstance(isovalue_source, StreamingVolumeReader):
+        isovalue_source.UpdateInformation()
+        whole_extent: Extent = isovalue_source.GetOutputInformation(0).Get(
+            vtkStreamingDemandDrivenPipeline.WHOLE_EXTENT()
+        )
+        for extent in get_disjoint_slab_extents(whole_extent, slab_size):
+            isovalue_source.UpdateExtent(extent)
+            gradient_source.UpdateExtent(extent)
+            yield (
+                get_image_scalars(isovalue_source.GetOutputDataObject(0)).copy(),
+                get_image_scalars(gradient_source.GetOutputDataObject(0)).copy(),
+            )
+        return
+
+    isovalue_source.Update()
+    gradient_source.Update()
+    values = get_image_scalars(isovalue_source.GetOutputDataObject(0))
+    gradients = get_image_scalars(gradient_source.GetOutputDataObject(0))
+    for z_start in range(0, values.shape[0], slab_size):
+        yield (
+            values[z_start : z_start + slab_size],
+            gradients[z_start : z_start + slab_size],
+        )
+
+
+def compute_joint_histogram(
+    isovalue_source: ImageReader,
+    gradient_source: ImageReader,
+    bins: int = HISTOGRAM_BINS_DEFAULT,
+    slab_size: int = HISTOGRAM_SLAB_SIZE,
+    workers: int | None = None,
+):
+    """Count the voxels of both volumes by value and gradient magnitude bins,
+    binning the slabs on a thread pool as they are read."""
+    value_range = get_scalar_range(isovalue_source)
+    gradient_range = get_scalar_range(gradient_source)
+    workers = workers or os.cpu_count() or 1
+    counts = np.zeros(bins * bins, dtype=np.int64)
+
+    with ThreadPoolExecutor(workers) as executor:
+        # Bound the slabs read ahead of the binning, which would otherwise hold
+        # the whole of a streamed volume.
+        pending: deque[Future[npt.NDArray[np.int64]]] = deque()
+        for values, gradients in iter_slab_scalars(
+            isovalue_source, gradient_source, slab_size
+        ):
+            if len(pending) >= workers:
+                counts += pending.popleft().result()
+            pending.append(
+                executor.submit(
+                    count_slab, values, gradients, value_range, gradient_range, bins
+                )
+            )
+        for future in pending:
+            counts += future.result()
+
+    return JointHistogram(
+        counts=counts.reshape(bins, bins),
+        value_range=value_range,
+        gradient_range=gradient_range,
+    )
+
+
+def get_gradient_source(gradient_filename: str | None):
+    """Identify the gradient magnitude volume a histogram is computed from, the
+    one derived from the dataset being identified by an empty string."""
+    return os.path.abspath(gradient_filename) if gradient_filename else ""
+
+
+def write_joint_histogram(histogram: JointHistogram, filename: str, gradient: str):
+    try:
+        np.savez(
+            filename,
+            counts=histogram["counts"],
+            value_range=histogram["value_range"],
+            gradient_range=histogram["gradient_range"],
+            gradient=gradient,
+        )
+    except OSError:
+        # Failing to write the cache only costs recomputing the histogram.
+        pass
+
+
+def read_joint_histogram(filename: str) -> tuple[JointHistogram, str]:
+    """Return the cached histogram and the gradient magnitude volume it was
+    computed from (see `get_gradient_source`)."""
+    with np.load(filename) as arrays:
+        return (
+            JointHistogram(
+                counts=arrays["counts"],
+                value_range=tuple(arrays["value_range"].tolist()),
+                gradient_range=tuple(arrays["gradient_range"].tolist()),
+            ),
+            str(arrays["gradient"]),
+        )
+
+
+def is_cache_fresh(cache_filename: str, filenames: list[str]):
+    return os.path.exists(cache_filename) and all(
+        os.path.getmtime(cache_filename) >= os.path.getmtime(filename)
+        for filename in filenames
+    )
+
+
+# pylint: disable=too-many-arguments
+def get_joint_histogram(
+    data_filename: str,
+    gradient_filename: str | None,
+    isovalue_source: ImageReader,
+    gradient_source: ImageReader,
+    bins: int = HISTOGRAM_BINS_DEFAULT,
+):
+    """Return the histogram of the volumes, read from the cache next to the
+    dataset when it was computed from the same gradient magnitude volume and
+    neither dataset is newer, and computed and cached otherwise."""
+    cache_filename = get_histogram_cache_filename(data_filename, bins)
+    gradient = get_gradient_source(gradient_filename)
+    if is_cache_fresh(
+        cache_filename, [data_filename, *([gradient_filename] if gradient else [])]
+    ):
+        try:
+            histogram, cached_gradient = read_joint_histogram(cache_filename)
+        except (OSError, ValueError, KeyError):
+            # Caches written before the gradient was recorded, or corrupt.
+            cached_gradient = None
+        if cached_gradient == gradient:
+            return histogram
+
+    histogram = compute_joint_histogram(isovalue_source, gradient_source, bins)
+    write_joint_histogram(histogram, cache_filename, gradient)
+    return histogram
+
+
+def get_histogram_loader(
+    load_volumes: Callable[
+        [Callable[[str, float], None]], tuple[ImageReader, ImageReader]
+    ],
+    data_filename: str,
+    gradient_filename: str | None,
+    bins: int | None,
+):
+    """Wrap the function loading the volumes for `show_loading_window` to
+    return the volumes with their histogram, or None without bins."""
+
+    def load(on_progress: Callable[[str, float], None]):
+        readers = load_volumes(on_progress)
+        if bins is None:
+            return readers, None
+        return readers, get_joint_histogram(
+            data_filename, gradient_filename, *readers, bins
+        )
+
+    return load
+
+
+def get_gradient_distribution(histogram: JointHistogram, value: float):
+    """Return the voxel counts by gradient magnitude bin of the value bin."""
+    counts = histogram["counts"]
+    return counts[get_bin_indices(value, histogram["value_range"], len(counts))]
+
+
+def get_voxel_count(
+    histogram: JointHistogram,
+    value_range: tuple[float, float],
+    gradient_range: tuple[float, float],
+) -> int:
+    """Return the voxels in the bins overlapping both ranges."""
+    bins = len(histogram["counts"])
+    value_bins = get_bin_indices(value_range, histogram["value_range"], bins)
+    gradient_bins = get_bin_indices(gradient_range, histogram["gradient_range"], bins)
+    return int(
+        histogram["counts"][
+            value_bins[0] : value_bins[1] + 1, gradient_bins[0] : gradient_bins[1] + 1
+        ].sum()
+    )
+
+
+def get_histogram_image(counts: npt.NDArray[np.int64]) -> npt.NDArray[np.uint8]:
+    """Shade the counts on a log scale, values along X and gradient magnitudes
+    upward along Y."""
+    shades = np.log1p(counts.T[::-1].astype(np.float64))
+    if shades.max() > 0:
+        shades *= 255 / shades.max()
+    return np.ascontiguousarray(shades.astype(np.uint8))
+
+
+class HistogramPanel(QLabel):
+    """Show the histogram with the isovalue and the gradient magnitude range
+    over it, and select the range by dragging vertically."""
+
+    def __init__(
+        self,
+        histogram: JointHistogram,
+        on_gradient_range_selected: Callable[[float, float], None],
+    ):
+        super().__init__()
+        self.histogram = histogram
+        self.on_gradient_range_selected = on_gradient_range_selected
+        self.isovalue: float | None = None
+        self.gradient_range = histogram["gradient_range"]
+        self.drag_start: float | None = None
+
+        shades = get_histogram_image(histogram["counts"])
+        self.image = QImage(
+            shades.data,
+            shades.shape[1],
+            shades.shape[0],
+            shades.strides[0],
+            QImage.Format.Format_Grayscale8,
+        ).copy()
+        self.setFixedSize(HISTOGRAM_PANEL_SIZE, HISTOGRAM_PANEL_SIZE)
+        self.setPixmap(QPixmap.fromImage(self.image))
+        self.setScaledContents(True)
+
+    def set_isovalue(self, value: float):
+        self.isovalue = value
+        self.update()
+
+    def set_gradient_range(self, low: float, high: float):
+        self.gradient_range = (low, high)
+        self.update()
+
+    def to_x(self, value: float):
+        low, high = self.histogram["value_range"]
+        return (value - low) / ((high - low) or 1) * self.width()
+
+    def to_y(self, gradient: float):
+        low, high = self.histogram["gradient_range"]
+        return (1 - (gradient - low) / ((high - low) or 1)) * self.height()
+
+    def to_gradient(self, y: float):
+        low, high = self.histogram["gradient_range"]
+        fraction = min(max(1 - y / self.height(), 0.0), 1.0)
+        return low + fraction * (high - low)
+
+    # pylint: disable=invalid-name
+    def paintEvent(self, event: QPaintEvent):
+        super().paintEvent(event)
+        painter = QPainter(self)
+        painter.setPen(QPen(Qt.GlobalColor.cyan))
+        for gradient in self.gradient_range:
+            y = self.to_y(gradient)
+            painter.drawLine(QPointF(0, y), QPointF(self.width(), y))
+        if self.isovalue is not None:
+            painter.setPen(QPen(Qt.GlobalColor.red))
+            x = self.to_x(self.isovalue)
+            painter.drawLine(QPointF(x, 0), QPointF(x, self.height()))
+        painter.end()
+
+    # pylint: disable=invalid-name
+    def mousePressEvent(self, event: QMouseEvent):
+        self.drag_start = self.to_gradient(event.position().y())
+
+    # pylint: disable=invalid-name
+    def mouseMoveEvent(self, event: QMouseEvent):
+        if self.drag_start is None:
+            return
+        gradient = self.to_gradient(event.position().y())
+        self.on_gradient_range_selected(
+            min(self.drag_start, gradient), max(self.drag_start, gradient)
+        )
+
+    # pylint: disable=invalid-name
+    def mouseReleaseEvent(self, event: QMouseEvent):
+        self.mouseMoveEvent(event)
+        self.drag_start = None
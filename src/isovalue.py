@@ -2,23 +2,32 @@ from typing import Callable
 
 from PySide6.QtCore import Qt
 from PySide6.QtWidgets import QGridLayout, QLabel, QSlider
-from vtkmodules.vtkIOXML import vtkXMLImageDataReader
 
+from src.contour_spectrum import ContourSpectrum, ContourSpectrumPlot
+from src.read_vti import ImageReader, get_scalar_range
 
+
+# pylint: disable=too-many-arguments
 def build_isovalue_slider(
     layout: QGridLayout,
     row: int,
-    reader: vtkXMLImageDataReader,
+    reader: ImageReader,
     default_value: int,
     on_changed: Callable[[int], None],
+    spectrum: ContourSpectrum | None = None,
 ):
+    """Build the isovalue slider at the row, with the plot of the spectrum
+    beside it if given."""
+
     def on_slide_value_changed(value: int):
         isovalue_label.setText(str(value))
+        if spectrum_plot is not None:
+            spectrum_plot.set_value(value)
         on_changed(value)
 
     isovalue_min: float
     isovalue_max: float
-    isovalue_min, isovalue_max = reader.GetOutput().GetScalarRange()
+    isovalue_min, isovalue_max = get_scalar_range(reader)
     layout.addWidget(QLabel("Isovalue"), row, 0)
     isovalue_slider = QSlider(Qt.Orientation.Horizontal)
     isovalue_slider.setMinimum(int(isovalue_min))
@@ -29,7 +38,17 @@ def build_isovalue_slider(
     isovalue_label = QLabel(str(default_value))
     layout.addWidget(isovalue_label, row, 2)
 
+    spectrum_plot = None
+    if spectrum is not None:
+        spectrum_plot = ContourSpectrumPlot(
+            spectrum, lambda value: isovalue_slider.setValue(round(value))
+        )
+        spectrum_plot.set_value(default_value)
+        layout.addWidget(spectrum_plot, row, 3)
+
+    return isovalue_slider
+
 
-def get_isovalue_mid(reader: vtkXMLImageDataReader) -> int:
-    isovalue_range: tuple[float, float] = reader.GetOutput().GetScalarRange()
+def get_isovalue_mid(reader: ImageReader) -> int:
+    isovalue_range = get_scalar_range(reader)
     return int((isovalue_range[0] + isovalue_range[1]) / 2)
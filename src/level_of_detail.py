@@ -0,0 +1,117 @@
+import argparse
+import math
+from typing import Callable
+
+from PySide6.QtWidgets import QSlider
+from vtkmodules.qt.QVTKRenderWindowInteractor import QVTKRenderWindowInteractor
+from vtkmodules.util.numpy_support import numpy_to_vtk, vtk_to_numpy
+from vtkmodules.vtkCommonDataModel import vtkImageData
+
+from src.read_vti import ImageDataProducer, ImageReader
+
+LOD_VOXELS_DEFAULT = 2**21
+
+
+def add_level_of_detail_args(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--lod",
+        action="store_true",
+        help="Extract the isosurface from a downsampled volume while a slider is "
+        "dragged or the camera moves, and at full resolution once it stops",
+    )
+    parser.add_argument(
+        "--lod-voxels",
+        type=int,
+        default=LOD_VOXELS_DEFAULT,
+        metavar="N",
+        help="Set the maximum number of voxels of the downsampled volume",
+    )
+
+
+def get_lod_voxels(args: argparse.Namespace) -> int | None:
+    # Downsampling needs the whole volume, which streaming never loads.
+    return args.lod_voxels if args.lod and not args.stream_slab else None
+
+
+def get_downsample_factor(dimensions: tuple[int, int, int], voxel_budget: int):
+    """Return the smallest power of two decimation keeping the volume within the
+    voxel budget."""
+    factor = 1
+    while math.prod(math.ceil(size / factor) for size in dimensions) > voxel_budget:
+        if all(math.ceil(size / factor) <= 2 for size in dimensions):
+            break
+        factor *= 2
+    return factor
+
+
+def downsample_image(image: vtkImageData, factor: int):
+    """Keep every `factor`th point along each axis, with all its point arrays."""
+    x_size, y_size, z_size = image.GetDimensions()
+    spacing = image.GetSpacing()
+    extent = image.GetExtent()
+
+    downsampled = vtkImageData()
+    downsampled.SetOrigin(
+        *(
+            image.GetOrigin()[axis] + extent[2 * axis] * spacing[axis]
+            for axis in range(3)
+        )
+    )
+    downsampled.SetSpacing(*(axis_spacing * factor for axis_spacing in spacing))
+    downsampled.SetDimensions(
+        *(math.ceil(size / factor) for size in (x_size, y_size, z_size))
+    )
+
+    point_data = image.GetPointData()
+    for i in range(point_data.GetNumberOfArrays()):
+        array = point_data.GetArray(i)
+        values = vtk_to_numpy(array).reshape(z_size, y_size, x_size, -1)
+        decimated = values[::factor, ::factor, ::factor].reshape(
+            -1, array.GetNumberOfComponents()
+        )
+        decimated_array = numpy_to_vtk(decimated, deep=True)
+        decimated_array.SetName(array.GetName())
+        downsampled.GetPointData().AddArray(decimated_array)
+        if array is point_data.GetScalars():
+            downsampled.GetPointData().SetActiveScalars(array.GetName())
+    return downsampled
+
+
+def get_level_of_detail_source(image_source: ImageReader, voxel_budget: int | None):
+    """Return the algorithm to extract the isosurface from and the function
+    switching it to the downsampled volume while the user interacts.
+
+    Without a voxel budget, the source is returned as is and never switches.
+    """
+
+    def set_interacting(interacting: bool):
+        image = coarse_image if interacting else full_image
+        if producer.GetOutput() is not image:
+            producer.SetOutput(image)
+
+    if voxel_budget is None:
+        return image_source, lambda interacting: None
+
+    image_source.Update()
+    full_image: vtkImageData = image_source.GetOutput()
+    factor = get_downsample_factor(full_image.GetDimensions(), voxel_budget)
+    coarse_image = downsample_image(full_image, factor) if factor > 1 else full_image
+    producer = ImageDataProducer(full_image)
+
+    return producer, set_interacting
+
+
+def bind_interaction(
+    widget: QVTKRenderWindowInteractor,
+    sliders: list[QSlider],
+    on_interaction: Callable[[bool], None],
+):
+    """Call `on_interaction(True)` when a slider drag or camera move starts and
+    `on_interaction(False)` when it ends."""
+    for slider in sliders:
+        slider.sliderPressed.connect(lambda: on_interaction(True))  # type: ignore
+        slider.sliderReleased.connect(lambda: on_interaction(False))  # type: ignore
+
+    interactor = widget.GetRenderWindow().GetInteractor()
+    interactor.AddObserver("StartInteractionEvent", lambda *_: on_interaction(True))
+    interactor.AddObserver("EndInteractionEvent", lambda *_: on_interaction(False))
@@ -0,0 +1,71 @@
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from PySide6.QtCore import QObject, Signal
+from PySide6.QtWidgets import QApplication, QLabel, QMainWindow, QProgressBar
+
+from src.window import build_default_window
+
+T = TypeVar("T")
+
+
+class LoadingSignals(QObject):
+    progressed = Signal(str, float)
+    loaded = Signal(object)
+    failed = Signal(str)
+
+
+def show_loading_window(
+    load: Callable[[Callable[[str, float], None]], T],
+    build_window: Callable[[T], QMainWindow],
+):
+    """Show a window with the progress of `load` running on a worker thread,
+    then replace it by the window built from the loaded result.
+
+    `load` is given the function reporting the fraction read of a file.
+    """
+
+    def on_progressed(filename: str, progress: float):
+        if filename not in progress_bars:
+            row = len(progress_bars) + 1
+            layout.addWidget(QLabel(filename), row, 0)
+            progress_bars[filename] = QProgressBar()
+            layout.addWidget(progress_bars[filename], row, 1)
+        progress_bars[filename].setValue(round(progress * 100))
+
+    def on_loaded(result: T):
+        loaded_windows.append(build_window(result))
+        loaded_windows[-1].show()
+        window.close()
+
+    def on_failed(message: str):
+        print(message, file=sys.stderr)
+        QApplication.exit(1)
+
+    def run():
+        try:
+            signals.loaded.emit(load(signals.progressed.emit))
+        except Exception:  # pylint: disable=broad-exception-caught
+            signals.failed.emit(traceback.format_exc())
+
+    window, _, layout = build_default_window()
+    window.setWindowTitle("Loading")
+    layout.addWidget(QLabel("Loading volumes..."), 0, 0, 1, -1)
+    layout.setRowStretch(99, 1)
+    progress_bars: dict[str, QProgressBar] = {}
+    loaded_windows: list[QMainWindow] = []
+
+    signals = LoadingSignals(window)
+    signals.progressed.connect(on_progressed)  # type: ignore
+    signals.loaded.connect(on_loaded)  # type: ignore
+    signals.failed.connect(on_failed)  # type: ignore
+
+    executor = ThreadPoolExecutor(1)
+    executor.submit(run)
+    # Let the worker thread exit once loading is done.
+    executor.shutdown(wait=False)
+
+    window.show()
+    return window
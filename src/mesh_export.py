@@ -0,0 +1,544 @@
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, BinaryIO, TypedDict
+
+import numpy as np
+import numpy.typing as npt
+from vtkmodules.util.numpy_support import vtk_to_numpy
+from vtkmodules.vtkCommonDataModel import vtkPolyData
+from vtkmodules.vtkFiltersCore import vtkTriangleFilter
+
+from src.color_map import bake_color_table, get_inferno16_points, map_scalars
+from src.contour import ContourConfig
+from src.contour_cache import ContourCache
+from src.data_context import build_data_context, build_probed_isosurface
+from src.gradient import get_gradient_filename, read_volumes
+from src.gradient_range import GradientRangeFilter
+from src.params import IsovalueParams
+from src.surface_mapper import CompactSurfaceFilter
+
+MESH_FORMATS = {".ply": "ply", ".gltf": "gltf"}
+# Vertices or triangles converted and written at a time, so a surface is never
+# held twice in memory.
+MESH_EXPORT_CHUNK_SIZE = 1 << 16
+# glTF positions are stored as 16-bit offsets within the bounds of their
+# surface, scaled back by the node transform (KHR_mesh_quantization).
+POSITION_QUANTIZATION_LEVELS = 65535
+GLTF_GRADIENT_ATTRIBUTE = "_GRADIENT_MAGNITUDE"
+GLTF_UNSIGNED_BYTE = 5121
+GLTF_UNSIGNED_SHORT = 5123
+GLTF_UNSIGNED_INT = 5125
+GLTF_FLOAT = 5126
+GLTF_ARRAY_BUFFER = 34962
+GLTF_ELEMENT_ARRAY_BUFFER = 34963
+
+PLY_VERTEX_DTYPE = np.dtype(
+    [
+        ("x", "<f4"),
+        ("y", "<f4"),
+        ("z", "<f4"),
+        ("gradient_magnitude", "<f4"),
+        ("red", "u1"),
+        ("green", "u1"),
+        ("blue", "u1"),
+        ("alpha", "u1"),
+    ]
+)
+PLY_FACE_DTYPE = np.dtype([("count", "u1"), ("vertex_indices", "<i4", (3,))])
+PLY_PROPERTY_TYPES = {"<f4": "float", "|u1": "uchar"}
+
+
+class MeshExportConfig(TypedDict):
+    input: str
+    grad: str | None
+    clip: list[int]
+    # Color the vertices by gradient magnitude as `iso2dtf.py` does instead of
+    # with the color of their row.
+    color_by_gradient: bool
+
+
+class MeshPart(TypedDict):
+    """The surface of a row written by a worker, vertices then triangles."""
+
+    filename: str
+    params: IsovalueParams
+    vertex_count: int
+    triangle_count: int
+    position_min: tuple[float, float, float]
+    position_max: tuple[float, float, float]
+    with_colors: bool
+
+
+def get_mesh_format(filename: str):
+    mesh_format = MESH_FORMATS.get(Path(filename).suffix.lower())
+    if mesh_format is None:
+        raise ValueError(
+            f"Cannot export {filename}, whose extension is none of "
+            f"{', '.join(MESH_FORMATS)}."
+        )
+    return mesh_format
+
+
+def get_triangles(surface: vtkPolyData) -> npt.NDArray[np.int32]:
+    """Return the vertex indices of the triangles of the surface, splitting the
+    polygons clipped into other shapes first."""
+    polys = surface.GetPolys()
+    offsets = vtk_to_numpy(polys.GetOffsetsArray())
+    if len(offsets) > 1 and np.any(np.diff(offsets) != 3):
+        triangle_filter = vtkTriangleFilter()
+        triangle_filter.SetInputData(surface)
+        triangle_filter.Update()
+        polys = triangle_filter.GetOutput().GetPolys()
+    if polys.GetNumberOfCells() == 0:
+        return np.zeros((0, 3), dtype=np.int32)
+    return vtk_to_numpy(polys.GetConnectivityArray()).astype(np.int32).reshape(-1, 3)
+
+
+def get_vertex_colors(
+    params: IsovalueParams,
+    gradients: npt.NDArray[np.float32],
+    gradient_range: tuple[float, float] | None,
+):
+    """Return the RGBA colors of the vertices, mapped from their gradient
+    magnitudes over the range if given and of their row otherwise, with the
+    opacity of their row."""
+    if gradient_range is not None:
+        colors = map_scalars(
+            bake_color_table(get_inferno16_points(gradient_range)),
+            gradient_range,
+            gradients,
+        ).copy()
+    else:
+        colors = np.empty((len(gradients), 4), dtype=np.uint8)
+        colors[:, :3] = np.round(np.array(params["color"]) * 255)
+    colors[:, 3] = round(params["opacity"] * 255)
+    return colors
+
+
+def quantize_positions(
+    points: npt.NDArray[np.floating],
+    position_min: npt.NDArray[np.float64],
+    position_max: npt.NDArray[np.float64],
+):
+    """Return the positions as offsets from the minimum in 16-bit steps of the
+    bounds, padded to 4 bytes per vertex as glTF requires."""
+    scale = get_quantization_scale(position_min, position_max)
+    quantized = np.zeros((len(points), 4), dtype=np.uint16)
+    quantized[:, :3] = np.round((points - position_min) / scale)
+    return quantized
+
+
+def get_quantization_scale(
+    position_min: npt.NDArray[np.float64], position_max: npt.NDArray[np.float64]
+) -> npt.NDArray[np.float64]:
+    size = position_max - position_min
+    return np.where(size > 0, size / POSITION_QUANTIZATION_LEVELS, 1.0)
+
+
+def write_ply_part(
+    f: BinaryIO,
+    surface: vtkPolyData,
+    triangles: npt.NDArray[np.int32],
+    colors: npt.NDArray[np.uint8],
+):
+    points = vtk_to_numpy(surface.GetPoints().GetData())
+    gradients = vtk_to_numpy(surface.GetPointData().GetScalars())
+    for start in range(0, len(points), MESH_EXPORT_CHUNK_SIZE):
+        end = start + MESH_EXPORT_CHUNK_SIZE
+        vertices = np.empty(len(points[start:end]), dtype=PLY_VERTEX_DTYPE)
+        for axis, name in enumerate("xyz"):
+            vertices[name] = points[start:end, axis]
+        vertices["gradient_magnitude"] = gradients[start:end]
+        for channel, name in enumerate(("red", "green", "blue", "alpha")):
+            vertices[name] = colors[start:end, channel]
+        f.write(vertices.tobytes())
+    for start in range(0, len(triangles), MESH_EXPORT_CHUNK_SIZE):
+        chunk = triangles[start : start + MESH_EXPORT_CHUNK_SIZE]
+        faces = np.empty(len(chunk), dtype=PLY_FACE_DTYPE)
+        faces["count"] = 3
+        faces["vertex_indices"] = chunk
+        f.write(faces.tobytes())
+
+
+def write_gltf_part(
+    f: BinaryIO,
+    surface: vtkPolyData,
+    triangles: npt.NDArray[np.int32],
+    colors: npt.NDArray[np.uint8] | None,
+):
+    """Write the quantized positions, the gradient magnitudes, the colors if
+    any and the triangles one after the other, all 4-byte aligned."""
+    points = vtk_to_numpy(surface.GetPoints().GetData())
+    bounds = np.array(surface.GetBounds())
+    for start in range(0, len(points), MESH_EXPORT_CHUNK_SIZE):
+        f.write(
+            quantize_positions(
+                points[start : start + MESH_EXPORT_CHUNK_SIZE],
+                bounds[::2],
+                bounds[1::2],
+            ).tobytes()
+        )
+    gradients = vtk_to_numpy(surface.GetPointData().GetScalars())
+    f.write(gradients.astype("<f4", copy=False).tobytes())
+    if colors is not None:
+        f.write(colors.tobytes())
+    for start in range(0, len(triangles), MESH_EXPORT_CHUNK_SIZE):
+        f.write(
+            triangles[start : start + MESH_EXPORT_CHUNK_SIZE].astype("<u4").tobytes()
+        )
+
+
+class MeshExporter:
+    """Extract, clip and gradient-filter the surfaces of rows as
+    `isocomplete.py` does, writing each to a part file."""
+
+    def __init__(
+        self, config: MeshExportConfig, contour_config: ContourConfig, cache_size: int
+    ):
+        self.config = config
+        self.contour_config = contour_config
+        self.cache = ContourCache(cache_size)
+        self.context, _ = build_data_context(
+            *read_volumes(config["input"], config["grad"]), contour_config, None
+        )
+
+    def extract(self, params: IsovalueParams):
+        _, gradient_filter, set_axes_clips = build_probed_isosurface(
+            self.context, [params["value"]], self.contour_config, self.cache
+        )
+        set_axes_clips(*self.config["clip"])
+        gradient_range_filter = GradientRangeFilter(params["gradient_range"])
+        gradient_range_filter.SetInputConnection(gradient_filter.GetOutputPort())
+        # The range filter shares all the points of its input.
+        compact_filter = CompactSurfaceFilter()
+        compact_filter.SetInputConnection(gradient_range_filter.GetOutputPort())
+        compact_filter.Update()
+        return compact_filter.GetOutputDataObject(0)
+
+    def export_part(self, params: IsovalueParams, part_filename: str, mesh_format: str):
+        surface = self.extract(params)
+        triangles = get_triangles(surface)
+        if len(triangles) == 0:
+            surface = vtkPolyData()
+        vertex_count = surface.GetNumberOfPoints()
+
+        colors = None
+        if mesh_format == "ply" or self.config["color_by_gradient"]:
+            colors = get_vertex_colors(
+                params,
+                vtk_to_numpy(surface.GetPointData().GetScalars())
+                if vertex_count
+                else np.zeros(0, dtype=np.float32),
+                self.context["gradient_range"]
+                if self.config["color_by_gradient"]
+                else None,
+            )
+        with open(part_filename, "wb") as f:
+            if vertex_count and mesh_format == "ply":
+                write_ply_part(f, surface, triangles, colors)
+            elif vertex_count:
+                write_gltf_part(f, surface, triangles, colors)
+
+        bounds = surface.GetBounds()
+        return MeshPart(
+            filename=part_filename,
+            params=params,
+            vertex_count=vertex_count,
+            triangle_count=len(triangles),
+            position_min=bounds[::2],
+            position_max=bounds[1::2],
+            with_colors=colors is not None,
+        )
+
+
+def write_ply(filename: str, parts: list[MeshPart]):
+    """Write the parts as one binary PLY, their triangles indexing the
+    vertices of all parts."""
+    vertex_count = sum(part["vertex_count"] for part in parts)
+    header = [
+        "ply",
+        "format binary_little_endian 1.0",
+        "comment Isosurfaces exported by isoexport.py",
+        f"element vertex {vertex_count}",
+        *(
+            f"property {PLY_PROPERTY_TYPES[PLY_VERTEX_DTYPE[name].str]} {name}"
+            for name in PLY_VERTEX_DTYPE.names or ()
+        ),
+        f"element face {sum(part['triangle_count'] for part in parts)}",
+        "property list uchar int vertex_indices",
+        "end_header",
+    ]
+    with open(filename, "wb") as f:
+        f.write(("\n".join(header) + "\n").encode("ascii"))
+        for part in parts:
+            with open(part["filename"], "rb") as part_file:
+                copy_bytes(
+                    part_file, f, part["vertex_count"] * PLY_VERTEX_DTYPE.itemsize
+                )
+        vertex_offset = 0
+        for part in parts:
+            with open(part["filename"], "rb") as part_file:
+                part_file.seek(part["vertex_count"] * PLY_VERTEX_DTYPE.itemsize)
+                for start in range(0, part["triangle_count"], MESH_EXPORT_CHUNK_SIZE):
+                    faces = np.fromfile(
+                        part_file,
+                        PLY_FACE_DTYPE,
+                        min(MESH_EXPORT_CHUNK_SIZE, part["triangle_count"] - start),
+                    )
+                    faces["vertex_indices"] += vertex_offset
+                    f.write(faces.tobytes())
+            vertex_offset += part["vertex_count"]
+
+
+def copy_bytes(source: BinaryIO, destination: BinaryIO, size: int):
+    while size > 0:
+        chunk = source.read(
+            min(size, MESH_EXPORT_CHUNK_SIZE * PLY_VERTEX_DTYPE.itemsize)
+        )
+        if not chunk:
+            raise OSError("A part of the exported mesh is truncated.")
+        destination.write(chunk)
+        size -= len(chunk)
+
+
+def add_gltf_view(
+    gltf: dict[str, Any],
+    byte_offset: int,
+    byte_length: int,
+    target: int,
+    byte_stride: int | None = None,
+):
+    view: dict[str, Any] = {
+        "buffer": 0,
+        "byteOffset": byte_offset,
+        "byteLength": byte_length,
+        "target": target,
+    }
+    if byte_stride is not None:
+        view["byteStride"] = byte_stride
+    gltf["bufferViews"].append(view)
+    return len(gltf["bufferViews"]) - 1
+
+
+def add_gltf_accessor(gltf: dict[str, Any], accessor: dict[str, Any]):
+    gltf["accessors"].append(accessor)
+    return len(gltf["accessors"]) - 1
+
+
+def add_gltf_mesh(gltf: dict[str, Any], part: MeshPart, byte_offset: int):
+    """Describe the part stored at the offset of the buffer as a mesh, its
+    material and the node placing it. Return the offset following it."""
+    vertex_count = part["vertex_count"]
+    position_min = np.array(part["position_min"])
+    position_max = np.array(part["position_max"])
+    attributes = {
+        "POSITION": add_gltf_accessor(
+            gltf,
+            {
+                "bufferView": add_gltf_view(
+                    gltf, byte_offset, vertex_count * 8, GLTF_ARRAY_BUFFER, 8
+                ),
+                "componentType": GLTF_UNSIGNED_SHORT,
+                "count": vertex_count,
+                "type": "VEC3",
+                "min": [0, 0, 0],
+                "max": np.round(
+                    (position_max - position_min)
+                    / get_quantization_scale(position_min, position_max)
+                )
+                .astype(int)
+                .tolist(),
+            },
+        )
+    }
+    byte_offset += vertex_count * 8
+    attributes[GLTF_GRADIENT_ATTRIBUTE] = add_gltf_accessor(
+        gltf,
+        {
+            "bufferView": add_gltf_view(
+                gltf, byte_offset, vertex_count * 4, GLTF_ARRAY_BUFFER
+            ),
+            "componentType": GLTF_FLOAT,
+            "count": vertex_count,
+            "type": "SCALAR",
+        },
+    )
+    byte_offset += vertex_count * 4
+    if part["with_colors"]:
+        attributes["COLOR_0"] = add_gltf_accessor(
+            gltf,
+            {
+                "bufferView": add_gltf_view(
+                    gltf, byte_offset, vertex_count * 4, GLTF_ARRAY_BUFFER
+                ),
+                "componentType": GLTF_UNSIGNED_BYTE,
+                "normalized": True,
+                "count": vertex_count,
+                "type": "VEC4",
+            },
+        )
+        byte_offset += vertex_count * 4
+    indices = add_gltf_accessor(
+        gltf,
+        {
+            "bufferView": add_gltf_view(
+                gltf,
+                byte_offset,
+                part["triangle_count"] * 12,
+                GLTF_ELEMENT_ARRAY_BUFFER,
+            ),
+            "componentType": GLTF_UNSIGNED_INT,
+            "count": part["triangle_count"] * 3,
+            "type": "SCALAR",
+        },
+    )
+    byte_offset += part["triangle_count"] * 12
+
+    params = part["params"]
+    opacity = params["opacity"]
+    # Vertex colors are multiplied by the base color.
+    color = [1.0, 1.0, 1.0] if part["with_colors"] else list(params["color"])
+    gltf["materials"].append(
+        {
+            "pbrMetallicRoughness": {
+                "baseColorFactor": [*color, opacity],
+                "metallicFactor": 0.0,
+                "roughnessFactor": 1.0,
+            },
+            "alphaMode": "BLEND" if opacity < 1 else "OPAQUE",
+            "doubleSided": True,
+        }
+    )
+    gltf["meshes"].append(
+        {
+            "name": f"isovalue {params['value']}",
+            "primitives": [
+                {
+                    "attributes": attributes,
+                    "indices": indices,
+                    "material": len(gltf["materials"]) - 1,
+                }
+            ],
+        }
+    )
+    gltf["nodes"].append(
+        {
+            "mesh": len(gltf["meshes"]) - 1,
+            "translation": position_min.tolist(),
+            "scale": get_quantization_scale(position_min, position_max).tolist(),
+        }
+    )
+    return byte_offset
+
+
+def write_gltf(filename: str, parts: list[MeshPart]):
+    """Write the parts as the meshes of a glTF scene, their data concatenated
+    in a binary buffer next to it."""
+    buffer_filename = str(Path(filename).with_suffix(".bin"))
+    gltf: dict[str, Any] = {
+        "asset": {"version": "2.0", "generator": "isoexport.py"},
+        "extensionsUsed": ["KHR_mesh_quantization"],
+        "extensionsRequired": ["KHR_mesh_quantization"],
+        "scene": 0,
+        "scenes": [{"nodes": []}],
+        "nodes": [],
+        "meshes": [],
+        "materials": [],
+        "accessors": [],
+        "bufferViews": [],
+    }
+    byte_offset = 0
+    with open(buffer_filename, "wb") as f:
+        for part in parts:
+            if part["triangle_count"] == 0:
+                continue
+            with open(part["filename"], "rb") as part_file:
+                shutil.copyfileobj(part_file, f)
+            byte_offset = add_gltf_mesh(gltf, part, byte_offset)
+    gltf["scenes"][0]["nodes"] = list(range(len(gltf["nodes"])))
+    gltf["buffers"] = [
+        {"uri": os.path.basename(buffer_filename), "byteLength": byte_offset}
+    ]
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(gltf, f)
+
+
+def prepare_volumes(config: MeshExportConfig):
+    """Read the volumes once so the gradient magnitude and raw caches are
+    written before the workers start, which then only read them. Return the
+    config naming the gradient magnitude dataset to read."""
+    read_volumes(config["input"], config["grad"])
+    return MeshExportConfig(
+        **{**config, "grad": get_gradient_filename(config["grad"], config["input"])}
+    )
+
+
+# Each worker process keeps its own exporter, and volumes, across rows.
+_worker_exporter: MeshExporter | None = None
+
+
+def _init_worker(
+    config: MeshExportConfig, contour_config: ContourConfig, cache_size: int
+):
+    global _worker_exporter  # pylint: disable=global-statement
+    _worker_exporter = MeshExporter(config, contour_config, cache_size)
+
+
+def _export_part(params: IsovalueParams, part_filename: str, mesh_format: str):
+    assert _worker_exporter is not None
+    return _worker_exporter.export_part(params, part_filename, mesh_format)
+
+
+# pylint: disable=too-many-arguments
+def export_meshes(
+    filename: str,
+    params_list: list[IsovalueParams],
+    config: MeshExportConfig,
+    contour_config: ContourConfig,
+    cache_size: int,
+    workers: int,
+):
+    """Export the surfaces of the rows to a PLY or glTF file by extension,
+    extracting the rows on a pool of worker processes, each writing its
+    surfaces to part files streamed into the output at the end."""
+    mesh_format = get_mesh_format(filename)
+    # Streamed volumes cannot be loaded once per worker.
+    contour_config = ContourConfig(**{**contour_config, "stream_slab": 0})
+    part_directory = tempfile.mkdtemp(
+        prefix=".export", dir=os.path.dirname(os.path.abspath(filename))
+    )
+    part_filenames = [
+        os.path.join(part_directory, f"{i}.part") for i in range(len(params_list))
+    ]
+    formats = [mesh_format] * len(params_list)
+    # Share the CPUs between the processes instead of giving each all of them.
+    if workers > 1 and contour_config["workers"] == 0:
+        contour_config = ContourConfig(
+            **{**contour_config, "workers": max((os.cpu_count() or 1) // workers, 1)}
+        )
+    try:
+        if workers <= 1:
+            exporter = MeshExporter(config, contour_config, cache_size)
+            parts = list(
+                map(exporter.export_part, params_list, part_filenames, formats)
+            )
+        else:
+            with ProcessPoolExecutor(
+                min(workers, len(params_list)),
+                initializer=_init_worker,
+                initargs=(prepare_volumes(config), contour_config, cache_size),
+            ) as executor:
+                parts = list(
+                    executor.map(_export_part, params_list, part_filenames, formats)
+                )
+        if mesh_format == "ply":
+            write_ply(filename, parts)
+        else:
+            write_gltf(filename, parts)
+    finally:
+        shutil.rmtree(part_directory, ignore_errors=True)
+    return parts
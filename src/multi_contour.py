@@ -0,0 +1,95 @@
+import numpy as np
+import numpy.typing as npt
+from vtkmodules.util.numpy_support import numpy_to_vtk, vtk_to_numpy
+from vtkmodules.util.vtkAlgorithm import VTKPythonAlgorithmBase
+from vtkmodules.vtkCommonCore import VTK_ID_TYPE, vtkInformation, vtkInformationVector
+from vtkmodules.vtkCommonDataModel import vtkCellArray, vtkPolyData
+
+
+def select_polys(polys: vtkCellArray, mask: npt.NDArray[np.bool_]):
+    """Build a new cell array holding only the cells where `mask` is set."""
+    offsets = vtk_to_numpy(polys.GetOffsetsArray())
+    connectivity = vtk_to_numpy(polys.GetConnectivityArray())
+    sizes = np.diff(offsets)[mask]
+    starts = offsets[:-1][mask]
+
+    selected_offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=selected_offsets[1:])
+    selected_connectivity = connectivity[
+        np.repeat(starts - selected_offsets[:-1], sizes)
+        + np.arange(selected_offsets[-1])
+    ]
+
+    cells = vtkCellArray()
+    cells.SetData(
+        numpy_to_vtk(selected_offsets, deep=True, array_type=VTK_ID_TYPE),
+        numpy_to_vtk(selected_connectivity, deep=True, array_type=VTK_ID_TYPE),
+    )
+    return cells
+
+
+def get_unique_values(values: list[float]) -> list[float]:
+    """Return the isovalues to contour once for all rows, which may repeat an
+    isovalue with other gradient ranges."""
+    return np.unique(np.asarray(values, dtype=np.float64)).tolist()
+
+
+def get_cell_isovalue_indices(
+    surface: vtkPolyData, values: npt.NDArray[np.float64]
+) -> npt.NDArray[np.integer]:
+    """Return the index of the isovalue each polygon was extracted at."""
+    polys = surface.GetPolys()
+    offsets = vtk_to_numpy(polys.GetOffsetsArray())
+    if len(offsets) <= 1:
+        return np.zeros(0, dtype=np.int64)
+    # All points of a polygon lie on the same isosurface, so its first point
+    # tells which isovalue it was extracted at.
+    scalars = vtk_to_numpy(surface.GetPointData().GetScalars())
+    cell_values = scalars[vtk_to_numpy(polys.GetConnectivityArray())[offsets[:-1]]]
+    return np.abs(cell_values[:, np.newaxis] - values[np.newaxis, :]).argmin(axis=1)
+
+
+class IsovalueSplitFilter(VTKPythonAlgorithmBase):
+    """Split a surface contoured at several isovalues into one output per value.
+
+    Input 0 is the contour output carrying the isovalue as point scalars and
+    input 1 is the same geometry with other point data (e.g. the output of a
+    `vtkProbeFilter` downstream of input 0). Every output shares the points and
+    point data of input 1 and only holds the polygons of its own isovalue.
+    Outputs of the same isovalue share the same polygons, which the input must
+    hold once (see `get_unique_values`).
+    """
+
+    def __init__(self, values: list[float]):
+        super().__init__(
+            nInputPorts=2,
+            inputType="vtkPolyData",
+            nOutputPorts=len(values),
+            outputType="vtkPolyData",
+        )
+        self.unique_values, self.value_indices = np.unique(
+            np.asarray(values, dtype=np.float64), return_inverse=True
+        )
+
+    # pylint: disable=invalid-name
+    def RequestData(
+        self,
+        request: vtkInformation,
+        inInfo: tuple[vtkInformationVector, vtkInformationVector],
+        outInfo: vtkInformationVector,
+    ):
+        surface = vtkPolyData.GetData(inInfo[0])
+        attributed_surface = vtkPolyData.GetData(inInfo[1])
+
+        cell_isovalue_indices = get_cell_isovalue_indices(surface, self.unique_values)
+        value_polys = [
+            select_polys(surface.GetPolys(), cell_isovalue_indices == i)
+            for i in range(len(self.unique_values))
+        ]
+        for i, value_index in enumerate(self.value_indices):
+            output = vtkPolyData.GetData(outInfo, i)
+            output.Initialize()
+            output.SetPoints(attributed_surface.GetPoints())
+            output.GetPointData().ShallowCopy(attributed_surface.GetPointData())
+            output.SetPolys(value_polys[value_index])
+        return 1
@@ -0,0 +1,24 @@
+from typing import TypedDict
+
+
+class IsovalueParams(TypedDict):
+    value: int
+    gradient_range: tuple[float, float]
+    color: tuple[float, float, float]
+    opacity: float
+
+
+def read_params(filename: str):
+    """Read the isosurfaces of a params file, one per line not commented out:
+    `<isovalue> <grad_min> <grad_max> <R> <G> <B> [<alpha>]`."""
+    with open(filename, "r", encoding="utf-8") as f:
+        rows = [line.split() for line in f if line and not line.startswith("#")]
+    return [
+        IsovalueParams(
+            value=int(row[0]),
+            gradient_range=tuple(map(float, row[1:3])),
+            color=tuple(map(float, row[3:6])),
+            opacity=float(row[6]) if len(row) > 6 else 1.0,
+        )
+        for row in rows
+    ]
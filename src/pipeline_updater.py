@@ -0,0 +1,115 @@
+import argparse
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+from PySide6.QtCore import QObject, QTimer, Signal
+from vtkmodules.qt.QVTKRenderWindowInteractor import QVTKRenderWindowInteractor
+from vtkmodules.vtkCommonDataModel import vtkDataObject
+from vtkmodules.vtkRenderingCore import vtkMapper
+
+
+def add_pipeline_updater_args(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--update-delay",
+        type=int,
+        metavar="MS",
+        help="Coalesce slider changes over the delay and update the pipeline on a "
+        "worker thread instead of updating it on every change",
+    )
+
+
+class PipelineUpdater:
+    """Apply a change to the pipeline and render it synchronously."""
+
+    def __init__(self, widget: QVTKRenderWindowInteractor):
+        self.widget = widget
+
+    def update(self, key: str, apply: Callable[[], None]):
+        # The key only matters to updaters coalescing changes.
+        del key
+        apply()
+        self.widget.GetRenderWindow().Render()
+
+
+# pylint: disable=too-many-instance-attributes
+class ScheduledPipelineUpdater(QObject):
+    """Coalesce changes to the pipeline, run them on a worker thread and swap
+    the results into the mappers on the GUI thread.
+
+    Changes are keyed (e.g. by slider) so only the latest change of each key is
+    applied. At most one update runs at a time and a finished update is dropped
+    when newer changes arrived while it was running. The mappers are detached
+    from the pipeline and fed snapshots of its outputs, so rendering never
+    executes filters concurrently with the worker.
+    """
+
+    finished = Signal(int, list)
+
+    def __init__(
+        self,
+        widget: QVTKRenderWindowInteractor,
+        mappers: list[vtkMapper],
+        delay: int,
+    ):
+        super().__init__()
+        self.widget = widget
+        self.mappers = mappers
+        self.sources = [mapper.GetInputAlgorithm() for mapper in mappers]
+        self.generation = 0
+        self.pending: dict[str, Callable[[], None]] = {}
+        self.running: Future[None] | None = None
+        self.executor = ThreadPoolExecutor(1)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay)
+        self.timer.timeout.connect(self.submit)  # type: ignore
+        self.finished.connect(self.swap)  # type: ignore
+
+        self.swap(self.generation, self.update_sources())
+
+    def update(self, key: str, apply: Callable[[], None]):
+        self.pending[key] = apply
+        self.generation += 1
+        self.timer.start()
+
+    def submit(self):
+        if self.running is not None and not self.running.done():
+            # Only one update touches the pipeline at a time, try again later.
+            self.timer.start()
+            return
+
+        applies = list(self.pending.values())
+        self.pending.clear()
+        self.running = self.executor.submit(self.run, self.generation, applies)
+
+    def run(self, generation: int, applies: list[Callable[[], None]]):
+        for apply in applies:
+            apply()
+        self.finished.emit(generation, self.update_sources())
+
+    def update_sources(self):
+        snapshots: list[vtkDataObject] = []
+        for source in self.sources:
+            source.Update()
+            output = source.GetOutputDataObject(0)
+            snapshot = output.NewInstance()
+            snapshot.ShallowCopy(output)
+            snapshots.append(snapshot)
+        return snapshots
+
+    def swap(self, generation: int, snapshots: list[vtkDataObject]):
+        if generation != self.generation:
+            return
+
+        for mapper, snapshot in zip(self.mappers, snapshots):
+            mapper.SetInputDataObject(0, snapshot)
+        self.widget.GetRenderWindow().Render()
+
+
+def build_pipeline_updater(
+    widget: QVTKRenderWindowInteractor, mappers: list[vtkMapper], delay: int | None
+):
+    if delay is None:
+        return PipelineUpdater(widget)
+    return ScheduledPipelineUpdater(widget, mappers, delay)
@@ -0,0 +1,203 @@
+import argparse
+import atexit
+import csv
+import json
+import threading
+import time
+from collections import deque
+from typing import Callable, TypedDict
+
+from vtkmodules.vtkCommonCore import vtkObject
+from vtkmodules.vtkCommonDataModel import vtkDataObject, vtkDataSet
+from vtkmodules.vtkCommonExecutionModel import vtkAlgorithm
+from vtkmodules.vtkRenderingCore import vtkRenderer, vtkRenderWindow, vtkTextActor
+
+PROFILE_OVERLAY_SIZE = 8
+
+
+def add_profiling_args(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--profile",
+        metavar="TRACE",
+        help="Time every pipeline stage and the render, show the latest timings "
+        "over the view and save all of them to TRACE on exit (.csv or .json)",
+    )
+
+
+class StageRecord(TypedDict):
+    stage: str
+    # Seconds since the profiler was created.
+    start: float
+    duration_ms: float
+    input_cells: int
+    output_cells: int
+    output_memory_kb: int
+
+
+def get_cell_count(data_object: vtkDataObject | None):
+    if isinstance(data_object, vtkDataSet):
+        return data_object.GetNumberOfCells()
+    return 0
+
+
+def get_input_cell_count(algorithm: vtkAlgorithm):
+    return sum(
+        get_cell_count(algorithm.GetInputDataObject(port, connection))
+        for port in range(algorithm.GetNumberOfInputPorts())
+        for connection in range(algorithm.GetNumberOfInputConnections(port))
+    )
+
+
+def get_upstream_algorithms(algorithm: vtkAlgorithm) -> list[vtkAlgorithm]:
+    """Return the algorithm and all algorithms feeding it, sources first."""
+    visited: dict[int, vtkAlgorithm] = {}
+
+    def visit(current: vtkAlgorithm):
+        if id(current) in visited:
+            return
+        for port in range(current.GetNumberOfInputPorts()):
+            for connection in range(current.GetNumberOfInputConnections(port)):
+                visit(current.GetInputAlgorithm(port, connection))
+        visited[id(current)] = current
+
+    visit(algorithm)
+    return list(visited.values())
+
+
+class PipelineProfiler:
+    """Record the wall time, cell counts and output memory of every execution
+    of the watched algorithms and renders.
+
+    Listeners are called with every record, possibly from the thread updating
+    the pipeline.
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.records: list[StageRecord] = []
+        self.listeners: list[Callable[[StageRecord], None]] = []
+        self._names: dict[int, str] = {}
+        self._starts: dict[int, tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def watch(self, algorithm: vtkAlgorithm, name: str | None = None):
+        if id(algorithm) in self._names:
+            return
+        name = name or type(algorithm).__name__
+        count = sum(
+            stage == name or stage.startswith(f"{name}#")
+            for stage in self._names.values()
+        )
+        self._names[id(algorithm)] = f"{name}#{count + 1}" if count else name
+        algorithm.AddObserver("StartEvent", self._on_algorithm_start)
+        algorithm.AddObserver("EndEvent", self._on_algorithm_end)
+
+    def watch_pipeline(self, algorithm: vtkAlgorithm):
+        """Watch the algorithm and everything upstream of it not watched yet."""
+        for upstream_algorithm in get_upstream_algorithms(algorithm):
+            self.watch(upstream_algorithm)
+
+    def watch_render(self, window: vtkRenderWindow):
+        self._names[id(window)] = "render"
+        window.AddObserver("StartEvent", self._on_render_start)
+        window.AddObserver("EndEvent", self._on_render_end)
+
+    def _on_algorithm_start(self, algorithm: vtkAlgorithm, _: str):
+        self._starts[id(algorithm)] = (
+            time.perf_counter(),
+            get_input_cell_count(algorithm),
+        )
+
+    def _on_algorithm_end(self, algorithm: vtkAlgorithm, _: str):
+        output = algorithm.GetOutputDataObject(0)
+        self._record(
+            algorithm,
+            get_cell_count(output),
+            output.GetActualMemorySize() if output is not None else 0,
+        )
+
+    def _on_render_start(self, window: vtkObject, _: str):
+        self._starts[id(window)] = (time.perf_counter(), 0)
+
+    def _on_render_end(self, window: vtkObject, _: str):
+        self._record(window, 0, 0)
+
+    def _record(self, obj: vtkObject, output_cells: int, output_memory_kb: int):
+        end = time.perf_counter()
+        start, input_cells = self._starts.pop(id(obj), (end, 0))
+        record = StageRecord(
+            stage=self._names[id(obj)],
+            start=start - self.origin,
+            duration_ms=(end - start) * 1000,
+            input_cells=input_cells,
+            output_cells=output_cells,
+            output_memory_kb=output_memory_kb,
+        )
+        with self._lock:
+            self.records.append(record)
+        for listener in self.listeners:
+            listener(record)
+
+    def write_trace(self, filename: str):
+        with self._lock:
+            records = list(self.records)
+        with open(filename, "w", encoding="utf-8", newline="") as f:
+            if filename.endswith(".csv"):
+                writer = csv.DictWriter(f, fieldnames=list(StageRecord.__annotations__))
+                writer.writeheader()
+                writer.writerows(records)
+            else:
+                json.dump(records, f, indent=2)
+
+
+def format_record(record: StageRecord):
+    return (
+        f"{record['stage']:<24}{record['duration_ms']:>9.1f} ms"
+        f"{record['input_cells']:>10} > {record['output_cells']:<10}"
+        f"{record['output_memory_kb']:>8} KB"
+    )
+
+
+def build_profile_overlay(profiler: PipelineProfiler, renderer: vtkRenderer):
+    """Show the latest records in the corner of the view, refreshed whenever
+    the view is rendered so the text is only touched on the GUI thread."""
+
+    def on_render_start(*_: object):
+        # Copy first as the pipeline may record stages on another thread.
+        records = list(latest)
+        text_actor.SetInput("\n".join(format_record(record) for record in records))
+
+    latest: deque[StageRecord] = deque(maxlen=PROFILE_OVERLAY_SIZE)
+    profiler.listeners.append(latest.append)
+
+    text_actor = vtkTextActor()
+    text_actor.GetTextProperty().SetFontFamilyToCourier()
+    text_actor.GetTextProperty().SetFontSize(12)
+    text_actor.SetPosition(10, 10)
+    renderer.AddActor2D(text_actor)
+    renderer.AddObserver("StartEvent", on_render_start)
+    return text_actor
+
+
+def build_pipeline_profiler(
+    renderer: vtkRenderer,
+    sinks: list[vtkAlgorithm],
+    trace_filename: str | None,
+    stages: dict[str, vtkAlgorithm] | None = None,
+):
+    """Profile the pipelines feeding the sinks (e.g. mappers) and the renders of
+    the renderer's window, saving the trace on exit. The algorithms in `stages`
+    are recorded under the given names and the others under their class name.
+    Return None when profiling is off."""
+    if trace_filename is None:
+        return None
+
+    profiler = PipelineProfiler()
+    for name, algorithm in (stages or {}).items():
+        profiler.watch(algorithm, name)
+    for sink in sinks:
+        profiler.watch_pipeline(sink)
+    profiler.watch_render(renderer.GetRenderWindow())
+    build_profile_overlay(profiler, renderer)
+    atexit.register(profiler.write_trace, trace_filename)
+    return profiler
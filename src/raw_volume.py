@@ -0,0 +1,144 @@
+import json
+import os
+from pathlib import Path
+from typing import TypedDict
+
+import numpy as np
+from vtkmodules.util.numpy_support import numpy_to_vtk, vtk_to_numpy
+from vtkmodules.vtkCommonDataModel import vtkImageData
+
+RAW_VOLUME_VERSION = 1
+# Appended to the whole name of the dataset, so the cache never takes the name
+# of a raw volume kept beside it.
+RAW_VOLUME_SUFFIX = ".rawcache"
+# Arrays start on page boundaries so each can be mapped and paged in alone.
+RAW_VOLUME_ALIGNMENT = 4096
+
+
+class RawArrayHeader(TypedDict):
+    name: str
+    dtype: str
+    components: int
+    offset: int
+    scalars: bool
+
+
+class RawVolumeHeader(TypedDict):
+    version: int
+    extent: tuple[int, int, int, int, int, int]
+    origin: tuple[float, float, float]
+    spacing: tuple[float, float, float]
+    arrays: list[RawArrayHeader]
+
+
+def get_raw_volume_filename(data_filename: str):
+    path = Path(data_filename)
+    return str(path.with_name(f"{path.name}{RAW_VOLUME_SUFFIX}"))
+
+
+def align(offset: int):
+    return -(-offset // RAW_VOLUME_ALIGNMENT) * RAW_VOLUME_ALIGNMENT
+
+
+def write_raw_volume(image: vtkImageData, raw_filename: str):
+    """Write the point arrays of the image uncompressed after a JSON header
+    padded to the alignment, replacing the file atomically so concurrent
+    readers never map a partial volume."""
+    point_data = image.GetPointData()
+    scalars = point_data.GetScalars()
+    arrays = [point_data.GetArray(i) for i in range(point_data.GetNumberOfArrays())]
+
+    array_headers: list[RawArrayHeader] = []
+    offset = RAW_VOLUME_ALIGNMENT
+    for array in arrays:
+        values = vtk_to_numpy(array)
+        array_headers.append(
+            RawArrayHeader(
+                name=array.GetName() or "",
+                dtype=values.dtype.newbyteorder("=").str,
+                components=array.GetNumberOfComponents(),
+                offset=offset,
+                scalars=scalars is not None and array.GetName() == scalars.GetName(),
+            )
+        )
+        offset = align(offset + values.nbytes)
+
+    header = json.dumps(
+        RawVolumeHeader(
+            version=RAW_VOLUME_VERSION,
+            extent=image.GetExtent(),
+            origin=image.GetOrigin(),
+            spacing=image.GetSpacing(),
+            arrays=array_headers,
+        )
+    ).encode()
+    if len(header) >= RAW_VOLUME_ALIGNMENT:
+        raise ValueError("The volume has too many arrays to cache.")
+
+    partial_filename = f"{raw_filename}.{os.getpid()}.partial"
+    with open(partial_filename, "wb") as f:
+        f.write(header.ljust(RAW_VOLUME_ALIGNMENT, b" "))
+        for array, array_header in zip(arrays, array_headers):
+            f.seek(array_header["offset"])
+            f.write(np.ascontiguousarray(vtk_to_numpy(array)).tobytes())
+    os.replace(partial_filename, raw_filename)
+
+
+def read_raw_header(raw_filename: str) -> RawVolumeHeader | None:
+    """Return the header of the cached volume, or None when the file was
+    written by another version, is not a cached volume or is truncated."""
+    with open(raw_filename, "rb") as f:
+        header_bytes = f.read(RAW_VOLUME_ALIGNMENT)
+    try:
+        header: RawVolumeHeader = json.loads(header_bytes)
+        if header["version"] != RAW_VOLUME_VERSION:
+            return None
+        x_min, x_max, y_min, y_max, z_min, z_max = header["extent"]
+        point_count = (x_max - x_min + 1) * (y_max - y_min + 1) * (z_max - z_min + 1)
+        end = max(
+            (
+                array_header["offset"]
+                + point_count
+                * array_header["components"]
+                * np.dtype(array_header["dtype"]).itemsize
+                for array_header in header["arrays"]
+            ),
+            default=0,
+        )
+    except (ValueError, TypeError, KeyError):
+        return None
+    if os.path.getsize(raw_filename) < end:
+        return None
+    return header
+
+
+def read_raw_volume(raw_filename: str):
+    """Map the cached volume into memory and wrap it as image data without
+    copying. Return None when it cannot be used (see `read_raw_header`), so it
+    is written again."""
+    header = read_raw_header(raw_filename)
+    if header is None:
+        return None
+
+    image = vtkImageData()
+    image.SetExtent(*header["extent"])
+    image.SetOrigin(*header["origin"])
+    image.SetSpacing(*header["spacing"])
+
+    point_count = image.GetNumberOfPoints()
+    for array_header in header["arrays"]:
+        components = array_header["components"]
+        values = np.memmap(
+            raw_filename,
+            dtype=np.dtype(array_header["dtype"]),
+            mode="r",
+            offset=array_header["offset"],
+            shape=(point_count, components) if components > 1 else (point_count,),
+        )
+        # VTK keeps a reference to the map for as long as the array lives.
+        array = numpy_to_vtk(values, deep=False)
+        array.SetName(array_header["name"])
+        image.GetPointData().AddArray(array)
+        if array_header["scalars"]:
+            image.GetPointData().SetActiveScalars(array_header["name"])
+    return image
@@ -1,8 +1,118 @@
+import os
+from typing import Callable
+
+from vtkmodules.vtkCommonDataModel import vtkImageData
+from vtkmodules.vtkCommonExecutionModel import vtkTrivialProducer
 from vtkmodules.vtkIOXML import vtkXMLImageDataReader
 
+from src.raw_volume import get_raw_volume_filename, read_raw_volume, write_raw_volume
+from src.streaming import get_streamed_scalar_range
+
+
+class ImageDataProducer(vtkTrivialProducer):
+    """Expose in-memory image data through the same interface as a reader."""
+
+    def __init__(self, image: vtkImageData):
+        super().__init__()
+        self.SetOutput(image)
+
+    def GetOutput(self) -> vtkImageData:  # pylint: disable=invalid-name
+        return self.GetOutputDataObject(0)
+
+
+class VolumeReader(ImageDataProducer):
+    """Expose a loaded volume along with the file it was loaded from."""
+
+    def __init__(self, image: vtkImageData, data_filename: str):
+        super().__init__(image)
+        self.data_filename = data_filename
+
+    def GetFileName(self):  # pylint: disable=invalid-name
+        return self.data_filename
+
+
+class StreamingVolumeReader(vtkXMLImageDataReader):
+    """Read only the extent of the dataset requested downstream, knowing the
+    scalar range of the whole of it."""
+
+    def __init__(self, data_filename: str, scalar_range: tuple[float, float]):
+        super().__init__()
+        self.SetFileName(data_filename)
+        self.scalar_range = scalar_range
+
+
+class RemoteVolumeReader(VolumeReader):
+    """Expose the geometry and scalar range of a volume whose voxels are held
+    by another process (e.g. a render server), without any point data."""
+
+    def __init__(
+        self,
+        image: vtkImageData,
+        data_filename: str,
+        scalar_range: tuple[float, float],
+    ):
+        super().__init__(image, data_filename)
+        self.scalar_range = scalar_range
+
+
+ImageReader = vtkXMLImageDataReader | ImageDataProducer
+# Called with the fraction of the dataset read so far.
+ProgressCallback = Callable[[float], None]
+
+
+def get_scalar_range(reader: ImageReader) -> tuple[float, float]:
+    if isinstance(reader, (StreamingVolumeReader, RemoteVolumeReader)):
+        return reader.scalar_range
+    return reader.GetOutput().GetScalarRange()
+
+
+def read_streaming_vti(
+    data_filename: str, slab_size: int, on_progress: ProgressCallback | None = None
+):
+    """Stream the dataset once to compute its scalar range, holding one slab
+    of `slab_size` Z layers at a time, and return a reader doing the same for
+    the pipelines downstream."""
+    reader = vtkXMLImageDataReader()
+    reader.SetFileName(data_filename)
+    scalar_range = get_streamed_scalar_range(reader, slab_size, on_progress)
+    return StreamingVolumeReader(data_filename, scalar_range)
+
+
+def read_vti(
+    data_filename: str,
+    on_progress: ProgressCallback | None = None,
+    stream_slab: int = 0,
+) -> VolumeReader | StreamingVolumeReader:
+    """Read the dataset, memory-mapping the raw copy cached next to it when it
+    is up to date and writing that copy otherwise.
+
+    With a `stream_slab`, the dataset is never read whole (see
+    `read_streaming_vti`).
+    """
+    if stream_slab > 0:
+        return read_streaming_vti(data_filename, stream_slab, on_progress)
+
+    raw_filename = get_raw_volume_filename(data_filename)
+    if os.path.exists(raw_filename) and (
+        os.path.getmtime(raw_filename) >= os.path.getmtime(data_filename)
+    ):
+        image = read_raw_volume(raw_filename)
+        if image is not None:
+            if on_progress is not None:
+                on_progress(1.0)
+            return VolumeReader(image, data_filename)
 
-def read_vti(data_filename: str):
     reader = vtkXMLImageDataReader()
     reader.SetFileName(data_filename)
+    if on_progress is not None:
+        reader.AddObserver(
+            "ProgressEvent", lambda caller, _: on_progress(caller.GetProgress())
+        )
     reader.Update()
-    return reader
+    try:
+        write_raw_volume(reader.GetOutput(), raw_filename)
+    except OSError:
+        # Without the cache (e.g. read-only dataset directory), the next launch
+        # parses the dataset again.
+        pass
+    return VolumeReader(reader.GetOutput(), data_filename)
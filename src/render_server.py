@@ -0,0 +1,452 @@
+import argparse
+import json
+import os
+import socket
+import struct
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from socketserver import StreamRequestHandler, ThreadingMixIn, UnixStreamServer
+from typing import Any, BinaryIO, Callable, Iterator, TypedDict, TypeVar
+
+import numpy as np
+import numpy.typing as npt
+from vtkmodules.util.vtkAlgorithm import VTKPythonAlgorithmBase
+from vtkmodules.vtkCommonCore import vtkInformation, vtkInformationVector
+from vtkmodules.vtkCommonDataModel import vtkImageData, vtkPolyData
+from vtkmodules.vtkFiltersCore import vtkProbeFilter
+
+from src.batch import BatchJob, BatchRenderer
+from src.contour import ContourConfig, build_contour_filter
+from src.contour_cache import CachedContourFilter
+from src.gradient import read_gradient
+from src.read_vti import ImageReader, RemoteVolumeReader, VolumeReader
+from src.streaming import Extent, crop_image
+from src.surface_store import (
+    SurfaceArrayHeader,
+    SurfaceHeader,
+    SurfaceStoreConfig,
+    build_surface,
+    get_array_headers,
+    get_array_shape,
+    get_surface_data_size,
+    get_surface_layout,
+)
+
+# Sizes of the JSON header and of the binary payload of every message.
+MESSAGE_PREFIX = struct.Struct("!QQ")
+# Surfaces compress about as well at the fastest level, which keeps up with
+# local sockets.
+SURFACE_COMPRESSION_LEVEL = 1
+# The keys of `CameraConfig` taking 3 numbers and a single one.
+CAMERA_VECTORS = ("position", "focal_point", "view_up")
+CAMERA_ANGLES = ("azimuth", "elevation", "zoom")
+
+Message = dict[str, Any]
+Result = TypeVar("Result")
+# The fields of a message, whether they are required, the check of their value
+# and its description for error messages.
+Fields = dict[str, tuple[bool, Callable[[Any], bool], str]]
+
+
+class VolumeInfo(TypedDict):
+    extent: Extent
+    origin: tuple[float, float, float]
+    spacing: tuple[float, float, float]
+    scalar_range: tuple[float, float]
+
+
+def add_render_server_args(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--server",
+        metavar="SOCKET",
+        help="Extract the isosurfaces on the render server listening on the Unix "
+        "socket SOCKET (see isoserver.py) instead of loading the volume",
+    )
+
+
+def write_message(stream: BinaryIO, header: Message, payload: bytes = b""):
+    header_bytes = json.dumps(header).encode()
+    stream.write(MESSAGE_PREFIX.pack(len(header_bytes), len(payload)))
+    stream.write(header_bytes)
+    if payload:
+        stream.write(payload)
+    stream.flush()
+
+
+def read_exactly(stream: BinaryIO, size: int):
+    data = stream.read(size)
+    if len(data) < size:
+        raise ConnectionError("The connection closed in the middle of a message.")
+    return data
+
+
+def read_message(stream: BinaryIO) -> tuple[Message, bytes]:
+    """Read the next message, raising `ConnectionError` once the connection is
+    closed."""
+    header_size, payload_size = MESSAGE_PREFIX.unpack(
+        read_exactly(stream, MESSAGE_PREFIX.size)
+    )
+    header: Message = json.loads(read_exactly(stream, header_size))
+    return header, read_exactly(stream, payload_size)
+
+
+def encode_surface(polydata: vtkPolyData):
+    """Lay out the surface as the surface store does and compress it."""
+    header, arrays = get_surface_layout(polydata)
+    data = bytearray(get_surface_data_size(header))
+    for values, array_header in zip(arrays, get_array_headers(header)):
+        start = array_header["offset"]
+        data[start : start + values.nbytes] = np.ascontiguousarray(values).tobytes()
+    return header, zlib.compress(data, SURFACE_COMPRESSION_LEVEL)
+
+
+def decode_surface(header: SurfaceHeader, payload: bytes):
+    data = zlib.decompress(payload)
+
+    def get_array(array_header: SurfaceArrayHeader) -> npt.NDArray[np.generic]:
+        shape = get_array_shape(array_header)
+        dtype = np.dtype(array_header["dtype"])
+        if array_header["length"] == 0:
+            return np.zeros(shape, dtype=dtype)
+        return np.frombuffer(
+            data, dtype, int(np.prod(shape)), array_header["offset"]
+        ).reshape(shape)
+
+    return build_surface(header, get_array)
+
+
+def is_number(value: Any):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def is_numbers(value: Any, size: int | None = None, is_item=is_number):
+    return (
+        isinstance(value, list)
+        and (size is None or len(value) == size)
+        and all(is_item(item) for item in value)
+    )
+
+
+def is_integer(value: Any):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def is_camera(value: Any):
+    return isinstance(value, dict) and all(
+        (key in CAMERA_VECTORS and is_numbers(item, 3))
+        or (key in CAMERA_ANGLES and is_number(item))
+        for key, item in value.items()
+    )
+
+
+JOB_FIELDS: Fields = {
+    "input": (True, lambda value: isinstance(value, str), "a path"),
+    "output": (True, lambda value: isinstance(value, str), "a path"),
+    "value": (False, is_number, "a number"),
+    "clip": (False, lambda value: is_numbers(value, 3), "3 numbers"),
+    "camera": (False, is_camera, "a camera"),
+    "size": (False, lambda value: is_numbers(value, 2, is_integer), "2 integers"),
+}
+REQUEST_FIELDS: dict[str, Fields] = {
+    "info": {"input": JOB_FIELDS["input"]},
+    "contour": {
+        "input": JOB_FIELDS["input"],
+        "values": (True, is_numbers, "a list of numbers"),
+        "extent": (
+            False,
+            lambda value: value is None or is_numbers(value, 6, is_integer),
+            "6 integers",
+        ),
+        "gradient": (False, lambda value: isinstance(value, bool), "a boolean"),
+    },
+    "render": {"job": (True, lambda value: isinstance(value, dict), "an object")},
+}
+
+
+def get_field_errors(message: Message, fields: Fields):
+    errors: list[str] = []
+    for name, (required, is_valid, description) in fields.items():
+        if name not in message:
+            if required:
+                errors.append(f"{name} is missing")
+        elif not is_valid(message[name]):
+            errors.append(f"{name} must be {description}, not {message[name]!r}")
+    return errors
+
+
+def validate_request(request: Message):
+    """Raise if the request names no known command or its fields are missing or
+    of the wrong type, before any of them reaches the VTK thread."""
+    if not isinstance(request, dict):
+        raise TypeError(f"Requests must be objects, not {request!r}.")
+    command = request.get("command")
+    if command not in REQUEST_FIELDS:
+        raise ValueError(f"Unknown command {command}.")
+    errors = get_field_errors(request, REQUEST_FIELDS[command])
+    if not errors and command == "render":
+        errors = [
+            f"job {error}" for error in get_field_errors(request["job"], JOB_FIELDS)
+        ]
+    if errors:
+        raise TypeError(f"Invalid {command} request: {'; '.join(errors)}.")
+
+
+def get_volume_info(image: vtkImageData):
+    return VolumeInfo(
+        extent=image.GetExtent(),
+        origin=image.GetOrigin(),
+        spacing=image.GetSpacing(),
+        scalar_range=image.GetScalarRange(),
+    )
+
+
+class RenderServer(ThreadingMixIn, UnixStreamServer):
+    """Serve the volumes named by clients, each loaded once for all of them,
+    with their isosurfaces compressed and their offscreen renderings as PNG.
+
+    Connections are handled on threads of their own, but every VTK pipeline
+    and the OpenGL context run on a single thread, which also keeps the
+    isosurfaces cached across clients.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        socket_path: str,
+        contour_config: ContourConfig,
+        cache_size: int,
+        store_config: SurfaceStoreConfig | None = None,
+    ):
+        # Volumes are held whole for every client to share.
+        contour_config = ContourConfig(**{**contour_config, "stream_slab": 0})
+        self.renderer = BatchRenderer(contour_config, cache_size, store_config)
+        self.contour_filter = CachedContourFilter(
+            build_contour_filter(contour_config), self.renderer.cache, contour_config
+        )
+        self.gradient_readers: dict[str, ImageReader] = {}
+        self.vtk_executor = ThreadPoolExecutor(1)
+        super().__init__(socket_path, RenderRequestHandler)
+
+    def run(self, function: Callable[..., Result], *args: Any) -> Result:
+        return self.vtk_executor.submit(function, *args).result()
+
+    def get_reader(self, data_filename: str) -> VolumeReader:
+        if data_filename not in self.renderer.scenes and not os.path.isfile(
+            data_filename
+        ):
+            raise FileNotFoundError(f"No dataset at {data_filename}.")
+        reader = self.renderer.get_scene(data_filename).reader
+        assert isinstance(reader, VolumeReader)
+        return reader
+
+    def get_gradient_reader(self, data_filename: str):
+        if data_filename not in self.gradient_readers:
+            self.gradient_readers[data_filename] = read_gradient(
+                None, self.get_reader(data_filename)
+            )
+        return self.gradient_readers[data_filename]
+
+    def get_info(self, data_filename: str):
+        return get_volume_info(self.get_reader(data_filename).GetOutput())
+
+    def contour(
+        self,
+        data_filename: str,
+        values: list[float],
+        extent: Extent | None,
+        gradient: bool,
+    ):
+        image = self.get_reader(data_filename).GetOutput()
+        if extent is not None:
+            image = crop_image(image, tuple(extent))
+        self.contour_filter.SetInputDataObject(0, image)
+        self.contour_filter.SetNumberOfContours(len(values))
+        for i, value in enumerate(values):
+            self.contour_filter.SetValue(i, value)
+        self.contour_filter.Update()
+        surface = vtkPolyData()
+        surface.ShallowCopy(self.contour_filter.GetOutputDataObject(0))
+        if not gradient:
+            return surface
+
+        probe_filter = vtkProbeFilter()
+        probe_filter.SetInputData(surface)
+        probe_filter.SetSourceConnection(
+            self.get_gradient_reader(data_filename).GetOutputPort()
+        )
+        probe_filter.Update()
+        return probe_filter.GetOutput()
+
+    def render(self, job: BatchJob):
+        self.get_reader(job["input"])
+        return self.renderer.get_scene(job["input"]).render_to_memory(job)
+
+    def respond(self, request: Message) -> tuple[Message, bytes]:
+        validate_request(request)
+        command = request["command"]
+        if command == "info":
+            return dict(self.run(self.get_info, request["input"])), b""
+        if command == "contour":
+            surface = self.run(
+                self.contour,
+                request["input"],
+                request["values"],
+                request.get("extent"),
+                request.get("gradient", False),
+            )
+            header, payload = encode_surface(surface)
+            return dict(header), payload
+        return {}, self.run(self.render, request["job"])
+
+    def server_close(self):
+        super().server_close()
+        self.vtk_executor.shutdown()
+        try:
+            os.remove(self.server_address)
+        except FileNotFoundError:
+            pass
+
+
+class RenderRequestHandler(StreamRequestHandler):
+    server: RenderServer
+
+    def handle(self):
+        while True:
+            try:
+                request, _ = read_message(self.rfile)
+            except ConnectionError:
+                return
+            # Whatever fails, the client gets an error instead of a closed
+            # connection.
+            try:
+                header, payload = self.server.respond(request)
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                header, payload = {"error": f"{type(error).__name__}: {error}"}, b""
+            try:
+                write_message(self.wfile, header, payload)
+            except ConnectionError:
+                # The client left without waiting for the response.
+                return
+
+
+class RenderClient:
+    """Connection to a `RenderServer`, naming the datasets by absolute path
+    since the server runs from another directory."""
+
+    def __init__(self, socket_path: str):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.connect(socket_path)
+        self.stream = self.socket.makefile("rwb")
+        # Requests come from the GUI thread and the pipeline update thread.
+        self.lock = threading.Lock()
+
+    def request(self, request: Message) -> tuple[Message, bytes]:
+        with self.lock:
+            write_message(self.stream, request)
+            header, payload = read_message(self.stream)
+        if "error" in header:
+            raise RuntimeError(f"The render server failed: {header['error']}")
+        return header, payload
+
+    def get_info(self, data_filename: str) -> VolumeInfo:
+        header, _ = self.request(
+            {"command": "info", "input": os.path.abspath(data_filename)}
+        )
+        return VolumeInfo(**header)
+
+    def read_volume(self, data_filename: str):
+        """Return the geometry of the volume held by the server."""
+        info = self.get_info(data_filename)
+        image = vtkImageData()
+        image.SetExtent(*info["extent"])
+        image.SetOrigin(*info["origin"])
+        image.SetSpacing(*info["spacing"])
+        return RemoteVolumeReader(image, data_filename, tuple(info["scalar_range"]))
+
+    def contour(
+        self,
+        data_filename: str,
+        values: list[float],
+        extent: Extent | None = None,
+        gradient: bool = False,
+    ):
+        """Return the isosurface of the values within the extent of the
+        volume, with the gradient magnitude probed onto it as scalars if
+        asked to."""
+        header, payload = self.request(
+            {
+                "command": "contour",
+                "input": os.path.abspath(data_filename),
+                "values": [float(value) for value in values],
+                "extent": extent,
+                "gradient": gradient,
+            }
+        )
+        return decode_surface(SurfaceHeader(**header), payload)
+
+    def render(self, job: BatchJob) -> bytes:
+        """Render the job on the server, returning the PNG instead of writing
+        its output."""
+        _, payload = self.request(
+            {
+                "command": "render",
+                "job": {**job, "input": os.path.abspath(job["input"])},
+            }
+        )
+        return payload
+
+    def close(self):
+        self.stream.close()
+        self.socket.close()
+
+
+def render_jobs_remotely(client: RenderClient, jobs: list[BatchJob]) -> Iterator[str]:
+    for job in jobs:
+        png = client.render(job)
+        with open(job["output"], "wb") as f:
+            f.write(png)
+        yield job["output"]
+
+
+class RemoteContourFilter(VTKPythonAlgorithmBase):
+    """Contour the volume held by the render server within the extent of the
+    input, whose geometry is all that is read of it."""
+
+    def __init__(self, client: RenderClient, data_filename: str):
+        super().__init__(
+            nInputPorts=1,
+            inputType="vtkImageData",
+            nOutputPorts=1,
+            outputType="vtkPolyData",
+        )
+        self.client = client
+        self.data_filename = data_filename
+        self.values: dict[int, float] = {}
+
+    def SetValue(self, i: int, value: float):  # pylint: disable=invalid-name
+        if self.values.get(i) != value:
+            self.values[i] = value
+            self.Modified()
+
+    # pylint: disable=invalid-name
+    def RequestData(
+        self,
+        request: vtkInformation,
+        inInfo: tuple[vtkInformationVector],
+        outInfo: vtkInformationVector,
+    ):
+        image = vtkImageData.GetData(inInfo[0])
+        output = vtkPolyData.GetData(outInfo)
+        if not self.values:
+            output.ShallowCopy(vtkPolyData())
+            return 1
+        output.ShallowCopy(
+            self.client.contour(
+                self.data_filename,
+                [self.values[i] for i in sorted(self.values)],
+                image.GetExtent(),
+            )
+        )
+        return 1
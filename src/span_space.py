@@ -0,0 +1,261 @@
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypedDict
+
+import numpy as np
+import numpy.typing as npt
+from vtkmodules.util.numpy_support import numpy_to_vtk, vtk_to_numpy
+from vtkmodules.vtkCommonCore import vtkInformation, vtkInformationVector
+from vtkmodules.vtkCommonDataModel import vtkImageData, vtkPolyData
+from vtkmodules.vtkFiltersCore import vtkAppendPolyData, vtkStaticCleanPolyData
+
+from src.contour_values import ContourValuesFilter
+from src.flying_edges import contour_image
+
+# Brick edge length of the index when enabled. Extracting brick by brick
+# measured slower than contouring the whole volume at once (see the
+# README), so it is off by default.
+BRICK_SIZE_DEFAULT = 8
+# Enough for the full and the downsampled level of detail of a volume.
+SPAN_SPACE_INDEX_CACHE_SIZE = 4
+
+
+class SpanSpaceIndex(TypedDict):
+    brick_size: int
+    extent: tuple[int, int, int, int, int, int]
+    # Indexed by (z, y, x) brick.
+    mins: npt.NDArray[np.float64]
+    maxs: npt.NDArray[np.float64]
+
+
+def get_image_scalars(image: vtkImageData) -> npt.NDArray[np.generic]:
+    """Return a (z, y, x) view of the point scalars without copying."""
+    x_size, y_size, z_size = image.GetDimensions()
+    scalars = vtk_to_numpy(image.GetPointData().GetScalars())
+    return scalars.reshape(z_size, y_size, x_size)
+
+
+def _reduce_bricks(
+    array: npt.NDArray[np.generic], axis: int, brick_size: int, ufunc: np.ufunc
+):
+    slices = np.moveaxis(array, axis, 0)
+    starts = np.arange(0, max(len(slices) - 1, 1), brick_size)
+    reduced = ufunc.reduceat(slices, starts, axis=0)
+    # A brick of cells spans one more point than it has cells, so every brick
+    # also has to see the first point slice of the next brick.
+    reduced[:-1] = ufunc(reduced[:-1], slices[starts[1:]])
+    return np.moveaxis(reduced, 0, axis)
+
+
+def build_span_space_index(image: vtkImageData, brick_size: int = BRICK_SIZE_DEFAULT):
+    scalars = get_image_scalars(image)
+    mins = scalars
+    maxs = scalars
+    for axis in range(3):
+        mins = _reduce_bricks(mins, axis, brick_size, np.minimum)
+        maxs = _reduce_bricks(maxs, axis, brick_size, np.maximum)
+
+    return SpanSpaceIndex(
+        brick_size=brick_size,
+        extent=image.GetExtent(),
+        mins=mins.astype(np.float64),
+        maxs=maxs.astype(np.float64),
+    )
+
+
+def get_active_bricks(index: SpanSpaceIndex, values: list[float]):
+    active = np.zeros(index["mins"].shape, dtype=bool)
+    for value in values:
+        active |= (index["mins"] <= value) & (value <= index["maxs"])
+    return active
+
+
+def get_run_bounds(row: npt.NDArray[np.bool_]):
+    """Return the (start, end) brick indexes of the runs of active bricks."""
+    edges = np.flatnonzero(np.diff(np.concatenate(([False], row, [False]))))
+    return set(zip(edges[::2].tolist(), edges[1::2].tolist()))
+
+
+def get_active_boxes(layer: npt.NDArray[np.bool_]):
+    """Cover the active bricks of a (y, x) layer with the (y_start, y_end,
+    x_start, x_end) boxes made of the runs along X repeated over consecutive Y
+    rows, leaving out the inactive bricks a shell encloses."""
+    boxes: list[tuple[int, int, int, int]] = []
+    # Starting row of the boxes still growing, by their run.
+    open_runs: dict[tuple[int, int], int] = {}
+    for j, row in enumerate(layer):
+        runs = get_run_bounds(row)
+        for run in [run for run in open_runs if run not in runs]:
+            boxes.append((open_runs.pop(run), j, *run))
+        for run in runs:
+            open_runs.setdefault(run, j)
+    boxes += [(start, len(layer), *run) for run, start in open_runs.items()]
+    return boxes
+
+
+def get_active_extents(index: SpanSpaceIndex, values: list[float]):
+    """Return the VOI extents covering the active bricks, boxes of them within
+    each Z brick layer."""
+    active = get_active_bricks(index, values)
+    brick_size = index["brick_size"]
+    x_min, x_max, y_min, y_max, z_min, z_max = index["extent"]
+
+    return [
+        (
+            x_min + x_start * brick_size,
+            min(x_min + x_end * brick_size, x_max),
+            y_min + y_start * brick_size,
+            min(y_min + y_end * brick_size, y_max),
+            z_min + k * brick_size,
+            min(z_min + (k + 1) * brick_size, z_max),
+        )
+        for k, layer in enumerate(active)
+        for y_start, y_end, x_start, x_end in get_active_boxes(layer)
+    ]
+
+
+def get_point_arrays(image: vtkImageData):
+    """Return (z, y, x, components) views of the point arrays of the image,
+    with their names and whether they are the scalars."""
+    x_size, y_size, z_size = image.GetDimensions()
+    point_data = image.GetPointData()
+    return [
+        (
+            point_data.GetArrayName(i),
+            vtk_to_numpy(point_data.GetArray(i)).reshape(z_size, y_size, x_size, -1),
+            point_data.GetArray(i) is point_data.GetScalars(),
+        )
+        for i in range(point_data.GetNumberOfArrays())
+    ]
+
+
+def crop_point_arrays(
+    image: vtkImageData,
+    point_arrays: list[tuple[str, npt.NDArray[np.generic], bool]],
+    extent: tuple[int, int, int, int, int, int],
+):
+    """Copy the extent of the point arrays into an image of its own, without
+    going through the pipeline of the image, which is not thread-safe."""
+    x_min, _, y_min, _, z_min, _ = image.GetExtent()
+    cropped = vtkImageData()
+    cropped.SetOrigin(image.GetOrigin())
+    cropped.SetSpacing(image.GetSpacing())
+    cropped.SetExtent(*extent)
+    region = (
+        slice(extent[4] - z_min, extent[5] - z_min + 1),
+        slice(extent[2] - y_min, extent[3] - y_min + 1),
+        slice(extent[0] - x_min, extent[1] - x_min + 1),
+    )
+    for name, values, is_scalars in point_arrays:
+        array = numpy_to_vtk(values[region].reshape(-1, values.shape[-1]), deep=True)
+        array.SetName(name)
+        if is_scalars:
+            cropped.GetPointData().SetScalars(array)
+        else:
+            cropped.GetPointData().AddArray(array)
+    return cropped
+
+
+def contour_extent(
+    image: vtkImageData,
+    point_arrays: list[tuple[str, npt.NDArray[np.generic], bool]],
+    extent: tuple[int, int, int, int, int, int],
+    values: list[float],
+) -> vtkPolyData:
+    return contour_image(crop_point_arrays(image, point_arrays, extent), values)
+
+
+def merge_surfaces(surfaces: list[vtkPolyData]):
+    """Append the surfaces extracted from neighbouring extents, merging the
+    vertices they share on the point layers the extents have in common."""
+    if not surfaces:
+        return vtkPolyData()
+    if len(surfaces) == 1:
+        return surfaces[0]
+
+    append_filter = vtkAppendPolyData()
+    for surface in surfaces:
+        append_filter.AddInputData(surface)
+
+    # Both extents place a seam vertex by interpolating the same edge, so the
+    # duplicates are exactly coincident.
+    clean_filter = vtkStaticCleanPolyData()
+    clean_filter.SetTolerance(0.0)
+    clean_filter.ConvertLinesToPointsOff()
+    clean_filter.ConvertPolysToLinesOff()
+    clean_filter.ConvertStripsToPolysOff()
+    clean_filter.SetInputConnection(append_filter.GetOutputPort())
+    clean_filter.Update()
+    return clean_filter.GetOutput()
+
+
+class SpanSpaceIndexCache:
+    """Span-space indexes of the most recently contoured volumes, shared by
+    every filter contouring them."""
+
+    def __init__(self, size: int = SPAN_SPACE_INDEX_CACHE_SIZE):
+        self.size = size
+        self._indexes: OrderedDict[tuple[int, int], SpanSpaceIndex] = OrderedDict()
+
+    def __len__(self):
+        return len(self._indexes)
+
+    def get(self, image: vtkImageData, brick_size: int):
+        # Modification times are unique across VTK objects, so they identify
+        # the volume and its content.
+        key = (image.GetMTime(), brick_size)
+        index = self._indexes.get(key)
+        if index is None:
+            index = build_span_space_index(image, brick_size)
+            self._indexes[key] = index
+            if len(self._indexes) > self.size:
+                self._indexes.popitem(last=False)
+        self._indexes.move_to_end(key)
+        return index
+
+
+class SpanSpaceContourFilter(ContourValuesFilter):
+    """Drop-in replacement of `vtkContourFilter` for image data that only
+    contours the bricks whose scalar range straddles an isovalue, box by box on
+    a thread pool."""
+
+    def __init__(
+        self,
+        brick_size: int = BRICK_SIZE_DEFAULT,
+        index_cache: SpanSpaceIndexCache | None = None,
+        workers: int | None = None,
+    ):
+        super().__init__()
+        self.brick_size = brick_size
+        self.index_cache = index_cache or SpanSpaceIndexCache()
+        self.workers = workers or os.cpu_count()
+
+    def GetIndex(self, image: vtkImageData):  # pylint: disable=invalid-name
+        # The index is built once per loaded volume.
+        return self.index_cache.get(image, self.brick_size)
+
+    # pylint: disable=invalid-name
+    def RequestData(
+        self,
+        request: vtkInformation,
+        inInfo: tuple[vtkInformationVector],
+        outInfo: vtkInformationVector,
+    ):
+        image = vtkImageData.GetData(inInfo[0])
+        output = vtkPolyData.GetData(outInfo)
+        values = self.get_values()
+
+        extents = get_active_extents(self.GetIndex(image), values)
+        # Workers only read the arrays of the shared input and contour images
+        # of their own.
+        point_arrays = get_point_arrays(image)
+        with ThreadPoolExecutor(self.workers) as executor:
+            surfaces = list(
+                executor.map(
+                    lambda extent: contour_extent(image, point_arrays, extent, values),
+                    extents,
+                )
+            )
+        output.ShallowCopy(merge_surfaces(surfaces))
+        return 1
@@ -0,0 +1,133 @@
+import math
+from typing import Callable
+
+from vtkmodules.vtkCommonCore import vtkInformation, vtkInformationVector
+from vtkmodules.vtkCommonDataModel import vtkImageData, vtkPolyData
+from vtkmodules.vtkCommonExecutionModel import (
+    vtkAlgorithm,
+    vtkStreamingDemandDrivenPipeline,
+)
+from vtkmodules.vtkFiltersCore import vtkAppendPolyData
+from vtkmodules.vtkImagingCore import vtkExtractVOI
+
+from src.contour_values import ContourValuesFilter
+from src.flying_edges import contour_image
+
+Extent = tuple[int, int, int, int, int, int]
+
+
+def get_slab_extents(whole_extent: Extent, slab_size: int) -> list[Extent]:
+    """Split the extent into Z slabs of `slab_size` cells, each sharing its
+    last point layer with the first one of the next so no cell is lost."""
+    x_min, x_max, y_min, y_max, z_min, z_max = whole_extent
+    return [
+        (x_min, x_max, y_min, y_max, z, min(z + slab_size, z_max))
+        for z in range(z_min, max(z_max, z_min + 1), slab_size)
+    ]
+
+
+def get_piece_extent(whole_extent: Extent, piece: int, piece_count: int) -> Extent:
+    """Return the Z slab of the extent making up the given piece of it."""
+    x_min, x_max, y_min, y_max, z_min, z_max = whole_extent
+    z_size = z_max - z_min
+    return (
+        x_min,
+        x_max,
+        y_min,
+        y_max,
+        z_min + z_size * piece // piece_count,
+        z_min + z_size * (piece + 1) // piece_count,
+    )
+
+
+def get_slab_count(whole_extent: Extent, slab_size: int):
+    return max(math.ceil((whole_extent[5] - whole_extent[4]) / slab_size), 1)
+
+
+def crop_image(image: vtkImageData, extent: Extent):
+    """Return the image restricted to the extent, which upstream algorithms
+    unable to produce sub-extents (e.g. loaded volumes) do not do."""
+    if image.GetExtent() == extent:
+        return image
+    voi = vtkExtractVOI()
+    voi.SetInputData(image)
+    voi.SetVOI(*extent)
+    voi.Update()
+    return voi.GetOutput()
+
+
+def get_streamed_scalar_range(
+    algorithm: vtkAlgorithm,
+    slab_size: int,
+    on_progress: Callable[[float], None] | None = None,
+):
+    """Compute the scalar range of the algorithm output one slab at a time."""
+    algorithm.UpdateInformation()
+    whole_extent: Extent = algorithm.GetOutputInformation(0).Get(
+        vtkStreamingDemandDrivenPipeline.WHOLE_EXTENT()
+    )
+    slab_extents = get_slab_extents(whole_extent, slab_size)
+
+    scalar_min, scalar_max = math.inf, -math.inf
+    for i, extent in enumerate(slab_extents):
+        algorithm.UpdateExtent(extent)
+        slab_min, slab_max = algorithm.GetOutputDataObject(0).GetScalarRange()
+        scalar_min, scalar_max = min(scalar_min, slab_min), max(scalar_max, slab_max)
+        if on_progress is not None:
+            on_progress((i + 1) / len(slab_extents))
+    return scalar_min, scalar_max
+
+
+class StreamingContourFilter(ContourValuesFilter):
+    """Drop-in replacement of `vtkContourFilter` for image data that requests
+    and contours its input one Z slab at a time, so only a slab of the volume
+    is ever held in memory along with the extracted triangles."""
+
+    def __init__(self, slab_size: int):
+        super().__init__()
+        self.slab_size = slab_size
+        self._slab_extents: list[Extent] = []
+        self._slab_surfaces: list[vtkPolyData] = []
+
+    # pylint: disable=invalid-name
+    def RequestUpdateExtent(
+        self,
+        request: vtkInformation,
+        inInfo: tuple[vtkInformationVector],
+        outInfo: vtkInformationVector,
+    ):
+        in_info = inInfo[0].GetInformationObject(0)
+        if not self._slab_extents:
+            self._slab_extents = get_slab_extents(
+                in_info.Get(vtkStreamingDemandDrivenPipeline.WHOLE_EXTENT()),
+                self.slab_size,
+            )
+        in_info.Set(
+            vtkStreamingDemandDrivenPipeline.UPDATE_EXTENT(), self._slab_extents[0], 6
+        )
+        return 1
+
+    # pylint: disable=invalid-name
+    def RequestData(
+        self,
+        request: vtkInformation,
+        inInfo: tuple[vtkInformationVector],
+        outInfo: vtkInformationVector,
+    ):
+        image = crop_image(vtkImageData.GetData(inInfo[0]), self._slab_extents.pop(0))
+        self._slab_surfaces.append(contour_image(image, self.get_values()))
+
+        if self._slab_extents:
+            # Have the pipeline update the input with the next slab and call
+            # this again.
+            request.Set(vtkStreamingDemandDrivenPipeline.CONTINUE_EXECUTING(), 1)
+            return 1
+
+        request.Remove(vtkStreamingDemandDrivenPipeline.CONTINUE_EXECUTING())
+        append_filter = vtkAppendPolyData()
+        for surface in self._slab_surfaces:
+            append_filter.AddInputData(surface)
+        append_filter.Update()
+        self._slab_surfaces = []
+        vtkPolyData.GetData(outInfo).ShallowCopy(append_filter.GetOutput())
+        return 1
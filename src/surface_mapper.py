@@ -0,0 +1,142 @@
+import numpy as np
+from vtkmodules.util.numpy_support import numpy_to_vtk, vtk_to_numpy
+from vtkmodules.util.vtkAlgorithm import VTKPythonAlgorithmBase
+from vtkmodules.vtkCommonCore import (
+    VTK_FLOAT,
+    vtkDataArray,
+    vtkInformation,
+    vtkInformationVector,
+    vtkPoints,
+)
+from vtkmodules.vtkCommonDataModel import vtkCellArray, vtkPolyData
+from vtkmodules.vtkCommonExecutionModel import vtkAlgorithmOutput
+from vtkmodules.vtkFiltersCore import vtkStaticCleanPolyData
+from vtkmodules.vtkRenderingCore import vtkPolyDataMapper
+
+from src.surface_store import narrow_cell_ids
+
+
+def to_float32(array: vtkDataArray):
+    """Return the array as float32, as is when it already is."""
+    if array.GetDataType() == VTK_FLOAT:
+        return array
+    values = vtk_to_numpy(array)
+    compact_array = numpy_to_vtk(values.astype(np.float32), deep=True)
+    compact_array.SetName(array.GetName())
+    return compact_array
+
+
+def narrow_polys(polys: vtkCellArray):
+    """Return the polygons with 32-bit ids when they all fit."""
+    offsets, connectivity = narrow_cell_ids(
+        vtk_to_numpy(polys.GetOffsetsArray()),
+        vtk_to_numpy(polys.GetConnectivityArray()),
+    )
+    narrowed = vtkCellArray()
+    narrowed.SetData(
+        numpy_to_vtk(offsets, deep=True), numpy_to_vtk(connectivity, deep=True)
+    )
+    return narrowed
+
+
+def is_compact(surface: vtkPolyData, arrays: list[vtkDataArray]):
+    """Return whether the polygonal surface only holds float32 points used by
+    its polygons, 32-bit polygon ids and the float32 arrays given."""
+    if (
+        surface.GetPoints().GetDataType() != VTK_FLOAT
+        or surface.GetPolys().IsStorage64Bit()
+        or surface.GetPointData().GetNumberOfArrays() != len(arrays)
+        or any(array.GetDataType() != VTK_FLOAT for array in arrays)
+    ):
+        return False
+    used = np.zeros(surface.GetNumberOfPoints(), dtype=np.bool_)
+    used[vtk_to_numpy(surface.GetPolys().GetConnectivityArray())] = True
+    return bool(used.all())
+
+
+class CompactSurfaceFilter(VTKPythonAlgorithmBase):
+    """Reduce a surface to what the mapper uploads: float32 points and arrays,
+    32-bit polygon ids, no duplicate point (e.g. along the polygons clipped by
+    the gradient range filter), no point unused by a polygon (e.g. left over by
+    the gradient range and isovalue split filters, which share the points of
+    their input) and only the normals and the scalars it is colored by.
+
+    Surfaces already compact, e.g. by an upstream filter, are shallow copied
+    and taken as welded. Surfaces with cells other than polygons pass through
+    untouched.
+    """
+
+    def __init__(self, color_by_scalars: bool = True):
+        super().__init__(
+            nInputPorts=1,
+            inputType="vtkPolyData",
+            nOutputPorts=1,
+            outputType="vtkPolyData",
+        )
+        self.color_by_scalars = color_by_scalars
+        # Only merge coincident points, dropping the polygons they collapse,
+        # which also drops the points no polygon uses.
+        self.weld_filter = vtkStaticCleanPolyData()
+        self.weld_filter.SetTolerance(0.0)
+        self.weld_filter.ConvertPolysToLinesOff()
+        self.weld_filter.ConvertLinesToPointsOff()
+        self.weld_filter.ConvertStripsToPolysOff()
+
+    # pylint: disable=invalid-name
+    def RequestData(
+        self,
+        request: vtkInformation,
+        inInfo: tuple[vtkInformationVector],
+        outInfo: vtkInformationVector,
+    ):
+        surface = vtkPolyData.GetData(inInfo[0])
+        output = vtkPolyData.GetData(outInfo)
+        if (
+            surface.GetPoints() is None
+            or surface.GetNumberOfCells() != surface.GetNumberOfPolys()
+        ):
+            output.ShallowCopy(surface)
+            return 1
+
+        point_data = surface.GetPointData()
+        normals = point_data.GetNormals()
+        scalars = point_data.GetScalars() if self.color_by_scalars else None
+        if is_compact(
+            surface, [array for array in (normals, scalars) if array is not None]
+        ):
+            output.ShallowCopy(surface)
+            return 1
+
+        weld_input = vtkPolyData()
+        weld_input.SetPoints(surface.GetPoints())
+        weld_input.SetPolys(surface.GetPolys())
+        weld_input.GetPointData().SetNormals(normals)
+        weld_input.GetPointData().SetScalars(scalars)
+        self.weld_filter.SetInputData(weld_input)
+        self.weld_filter.Update()
+        welded = self.weld_filter.GetOutput()
+
+        points = vtkPoints()
+        points.SetData(to_float32(welded.GetPoints().GetData()))
+
+        output.Initialize()
+        output.SetPoints(points)
+        output.SetPolys(narrow_polys(welded.GetPolys()))
+        welded_point_data = welded.GetPointData()
+        if welded_point_data.GetNormals() is not None:
+            output.GetPointData().SetNormals(to_float32(welded_point_data.GetNormals()))
+        if welded_point_data.GetScalars() is not None:
+            output.GetPointData().SetScalars(to_float32(welded_point_data.GetScalars()))
+        return 1
+
+
+def build_surface_mapper(input_port: vtkAlgorithmOutput, color_by_scalars: bool = True):
+    """Build the mapper rendering the surface of the port through
+    `CompactSurfaceFilter`, coloring it by its scalars if asked to."""
+    compact_filter = CompactSurfaceFilter(color_by_scalars)
+    compact_filter.SetInputConnection(input_port)
+
+    mapper = vtkPolyDataMapper()
+    mapper.SetScalarVisibility(color_by_scalars)
+    mapper.SetInputConnection(compact_filter.GetOutputPort())
+    return mapper
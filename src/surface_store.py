@@ -0,0 +1,353 @@
+import argparse
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Callable, TypedDict
+
+import numpy as np
+import numpy.typing as npt
+from vtkmodules.util.numpy_support import numpy_to_vtk, vtk_to_numpy
+from vtkmodules.vtkCommonCore import vtkPoints
+from vtkmodules.vtkCommonDataModel import vtkCellArray, vtkImageData, vtkPolyData
+
+SURFACE_STORE_VERSION = 1
+SURFACE_STORE_SIZE_DEFAULT = 2048
+SURFACE_FILE_SUFFIX = ".surface"
+SURFACE_ARRAY_ALIGNMENT = 64
+# Digests of the last contour inputs, which are hashed once per modification.
+IMAGE_DIGEST_CACHE_SIZE = 4
+
+
+class SurfaceStoreConfig(TypedDict):
+    directory: str
+    # Budget of the stored files in MiB.
+    size: int
+
+
+class SurfaceArrayHeader(TypedDict):
+    name: str
+    dtype: str
+    components: int
+    offset: int
+    length: int
+
+
+class SurfaceHeader(TypedDict):
+    version: int
+    points: SurfaceArrayHeader
+    offsets: SurfaceArrayHeader
+    connectivity: SurfaceArrayHeader
+    point_arrays: list[SurfaceArrayHeader]
+    scalars: str | None
+
+
+def get_surface_store_config(args: argparse.Namespace) -> SurfaceStoreConfig | None:
+    if args.surface_store is None:
+        return None
+    return SurfaceStoreConfig(
+        directory=args.surface_store, size=args.surface_store_size
+    )
+
+
+def get_image_digest(image: vtkImageData):
+    """Hash the geometry and every point array of the image, so volumes with
+    the same content share their surfaces wherever they are read from."""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(
+        json.dumps([image.GetExtent(), image.GetOrigin(), image.GetSpacing()]).encode()
+    )
+    point_data = image.GetPointData()
+    for i in range(point_data.GetNumberOfArrays()):
+        values = np.ascontiguousarray(vtk_to_numpy(point_data.GetArray(i)))
+        digest.update(f"{point_data.GetArrayName(i)}:{values.dtype.str}".encode())
+        digest.update(memoryview(values).cast("B"))
+    return digest.hexdigest()
+
+
+class ImageDigestCache:
+    """Digests of the last images hashed, hashed again only once modified."""
+
+    def __init__(self):
+        self._digests: OrderedDict[Hashable, str] = OrderedDict()
+
+    def get(self, image: vtkImageData):
+        # Images sharing their arrays may report the same modification time.
+        key = (
+            image.GetMTime(),
+            image.GetExtent(),
+            image.GetOrigin(),
+            image.GetSpacing(),
+        )
+        digest = self._digests.get(key)
+        if digest is None:
+            digest = get_image_digest(image)
+            self._digests[key] = digest
+            if len(self._digests) > IMAGE_DIGEST_CACHE_SIZE:
+                self._digests.popitem(last=False)
+        self._digests.move_to_end(key)
+        return digest
+
+    def get_cropped(
+        self, source: vtkImageData, extent: tuple[int, int, int, int, int, int]
+    ):
+        """Return the digest of the extent of the source image, derived from
+        the digest of the source so each crop never hashes the volume again."""
+        return hashlib.blake2b(
+            json.dumps([self.get(source), extent]).encode(), digest_size=20
+        ).hexdigest()
+
+
+def align(offset: int):
+    return -(-offset // SURFACE_ARRAY_ALIGNMENT) * SURFACE_ARRAY_ALIGNMENT
+
+
+def narrow_cell_ids(
+    offsets: npt.NDArray[np.integer], connectivity: npt.NDArray[np.integer]
+):
+    """Return the ids of the cell array on 32 bits when they all fit, which VTK
+    uses as they are, and as they are otherwise."""
+    if (
+        max(offsets.max(initial=0), connectivity.max(initial=0))
+        < np.iinfo(np.int32).max
+    ):
+        return offsets.astype(np.int32), connectivity.astype(np.int32)
+    return offsets, connectivity
+
+
+def get_surface_arrays(polydata: vtkPolyData):
+    """Return the named arrays making up the surface, polygons first."""
+    point_data = polydata.GetPointData()
+    points = polydata.GetPoints()
+    polys = polydata.GetPolys()
+    offsets, connectivity = narrow_cell_ids(
+        vtk_to_numpy(polys.GetOffsetsArray()),
+        vtk_to_numpy(polys.GetConnectivityArray()),
+    )
+    arrays: list[tuple[str, npt.NDArray[np.generic]]] = [
+        ("points", vtk_to_numpy(points.GetData()) if points else np.zeros((0, 3))),
+        ("offsets", offsets),
+        ("connectivity", connectivity),
+    ]
+    return arrays + [
+        (point_data.GetArrayName(i), vtk_to_numpy(point_data.GetArray(i)))
+        for i in range(point_data.GetNumberOfArrays())
+    ]
+
+
+def get_surface_layout(polydata: vtkPolyData):
+    """Return the header of the surface and the arrays it lays out, each
+    starting on the alignment from the start of the data."""
+    arrays = get_surface_arrays(polydata)
+
+    array_headers: list[SurfaceArrayHeader] = []
+    offset = 0
+    for name, values in arrays:
+        array_headers.append(
+            SurfaceArrayHeader(
+                name=name,
+                dtype=values.dtype.newbyteorder("=").str,
+                components=values.shape[1] if values.ndim > 1 else 1,
+                offset=offset,
+                length=len(values),
+            )
+        )
+        offset = align(offset + values.nbytes)
+    scalars = polydata.GetPointData().GetScalars()
+    header = SurfaceHeader(
+        version=SURFACE_STORE_VERSION,
+        points=array_headers[0],
+        offsets=array_headers[1],
+        connectivity=array_headers[2],
+        point_arrays=array_headers[3:],
+        scalars=scalars.GetName() if scalars is not None else None,
+    )
+    return header, [values for _, values in arrays]
+
+
+def get_array_headers(header: SurfaceHeader):
+    """Return the headers of the arrays of the surface in their order."""
+    return [
+        header["points"],
+        header["offsets"],
+        header["connectivity"],
+        *header["point_arrays"],
+    ]
+
+
+def write_surface(polydata: vtkPolyData, filename: str):
+    """Write the points, polygons and point arrays of the surface uncompressed
+    after a JSON header line, replacing the file atomically so concurrent
+    readers never map a partial surface."""
+    header, arrays = get_surface_layout(polydata)
+    header_line = json.dumps(header).encode() + b"\n"
+    data_offset = align(len(header_line))
+
+    partial_filename = f"{filename}.{os.getpid()}.partial"
+    with open(partial_filename, "wb") as f:
+        f.write(header_line)
+        for values, array_header in zip(arrays, get_array_headers(header)):
+            f.seek(data_offset + array_header["offset"])
+            f.write(np.ascontiguousarray(values).tobytes())
+    os.replace(partial_filename, filename)
+
+
+def get_array_shape(array_header: SurfaceArrayHeader):
+    components = array_header["components"]
+    if components > 1:
+        return (array_header["length"], components)
+    return (array_header["length"],)
+
+
+def get_array_nbytes(array_header: SurfaceArrayHeader):
+    return (
+        array_header["length"]
+        * array_header["components"]
+        * np.dtype(array_header["dtype"]).itemsize
+    )
+
+
+def get_surface_data_size(header: SurfaceHeader):
+    return max(
+        array_header["offset"] + get_array_nbytes(array_header)
+        for array_header in get_array_headers(header)
+    )
+
+
+def map_surface_array(
+    filename: str, data_offset: int, array_header: SurfaceArrayHeader
+) -> npt.NDArray[np.generic]:
+    shape = get_array_shape(array_header)
+    if array_header["length"] == 0:
+        return np.zeros(shape, dtype=np.dtype(array_header["dtype"]))
+    return np.memmap(
+        filename,
+        dtype=np.dtype(array_header["dtype"]),
+        mode="r",
+        offset=data_offset + array_header["offset"],
+        shape=shape,
+    )
+
+
+def build_surface(
+    header: SurfaceHeader,
+    get_array: Callable[[SurfaceArrayHeader], npt.NDArray[np.generic]],
+):
+    """Wrap the arrays of the surface laid out by the header as polydata
+    without copying its points and point arrays."""
+    polydata = vtkPolyData()
+    points = vtkPoints()
+    # VTK keeps a reference to the arrays for as long as its own live.
+    points.SetData(numpy_to_vtk(get_array(header["points"])))
+    polydata.SetPoints(points)
+    polys = vtkCellArray()
+    # The cell array wraps the buffer of the ids in arrays of its own, which
+    # do not keep the given arrays alive, so the ids are copied.
+    polys.SetData(
+        numpy_to_vtk(get_array(header["offsets"]), deep=True),
+        numpy_to_vtk(get_array(header["connectivity"]), deep=True),
+    )
+    polydata.SetPolys(polys)
+    for array_header in header["point_arrays"]:
+        array = numpy_to_vtk(get_array(array_header))
+        array.SetName(array_header["name"])
+        polydata.GetPointData().AddArray(array)
+    if header["scalars"] is not None:
+        polydata.GetPointData().SetActiveScalars(header["scalars"])
+    return polydata
+
+
+def read_surface(filename: str):
+    """Map the stored surface into memory and wrap it as polydata without
+    copying. Return None when the file was written by another version."""
+    with open(filename, "rb") as f:
+        header: SurfaceHeader = json.loads(f.readline())
+        data_offset = align(f.tell())
+    if header["version"] != SURFACE_STORE_VERSION:
+        return None
+    return build_surface(
+        header,
+        lambda array_header: map_surface_array(filename, data_offset, array_header),
+    )
+
+
+class SurfaceStore:
+    """Extracted isosurfaces saved in a directory across launches and shared by
+    processes, keyed by the content of the volume they were extracted from,
+    their isovalues and the contour config. The least recently used files are
+    deleted beyond the size budget."""
+
+    def __init__(self, directory: str, size: int = SURFACE_STORE_SIZE_DEFAULT):
+        self.directory = directory
+        self.size_budget = size * 1024 * 1024
+        os.makedirs(directory, exist_ok=True)
+
+    def get_key(
+        self,
+        image_digest: str,
+        values: tuple[float, ...],
+        surface_config: dict[str, int | bool],
+    ):
+        """Return the key of the surface extracted at the values from the image
+        of the digest (see `ImageDigestCache`) with the config (see
+        `get_surface_config`)."""
+        values_digest = hashlib.blake2b(
+            json.dumps(
+                [
+                    SURFACE_STORE_VERSION,
+                    [float(value) for value in values],
+                    surface_config,
+                ],
+                sort_keys=True,
+            ).encode(),
+            digest_size=8,
+        ).hexdigest()
+        return f"{image_digest}-{values_digest}"
+
+    def get_filename(self, key: str):
+        return os.path.join(self.directory, f"{key}{SURFACE_FILE_SUFFIX}")
+
+    def get(self, key: str):
+        filename = self.get_filename(key)
+        try:
+            polydata = read_surface(filename)
+            # Mark the file as recently used for the eviction.
+            os.utime(filename)
+        except (OSError, ValueError):
+            return None
+        return polydata
+
+    def put(self, key: str, polydata: vtkPolyData):
+        if polydata.GetNumberOfCells() != polydata.GetNumberOfPolys():
+            # Only polygons are stored, which is all contours of volumes have.
+            return
+        try:
+            write_surface(polydata, self.get_filename(key))
+            self.evict()
+        except OSError:
+            # Failing to write only costs extracting the surface next time.
+            pass
+
+    def evict(self):
+        entries: list[tuple[float, int, str]] = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(SURFACE_FILE_SUFFIX):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.size_budget:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Evicted by another process sharing the store.
+                pass
+            total_size -= size
+
+
+def build_surface_store(config: SurfaceStoreConfig | None):
+    if config is None:
+        return None
+    return SurfaceStore(config["directory"], config["size"])
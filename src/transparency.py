@@ -0,0 +1,137 @@
+import argparse
+from typing import TypedDict
+
+from vtkmodules.vtkRenderingCore import vtkRenderer, vtkRenderWindow
+from vtkmodules.vtkRenderingOpenGL2 import (
+    vtkOrderIndependentTranslucentPass,
+    vtkRenderStepsPass,
+)
+
+TRANSPARENCY_MODES = ("peeling", "oit")
+MAX_PEELS_DEFAULT = 8
+FRAME_TIME_DEFAULT = 33.0
+# Let peeling stop once fewer than this fraction of the pixels change while
+# interacting, a full peel of nearly invisible fragments is not worth a frame.
+INTERACTIVE_OCCLUSION_RATIO = 0.05
+
+
+class TransparencyConfig(TypedDict):
+    mode: str
+    max_peels: int
+    # Target time of interactive frames in milliseconds.
+    frame_time: float
+
+
+def add_transparency_args(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--transparency",
+        choices=TRANSPARENCY_MODES,
+        default="peeling",
+        help="Blend translucent isosurfaces with dual depth peeling, exact up "
+        "to the peel budget, or with single pass weighted blended OIT, "
+        "approximate but with a constant cost (default: peeling)",
+    )
+    parser.add_argument(
+        "--max-peels",
+        type=int,
+        default=MAX_PEELS_DEFAULT,
+        metavar="N",
+        help="Set the number of depth peels of a still frame",
+    )
+    parser.add_argument(
+        "--frame-time",
+        type=float,
+        default=FRAME_TIME_DEFAULT,
+        metavar="MS",
+        help="Lower the number of depth peels while interacting until frames "
+        "render within the target time",
+    )
+
+
+def get_transparency_config(args: argparse.Namespace):
+    return TransparencyConfig(
+        mode=args.transparency,
+        max_peels=max(args.max_peels, 1),
+        frame_time=args.frame_time,
+    )
+
+
+def get_peel_budget(peels: int, frame_time: float, target: float, max_peels: int):
+    """Halve the peels of a frame over the target time and add one back to a
+    frame well within it, staying between 1 and `max_peels`."""
+    if frame_time > target:
+        return max(peels // 2, 1)
+    if frame_time < target / 2:
+        return min(peels + 1, max_peels)
+    return peels
+
+
+class PeelBudget:
+    """Adjust the depth peels of the renderer to the frame time target while
+    interacting and peel up to the maximum on still frames.
+
+    The budget reached is kept between interactions, so the next one starts
+    from a peel count known to fit the target.
+    """
+
+    def __init__(self, renderer: vtkRenderer, max_peels: int, frame_time: float):
+        self.renderer = renderer
+        self.max_peels = max_peels
+        self.frame_time = frame_time
+        self.peels = max_peels
+        self.interacting = False
+        renderer.AddObserver("EndEvent", self._on_render_end)
+        self.set_interacting(False)
+
+    def set_interacting(self, interacting: bool):
+        self.interacting = interacting
+        if interacting:
+            self.renderer.SetMaximumNumberOfPeels(self.peels)
+            self.renderer.SetOcclusionRatio(INTERACTIVE_OCCLUSION_RATIO)
+        else:
+            self.renderer.SetMaximumNumberOfPeels(self.max_peels)
+            self.renderer.SetOcclusionRatio(0.0)
+
+    def record_frame(self, frame_time: float):
+        """Adjust the budget of the next interactive frame to the time taken by
+        the last one, in milliseconds."""
+        if not self.interacting:
+            return
+        self.peels = get_peel_budget(
+            self.peels, frame_time, self.frame_time, self.max_peels
+        )
+        self.renderer.SetMaximumNumberOfPeels(self.peels)
+
+    def _on_render_end(self, *_: object):
+        self.record_frame(self.renderer.GetLastRenderTimeInSeconds() * 1000)
+
+
+def set_weighted_blended_oit(renderer: vtkRenderer):
+    """Blend the translucent geometry in a single weighted pass instead of
+    sorting it by peeling."""
+    render_steps = vtkRenderStepsPass()
+    oit_pass = vtkOrderIndependentTranslucentPass()
+    oit_pass.SetTranslucentPass(render_steps.GetTranslucentPass())
+    render_steps.SetTranslucentPass(oit_pass)
+    renderer.SetPass(render_steps)
+
+
+def set_up_transparency(
+    window: vtkRenderWindow,
+    renderer: vtkRenderer,
+    config: TransparencyConfig,
+):
+    """Set up the renderer to blend translucent actors as configured.
+
+    Return the peel budget to switch on interaction, or None when it does not
+    apply."""
+    if config["mode"] == "oit":
+        set_weighted_blended_oit(renderer)
+        return None
+
+    # The OpenGL renderer peels two layers per pass, front and back, when the
+    # hardware supports dual depth peeling.
+    window.SetAlphaBitPlanes(True)
+    window.SetMultiSamples(0)
+    renderer.SetUseDepthPeeling(True)
+    return PeelBudget(renderer, config["max_peels"], config["frame_time"])
@@ -0,0 +1,11 @@
+import pytest
+from vtkmodules.vtkImagingCore import vtkRTAnalyticSource
+
+
+@pytest.fixture(name="image")
+def fixture_image():
+    """A `vtkRTAnalyticSource` volume, longer along Z to catch swapped axes."""
+    source = vtkRTAnalyticSource()
+    source.SetWholeExtent(-10, 10, -10, 10, -12, 12)
+    source.Update()
+    return source.GetOutput()
@@ -0,0 +1,76 @@
+import json
+import os
+
+import pytest
+from vtkmodules.vtkImagingCore import vtkRTAnalyticSource
+
+from src.batch import BatchJob, BatchRenderer, get_job_chunks, read_jobs
+from src.contour import CONTOUR_CONFIG_DEFAULT
+from src.gradient import write_vti
+
+
+def write_jobs(tmp_path: str, jobs: list[dict[str, object]]):
+    filename = os.path.join(tmp_path, "jobs.json")
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(jobs, f)
+    return filename
+
+
+def test_read_jobs_requires_input_and_output(tmp_path: str):
+    jobs = [{"input": "a.vti", "output": "a.png", "value": 100}]
+    assert read_jobs(write_jobs(tmp_path, jobs)) == jobs
+
+    with pytest.raises(ValueError, match="output"):
+        read_jobs(write_jobs(tmp_path, [{"input": "a.vti"}]))
+
+
+def test_job_chunks_share_a_dataset():
+    jobs = [
+        BatchJob(input=data_filename, output=f"{data_filename}{i}.png")
+        for data_filename in ("a.vti", "b.vti")
+        for i in range(5)
+    ]
+
+    chunks = get_job_chunks(jobs, 2)
+
+    assert [len(chunk) for chunk in chunks] == [3, 2, 3, 2]
+    assert all(len({job["input"] for job in chunk}) == 1 for chunk in chunks)
+
+
+def test_scenes_are_reused_across_jobs(tmp_path: str):
+    source = vtkRTAnalyticSource()
+    source.SetWholeExtent(0, 20, 0, 20, 0, 20)
+    source.Update()
+    data_filename = os.path.join(tmp_path, "data.vti")
+    write_vti(source.GetOutput(), data_filename)
+
+    renderer = BatchRenderer(CONTOUR_CONFIG_DEFAULT, 64)
+    for value in (150, 200, 150):
+        scene = renderer.get_scene(data_filename)
+        scene.set_job(BatchJob(input=data_filename, output="", value=value))
+        scene.contour_filter.Update()
+
+    assert len(renderer.scenes) == 1
+    assert len(renderer.cache) == 2
+
+
+def test_datasets_of_same_geometry_keep_their_surfaces(tmp_path: str):
+    data_filenames = []
+    for maximum in (255.0, 400.0):
+        source = vtkRTAnalyticSource()
+        source.SetWholeExtent(0, 20, 0, 20, 0, 20)
+        source.SetMaximum(maximum)
+        source.Update()
+        data_filenames.append(os.path.join(tmp_path, f"data{maximum:.0f}.vti"))
+        write_vti(source.GetOutput(), data_filenames[-1])
+
+    renderer = BatchRenderer(CONTOUR_CONFIG_DEFAULT, 64)
+    bounds = []
+    for data_filename in data_filenames:
+        scene = renderer.get_scene(data_filename)
+        scene.set_job(BatchJob(input=data_filename, output="", value=150))
+        scene.contour_filter.Update()
+        bounds.append(scene.contour_filter.GetOutputDataObject(0).GetBounds())
+
+    assert bounds[0] != bounds[1]
+    assert len(renderer.cache) == 2
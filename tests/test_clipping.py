@@ -0,0 +1,35 @@
+import pytest
+from vtkmodules.vtkFiltersCore import (
+    vtkContourFilter,
+    vtkMassProperties,
+    vtkTriangleFilter,
+)
+from vtkmodules.vtkImagingCore import vtkRTAnalyticSource
+
+from src.clipping import get_axes_clip_filters
+
+
+def get_clipped_area(voi_clip: bool, clips: tuple[float, float, float]):
+    source = vtkRTAnalyticSource()
+    source.SetWholeExtent(0, 30, 0, 30, 0, 30)
+
+    contour_input, clip_filter, set_clips = get_axes_clip_filters(source, voi_clip)
+    contour_filter = vtkContourFilter()
+    contour_filter.SetValue(0, 150)
+    contour_filter.SetInputConnection(contour_input.GetOutputPort())
+    clip_filter.SetInputConnection(contour_filter.GetOutputPort())
+    set_clips(*clips)
+
+    triangle_filter = vtkTriangleFilter()
+    triangle_filter.SetInputConnection(clip_filter.GetOutputPort())
+    mass_properties = vtkMassProperties()
+    mass_properties.SetInputConnection(triangle_filter.GetOutputPort())
+    mass_properties.Update()
+    return mass_properties.GetSurfaceArea()
+
+
+@pytest.mark.parametrize("clips", [(30, 30, 30), (20, 25, 12), (17.5, 9.3, 22.1)])
+def test_voi_clip_matches_surface_clip(clips: tuple[float, float, float]):
+    assert get_clipped_area(True, clips) == pytest.approx(
+        get_clipped_area(False, clips), rel=1e-4
+    )
@@ -0,0 +1,53 @@
+import numpy as np
+from vtkmodules.util.numpy_support import numpy_to_vtk, vtk_to_numpy
+from vtkmodules.vtkRenderingCore import vtkColorTransferFunction
+
+from src.color_map import (
+    COLOR_MAP_ISOVALUE_DEFAULT,
+    bake_color_table,
+    build_lookup_table,
+    get_inferno16_points,
+    get_isovalue_points,
+    map_scalars,
+)
+
+
+def test_baked_table_matches_transfer_function():
+    points = get_isovalue_points(COLOR_MAP_ISOVALUE_DEFAULT)
+    ctf = vtkColorTransferFunction()
+    for value, color in points:
+        ctf.AddRGBPoint(value, *color)
+
+    table = bake_color_table(points)
+    samples = np.linspace(points[0][0], points[-1][0], len(table))
+    expected = np.array([ctf.GetColor(sample) for sample in samples]) * 255
+
+    np.testing.assert_allclose(table[:, :3], expected, atol=0.5)
+    assert (table[:, 3] == 255).all()
+
+
+def test_color_map_is_baked_once():
+    points = get_inferno16_points((0.0, 50.0))
+
+    assert bake_color_table(points) is bake_color_table(get_inferno16_points((0, 50)))
+    assert not bake_color_table(points).flags.writeable
+
+
+def test_scalars_are_mapped_as_lookup_table():
+    points = get_inferno16_points((0.0, 50.0))
+    scalars = np.random.default_rng(0).uniform(-10.0, 60.0, 1000)
+
+    colors = map_scalars(bake_color_table(points), (0.0, 50.0), scalars)
+
+    lut = build_lookup_table(points)
+    expected = vtk_to_numpy(lut.MapScalars(numpy_to_vtk(scalars), 0, -1))
+    np.testing.assert_array_equal(colors, expected)
+
+
+def test_lookup_table_holds_baked_table():
+    points = get_inferno16_points((0.0, 50.0))
+
+    table = vtk_to_numpy(build_lookup_table(points).GetTable())
+
+    np.testing.assert_array_equal(table, bake_color_table(points))
+    assert not np.shares_memory(table, bake_color_table(points))
@@ -0,0 +1,165 @@
+import pytest
+from vtkmodules.vtkFiltersCore import vtkContourFilter
+from vtkmodules.vtkImagingCore import vtkExtractVOI, vtkRTAnalyticSource
+
+from src import surface_store
+from src.clipping import AxesVOIFilter, get_axes_clip_bounds
+from src.contour_cache import CachedContourFilter, ContourCache
+
+
+def build_source():
+    source = vtkRTAnalyticSource()
+    source.SetWholeExtent(0, 15, 0, 15, 0, 15)
+    source.Update()
+    return source
+
+
+def build_cached_contour_filter(source: vtkRTAnalyticSource, cache: ContourCache):
+    cached_contour_filter = CachedContourFilter(vtkContourFilter(), cache)
+    cached_contour_filter.SetInputConnection(source.GetOutputPort())
+    return cached_contour_filter
+
+
+def test_cached_contour_matches_contour_filter():
+    source = build_source()
+    cache = ContourCache()
+    cached_contour_filter = build_cached_contour_filter(source, cache)
+    cached_contour_filter.SetValue(0, 100)
+    cached_contour_filter.Update()
+    cached_contour_filter.SetValue(0, 150)
+    cached_contour_filter.Update()
+
+    contour_filter = vtkContourFilter()
+    contour_filter.SetInputConnection(source.GetOutputPort())
+    contour_filter.SetValue(0, 150)
+    contour_filter.Update()
+
+    assert (
+        cached_contour_filter.GetOutputDataObject(0).GetNumberOfCells()
+        == contour_filter.GetOutput().GetNumberOfCells()
+    )
+    assert len(cache) == 2
+
+
+def test_cache_hit_skips_extraction():
+    source = build_source()
+    cache = ContourCache()
+    cached_contour_filter = build_cached_contour_filter(source, cache)
+    for value in (100, 150, 100):
+        cached_contour_filter.SetValue(0, value)
+        cached_contour_filter.Update()
+    extraction_time = cached_contour_filter.contour_filter.GetMTime()
+
+    cached_contour_filter.SetValue(0, 150)
+    cached_contour_filter.Update()
+
+    assert cached_contour_filter.contour_filter.GetMTime() == extraction_time
+    assert len(cache) == 2
+
+
+def test_cache_is_keyed_by_input_extent():
+    source = build_source()
+    voi_filter = vtkExtractVOI()
+    voi_filter.SetInputConnection(source.GetOutputPort())
+    voi_filter.SetVOI(0, 15, 0, 15, 0, 15)
+    cache = ContourCache()
+    cached_contour_filter = CachedContourFilter(vtkContourFilter(), cache)
+    cached_contour_filter.SetInputConnection(voi_filter.GetOutputPort())
+    cached_contour_filter.SetValue(0, 150)
+    cached_contour_filter.Update()
+    whole_cells = cached_contour_filter.GetOutputDataObject(0).GetNumberOfCells()
+
+    voi_filter.SetVOI(0, 7, 0, 15, 0, 15)
+    cached_contour_filter.Update()
+
+    assert cached_contour_filter.GetOutputDataObject(0).GetNumberOfCells() < whole_cells
+    assert len(cache) == 2
+
+
+def test_cache_evicts_least_recently_used():
+    source = build_source()
+    surfaces = ContourCache()
+    cached_contour_filter = build_cached_contour_filter(source, surfaces)
+    cached_contour_filter.SetValue(0, 100)
+    cached_contour_filter.Update()
+    surface = cached_contour_filter.GetOutputDataObject(0)
+
+    cache = ContourCache()
+    # Leave room for two copies of the same surface.
+    cache.memory_budget_kb = 2 * surface.GetActualMemorySize()
+    cache.put(1, surface)
+    cache.put(2, surface)
+    cache.get(1)
+    cache.put(3, surface)
+
+    assert 1 in cache and 3 in cache
+    assert 2 not in cache
+    assert cache.memory_kb <= cache.memory_budget_kb
+
+
+def test_cache_is_keyed_by_input_scalars():
+    cache = ContourCache()
+    sources = [build_source(), build_source()]
+    sources[1].SetMaximum(400.0)
+    cell_counts = []
+    for source in sources:
+        cached_contour_filter = build_cached_contour_filter(source, cache)
+        cached_contour_filter.SetValue(0, 150)
+        cached_contour_filter.Update()
+        cell_counts.append(
+            cached_contour_filter.GetOutputDataObject(0).GetNumberOfCells()
+        )
+
+    assert cell_counts[0] != cell_counts[1]
+    assert len(cache) == 2
+
+
+def test_cropped_inputs_are_keyed_by_the_volume_digest(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    hashed_extents = []
+
+    def get_image_digest(image):
+        hashed_extents.append(image.GetExtent())
+        return get_volume_digest(image)
+
+    get_volume_digest = surface_store.get_image_digest
+    monkeypatch.setattr(surface_store, "get_image_digest", get_image_digest)
+    source = build_source()
+    voi_filter = AxesVOIFilter()
+    voi_filter.SetInputConnection(source.GetOutputPort())
+    cache = ContourCache()
+    cached_contour_filter = CachedContourFilter(vtkContourFilter(), cache)
+    cached_contour_filter.SetInputConnection(voi_filter.GetOutputPort())
+    cached_contour_filter.SetValue(0, 150)
+    cell_counts = []
+    for x in (15, 7, 15):
+        voi_filter.SetBounds(*get_axes_clip_bounds(x, 15, 15))
+        cached_contour_filter.Update()
+        cell_counts.append(
+            cached_contour_filter.GetOutputDataObject(0).GetNumberOfCells()
+        )
+
+    assert hashed_extents == [source.GetOutput().GetExtent()]
+    assert cell_counts[1] < cell_counts[0] == cell_counts[2]
+    assert len(cache) == 2
+
+
+def test_removed_contours_are_not_extracted():
+    source = build_source()
+    cached_contour_filter = build_cached_contour_filter(source, ContourCache())
+    cached_contour_filter.SetValue(0, 150)
+    cached_contour_filter.SetValue(1, 100)
+    cached_contour_filter.Update()
+    cached_contour_filter.SetNumberOfContours(1)
+    cached_contour_filter.Update()
+
+    contour_filter = vtkContourFilter()
+    contour_filter.SetInputConnection(source.GetOutputPort())
+    contour_filter.SetValue(0, 150)
+    contour_filter.Update()
+
+    assert (
+        cached_contour_filter.GetOutputDataObject(0).GetNumberOfCells()
+        == contour_filter.GetOutput().GetNumberOfCells()
+    )
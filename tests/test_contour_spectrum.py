@@ -0,0 +1,84 @@
+import os
+
+import numpy as np
+from vtkmodules.util.numpy_support import numpy_to_vtk
+from vtkmodules.vtkCommonDataModel import vtkImageData
+from vtkmodules.vtkFiltersCore import vtkContourFilter, vtkMassProperties
+
+from src.contour_spectrum import (
+    compute_contour_spectrum,
+    estimate_cell_count,
+    find_boundary_isovalues,
+    get_contour_spectrum,
+    get_contour_spectrum_cache_filename,
+)
+from src.gradient import write_vti
+from src.span_space import get_image_scalars
+
+
+def build_sphere_image(size: int):
+    z, y, x = np.mgrid[:size, :size, :size] - (size - 1) / 2
+    image = vtkImageData()
+    image.SetDimensions(size, size, size)
+    scalars = numpy_to_vtk(np.sqrt(x * x + y * y + z * z).ravel(), deep=True)
+    image.GetPointData().SetScalars(scalars)
+    return image
+
+
+def test_spectrum_counts_cells_crossed_by_each_isosurface(image: vtkImageData):
+    spectrum = compute_contour_spectrum(image, samples=32, slab_size=4, workers=2)
+
+    scalars = get_image_scalars(image)
+    corners = [
+        scalars[z : z + 24, y : y + 20, x : x + 20]
+        for z in (0, 1)
+        for y in (0, 1)
+        for x in (0, 1)
+    ]
+    cell_mins, cell_maxs = np.min(corners, axis=0), np.max(corners, axis=0)
+    expected = [
+        np.count_nonzero((cell_mins <= value) & (cell_maxs >= value))
+        for value in spectrum["values"]
+    ]
+    np.testing.assert_array_equal(spectrum["cell_counts"], expected)
+    assert estimate_cell_count(spectrum, spectrum["values"][5]) == expected[5]
+
+
+def test_spectrum_estimates_isosurface_area():
+    image = build_sphere_image(40)
+    spectrum = compute_contour_spectrum(image, samples=33)
+
+    for index in (10, 16, 22):
+        contour_filter = vtkContourFilter()
+        contour_filter.SetInputData(image)
+        contour_filter.SetValue(0, spectrum["values"][index])
+        mass_properties = vtkMassProperties()
+        mass_properties.SetInputConnection(contour_filter.GetOutputPort())
+        mass_properties.Update()
+        np.testing.assert_allclose(
+            spectrum["areas"][index], mass_properties.GetSurfaceArea(), rtol=0.15
+        )
+    # The distance field grows by one per voxel everywhere.
+    np.testing.assert_allclose(spectrum["mean_gradients"][5:25], 1.0, rtol=0.05)
+
+
+def test_boundaries_are_mean_gradient_peaks(image: vtkImageData):
+    spectrum = compute_contour_spectrum(image, samples=8)
+    spectrum["mean_gradients"] = np.array([0.0, 1, 3, 2, 2, 5, 1, 4])
+
+    assert find_boundary_isovalues(spectrum, 2) == [
+        spectrum["values"][5],
+        spectrum["values"][7],
+    ]
+
+
+def test_spectrum_is_cached_next_to_dataset(tmp_path: str, image: vtkImageData):
+    data_filename = os.path.join(tmp_path, "data.vti")
+    write_vti(image, data_filename)
+
+    spectrum = get_contour_spectrum(data_filename, image, samples=16)
+    assert os.path.exists(get_contour_spectrum_cache_filename(data_filename, 16))
+
+    cached = get_contour_spectrum(data_filename, build_sphere_image(4), samples=16)
+    for key, values in spectrum.items():
+        np.testing.assert_array_equal(cached[key], values)
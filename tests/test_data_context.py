@@ -0,0 +1,70 @@
+import os
+
+import pytest
+from vtkmodules.vtkImagingCore import vtkRTAnalyticSource
+from vtkmodules.vtkIOXML import vtkXMLImageDataReader
+
+import isocomplete
+from src.contour import CONTOUR_CONFIG_DEFAULT
+from src.contour_cache import ContourCache
+from src.data_context import build_data_context
+from src.gradient import compute_gradient_magnitude, write_vti
+from src.span_space import BRICK_SIZE_DEFAULT
+
+
+def write_volumes(directory: str):
+    source = vtkRTAnalyticSource()
+    source.SetWholeExtent(-10, 10, -10, 10, -10, 10)
+    source.Update()
+    isovalue_filename = os.path.join(directory, "data.vti")
+    gradient_filename = os.path.join(directory, "gradmag.vti")
+    write_vti(source.GetOutput(), isovalue_filename)
+    write_vti(compute_gradient_magnitude(source.GetOutput()), gradient_filename)
+    return isovalue_filename, gradient_filename
+
+
+def build_counted_reader(filename: str, executions: list[str]):
+    reader = vtkXMLImageDataReader()
+    reader.SetFileName(filename)
+    reader.AddObserver("EndEvent", lambda *_: executions.append(filename))
+    return reader
+
+
+@pytest.mark.parametrize("row_count", [1, 4])
+@pytest.mark.parametrize("vertex_gradient", [False, True])
+def test_each_volume_is_read_once(tmp_path: str, row_count: int, vertex_gradient: bool):
+    filenames = write_volumes(tmp_path)
+    executions: list[str] = []
+    contour_config = {
+        **CONTOUR_CONFIG_DEFAULT,
+        "brick_size": BRICK_SIZE_DEFAULT,
+        "vertex_gradient": vertex_gradient,
+    }
+    context, _ = build_data_context(
+        *(build_counted_reader(filename, executions) for filename in filenames),
+        contour_config,
+        None,
+    )
+
+    contour_cache = ContourCache(0)
+    for i in range(row_count):
+        params = isocomplete.IsovalueParams(
+            value=100 + 20 * i,
+            gradient_range=(0.0, 1000.0),
+            color=(1.0, 1.0, 1.0),
+            opacity=1.0,
+        )
+        actor, set_clips = isocomplete.build_isosurface_actor(
+            params, context, contour_config, contour_cache
+        )
+        set_clips(15, 15, 15)
+        actor.GetMapper().GetInputAlgorithm().Update()
+        assert (
+            actor.GetMapper()
+            .GetInputAlgorithm()
+            .GetOutputDataObject(0)
+            .GetNumberOfCells()
+        )
+
+    assert sorted(executions) == sorted(filenames)
+    assert len(context["span_space_indexes"]) == 1
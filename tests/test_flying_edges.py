@@ -0,0 +1,71 @@
+import numpy as np
+from vtkmodules.util.numpy_support import vtk_to_numpy
+from vtkmodules.vtkFiltersCore import vtkContourFilter
+from vtkmodules.vtkImagingCore import vtkExtractVOI, vtkRTAnalyticSource
+
+from src.flying_edges import FlyingEdgesContourFilter
+from src.gradient import (
+    GRADIENT_ARRAY_NAME,
+    attach_gradient,
+    compute_gradient_magnitude,
+)
+
+
+def build_image():
+    source = vtkRTAnalyticSource()
+    source.SetWholeExtent(-10, 10, -10, 10, -10, 10)
+    source.Update()
+    image = source.GetOutput()
+    # The attached array shares the memory of the gradient image, which has to
+    # be kept along.
+    gradient_image = compute_gradient_magnitude(image)
+    return attach_gradient(image, gradient_image), gradient_image
+
+
+def contour(contour_filter, image, values: list[float]):
+    for i, value in enumerate(values):
+        contour_filter.SetValue(i, value)
+    contour_filter.SetInputDataObject(0, image)
+    contour_filter.Update()
+    return contour_filter.GetOutputDataObject(0)
+
+
+def test_flying_edges_matches_contour_filter():
+    image, _gradient_image = build_image()
+
+    surface = contour(FlyingEdgesContourFilter(), image, [120, 180])
+    expected = contour(vtkContourFilter(), image, [120, 180])
+
+    assert surface.GetNumberOfCells() == expected.GetNumberOfCells() > 0
+    np.testing.assert_allclose(
+        np.sort(vtk_to_numpy(surface.GetPointData().GetArray(GRADIENT_ARRAY_NAME))),
+        np.sort(vtk_to_numpy(expected.GetPointData().GetArray(GRADIENT_ARRAY_NAME))),
+        rtol=1e-5,
+    )
+
+
+def test_flat_image_is_contoured():
+    image, _gradient_image = build_image()
+    voi_filter = vtkExtractVOI()
+    voi_filter.SetInputData(image)
+    voi_filter.SetVOI(-10, 10, -10, 10, 0, 0)
+    voi_filter.Update()
+
+    surface = contour(FlyingEdgesContourFilter(), voi_filter.GetOutput(), [150])
+    expected = contour(vtkContourFilter(), voi_filter.GetOutput(), [150])
+
+    assert surface.GetNumberOfCells() == expected.GetNumberOfCells() > 0
+
+
+def test_flying_edges_drops_removed_contours():
+    image, _gradient_image = build_image()
+    contour_filter = FlyingEdgesContourFilter()
+    contour(contour_filter, image, [120, 180])
+    contour_filter.SetNumberOfContours(1)
+    contour_filter.Update()
+
+    expected = contour(vtkContourFilter(), image, [120])
+    assert (
+        contour_filter.GetOutputDataObject(0).GetNumberOfCells()
+        == expected.GetNumberOfCells()
+    )
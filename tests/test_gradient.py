@@ -0,0 +1,91 @@
+import os
+
+import numpy as np
+from vtkmodules.util.numpy_support import vtk_to_numpy
+from vtkmodules.vtkCommonDataModel import vtkImageData
+from vtkmodules.vtkFiltersCore import vtkContourFilter
+
+from src.gradient import (
+    build_gradient_filter,
+    compute_gradient_magnitude,
+    get_contour_input,
+    get_gradient_cache_filename,
+    read_gradient,
+    read_volumes,
+    write_vti,
+)
+from src.read_vti import ImageDataProducer, VolumeReader, read_vti
+from src.span_space import get_image_scalars
+
+
+def test_gradient_magnitude_matches_numpy(image: vtkImageData):
+    scalars = get_image_scalars(image).astype(np.float32)
+    expected = np.sqrt(sum(np.square(g) for g in np.gradient(scalars)))
+
+    gradient_image = compute_gradient_magnitude(image, slab_size=4, workers=2)
+
+    np.testing.assert_allclose(get_image_scalars(gradient_image), expected)
+
+
+def test_gradient_is_cached_next_to_input(tmp_path: str, image: vtkImageData):
+    data_filename = os.path.join(tmp_path, "data.vti")
+    write_vti(image, data_filename)
+    reader = read_vti(data_filename)
+
+    computed = read_gradient(None, reader)
+    assert os.path.exists(get_gradient_cache_filename(data_filename))
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".partial")]
+
+    cached = read_gradient(None, reader)
+    assert isinstance(cached, VolumeReader)
+    np.testing.assert_allclose(
+        get_image_scalars(cached.GetOutput()),
+        get_image_scalars(computed.GetOutput()),
+    )
+
+
+def test_vertex_gradient_matches_probe(image: vtkImageData):
+    isovalue_reader = ImageDataProducer(image)
+    gradient_reader = ImageDataProducer(
+        compute_gradient_magnitude(isovalue_reader.GetOutput())
+    )
+
+    gradient_scalars = []
+    for vertex_gradient in (False, True):
+        contour_filter = vtkContourFilter()
+        contour_filter.SetValue(0, 150)
+        contour_input = get_contour_input(
+            isovalue_reader, gradient_reader, vertex_gradient
+        )
+        contour_filter.SetInputConnection(contour_input.GetOutputPort())
+        gradient_filter = build_gradient_filter(gradient_reader, vertex_gradient)
+        gradient_filter.SetInputConnection(contour_filter.GetOutputPort())
+        gradient_filter.Update()
+        gradient_scalars.append(
+            vtk_to_numpy(
+                gradient_filter.GetOutputDataObject(0).GetPointData().GetScalars()
+            )
+        )
+
+    np.testing.assert_allclose(gradient_scalars[1], gradient_scalars[0], rtol=1e-5)
+
+
+def test_volumes_are_read_with_progress(tmp_path: str, image: vtkImageData):
+    data_filename = os.path.join(tmp_path, "data.vti")
+    write_vti(image, data_filename)
+    computed = read_volumes(data_filename, None)
+
+    progress: dict[str, float] = {}
+    isovalue_reader, gradient_reader = read_volumes(
+        data_filename, None, progress.__setitem__
+    )
+
+    assert progress == {
+        data_filename: 1.0,
+        get_gradient_cache_filename(data_filename): 1.0,
+    }
+    assert isovalue_reader.GetFileName() == data_filename
+    np.testing.assert_allclose(
+        get_image_scalars(gradient_reader.GetOutput()),
+        get_image_scalars(computed[1].GetOutput()),
+    )
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from vtkmodules.util.numpy_support import vtk_to_numpy
+from vtkmodules.vtkCommonExecutionModel import vtkAlgorithm
+from vtkmodules.vtkFiltersCore import (
+    vtkCellCenters,
+    vtkClipPolyData,
+    vtkContourFilter,
+    vtkElevationFilter,
+)
+from vtkmodules.vtkImagingCore import vtkRTAnalyticSource
+
+from src.gradient_range import GradientRangeFilter
+
+
+def build_surface_source():
+    source = vtkRTAnalyticSource()
+    source.SetWholeExtent(-10, 10, -10, 10, -10, 10)
+    contour_filter = vtkContourFilter()
+    contour_filter.SetValue(0, 150)
+    contour_filter.SetInputConnection(source.GetOutputPort())
+    elevation_filter = vtkElevationFilter()
+    elevation_filter.SetLowPoint(-10, 0, 0)
+    elevation_filter.SetHighPoint(10, 0, 0)
+    elevation_filter.SetInputConnection(contour_filter.GetOutputPort())
+    return elevation_filter
+
+
+def get_cell_centers(algorithm: vtkAlgorithm):
+    centers_filter = vtkCellCenters()
+    centers_filter.SetInputConnection(algorithm.GetOutputPort())
+    centers_filter.Update()
+    points = centers_filter.GetOutput().GetPoints()
+    if points is None:
+        return np.zeros((0, 3))
+    # Round away the precision lost by clipping so equal centers sort alike.
+    centers = np.round(vtk_to_numpy(points.GetData()), 4)
+    return centers[np.lexsort(centers.T)]
+
+
+@pytest.mark.parametrize("scalar_range", [(0.2, 0.7), (0.0, 1.0), (0.5, 0.5)])
+def test_range_matches_chained_clips(scalar_range: tuple[float, float]):
+    source = build_surface_source()
+
+    min_clip_filter = vtkClipPolyData()
+    min_clip_filter.SetValue(scalar_range[0])
+    min_clip_filter.SetInputConnection(source.GetOutputPort())
+    max_clip_filter = vtkClipPolyData()
+    max_clip_filter.SetValue(scalar_range[1])
+    max_clip_filter.SetInsideOut(True)
+    max_clip_filter.SetInputConnection(min_clip_filter.GetOutputPort())
+
+    range_filter = GradientRangeFilter((0.0, 1.0))
+    range_filter.SetRange(*scalar_range)
+    range_filter.SetInputConnection(source.GetOutputPort())
+
+    np.testing.assert_allclose(
+        get_cell_centers(range_filter), get_cell_centers(max_clip_filter), atol=1e-6
+    )
+
+
+def test_range_change_does_not_execute_upstream():
+    source = build_surface_source()
+    executions: list[object] = []
+    source.AddObserver("EndEvent", lambda *_: executions.append(source))
+    range_filter = GradientRangeFilter((0.0, 1.0))
+    range_filter.SetInputConnection(source.GetOutputPort())
+    range_filter.Update()
+    full_count = range_filter.GetOutputDataObject(0).GetNumberOfCells()
+
+    range_filter.SetMinimum(0.5)
+    range_filter.Update()
+
+    assert len(executions) == 1
+    assert 0 < range_filter.GetOutputDataObject(0).GetNumberOfCells() < full_count
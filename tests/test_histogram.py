@@ -0,0 +1,108 @@
+import os
+
+import numpy as np
+from vtkmodules.util.numpy_support import numpy_to_vtk, vtk_to_numpy
+from vtkmodules.vtkCommonDataModel import vtkImageData
+
+from src.gradient import compute_gradient_magnitude, read_volumes, write_vti
+from src.histogram import (
+    compute_joint_histogram,
+    get_bin_indices,
+    get_gradient_distribution,
+    get_histogram_cache_filename,
+    get_joint_histogram,
+    get_voxel_count,
+)
+from src.read_vti import ImageDataProducer
+from src.span_space import get_image_scalars
+
+
+def test_bins_split_range_evenly():
+    assert get_bin_indices(
+        [0.0, 0.49, 0.5, 1.0, 2.0, -1.0], (0.0, 1.0), 2
+    ).tolist() == [
+        0,
+        0,
+        1,
+        1,
+        1,
+        0,
+    ]
+    assert get_bin_indices([3.0], (3.0, 3.0), 8).tolist() == [0]
+
+
+def test_histogram_counts_every_voxel_once(image: vtkImageData):
+    gradient_image = compute_gradient_magnitude(image)
+
+    histogram = compute_joint_histogram(
+        ImageDataProducer(image), ImageDataProducer(gradient_image), 16, 4, 2
+    )
+
+    expected, _, _ = np.histogram2d(
+        get_image_scalars(image).ravel(),
+        get_image_scalars(gradient_image).ravel(),
+        bins=16,
+        range=(image.GetScalarRange(), gradient_image.GetScalarRange()),
+    )
+    np.testing.assert_array_equal(histogram["counts"], expected)
+    assert get_voxel_count(
+        histogram, histogram["value_range"], histogram["gradient_range"]
+    ) == (21 * 21 * 25)
+    assert get_gradient_distribution(histogram, 150.0).sum() == get_voxel_count(
+        histogram, (150.0, 150.0), histogram["gradient_range"]
+    )
+
+
+def test_streamed_histogram_matches_loaded(tmp_path: str, image: vtkImageData):
+    data_filename = os.path.join(tmp_path, "data.vti")
+    write_vti(image, data_filename)
+
+    histograms = [
+        compute_joint_histogram(*read_volumes(data_filename, None, None, 5), 16, 3),
+        compute_joint_histogram(*read_volumes(data_filename, None), 16, 3),
+    ]
+
+    np.testing.assert_array_equal(histograms[0]["counts"], histograms[1]["counts"])
+
+
+def test_histogram_is_cached_next_to_dataset(tmp_path: str, image: vtkImageData):
+    data_filename = os.path.join(tmp_path, "data.vti")
+    write_vti(image, data_filename)
+    readers = read_volumes(data_filename, None)
+
+    histogram = get_joint_histogram(data_filename, None, *readers, 16)
+    assert os.path.exists(get_histogram_cache_filename(data_filename, 16))
+
+    cached = get_joint_histogram(data_filename, None, *readers[::-1], 16)
+    np.testing.assert_array_equal(cached["counts"], histogram["counts"])
+    assert cached["value_range"] == histogram["value_range"]
+
+
+def test_histogram_cache_is_keyed_by_gradient(tmp_path: str, image: vtkImageData):
+    data_filename = os.path.join(tmp_path, "data.vti")
+    write_vti(image, data_filename)
+    gradient_filename = os.path.join(tmp_path, "gradmag.vti")
+    other_gradient = compute_gradient_magnitude(image)
+    scalars = other_gradient.GetPointData().GetScalars()
+    doubled = numpy_to_vtk(vtk_to_numpy(scalars) * 2, deep=True)
+    doubled.SetName(scalars.GetName())
+    other_gradient.GetPointData().SetScalars(doubled)
+    write_vti(other_gradient, gradient_filename)
+
+    derived = get_joint_histogram(
+        data_filename, None, *read_volumes(data_filename, None), 16
+    )
+    given = get_joint_histogram(
+        data_filename,
+        gradient_filename,
+        *read_volumes(data_filename, gradient_filename),
+        16,
+    )
+
+    assert given["gradient_range"] != derived["gradient_range"]
+    assert (
+        get_joint_histogram(
+            data_filename, None, *read_volumes(data_filename, None), 16
+        )["gradient_range"]
+        == derived["gradient_range"]
+    )
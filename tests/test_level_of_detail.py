@@ -0,0 +1,59 @@
+from vtkmodules.vtkFiltersCore import vtkContourFilter
+from vtkmodules.vtkImagingCore import vtkRTAnalyticSource
+
+from src.clipping import get_axes_voi_clip_filters
+from src.contour_cache import CachedContourFilter, ContourCache
+from src.level_of_detail import (
+    downsample_image,
+    get_downsample_factor,
+    get_level_of_detail_source,
+)
+
+
+def build_source():
+    source = vtkRTAnalyticSource()
+    source.SetWholeExtent(-10, 10, -10, 10, -10, 10)
+    source.Update()
+    return source
+
+
+def test_downsample_factor_fits_voxel_budget():
+    assert get_downsample_factor((21, 21, 21), 21**3) == 1
+    assert get_downsample_factor((21, 21, 21), 2000) == 2
+    assert get_downsample_factor((21, 21, 21), 300) == 4
+    assert get_downsample_factor((21, 21, 21), 1) == 16
+
+
+def test_downsample_keeps_geometry_and_values():
+    image = build_source().GetOutput()
+    downsampled = downsample_image(image, 2)
+
+    assert downsampled.GetDimensions() == (11, 11, 11)
+    assert downsampled.GetBounds() == image.GetBounds()
+    assert downsampled.GetPointData().GetScalars().GetName() == "RTData"
+    assert downsampled.GetScalarComponentAsDouble(
+        3, 4, 5, 0
+    ) == image.GetScalarComponentAsDouble(-4, -2, 0, 0)
+
+
+def test_interaction_switches_level_and_caches_both():
+    source = build_source()
+    image_source, set_interacting = get_level_of_detail_source(source, 2000)
+    voi_filter, _, set_clips = get_axes_voi_clip_filters(image_source)
+    cache = ContourCache()
+    contour_filter = CachedContourFilter(vtkContourFilter(), cache)
+    contour_filter.SetInputConnection(voi_filter.GetOutputPort())
+    contour_filter.SetValue(0, 150)
+    set_clips(5, 5, 5)
+
+    contour_filter.Update()
+    full_cells = contour_filter.GetOutputDataObject(0).GetNumberOfCells()
+    set_interacting(True)
+    contour_filter.Update()
+    coarse_cells = contour_filter.GetOutputDataObject(0).GetNumberOfCells()
+    set_interacting(False)
+    contour_filter.Update()
+
+    assert coarse_cells < full_cells
+    assert contour_filter.GetOutputDataObject(0).GetNumberOfCells() == full_cells
+    assert len(cache) == 2
@@ -0,0 +1,139 @@
+import json
+import os
+
+import numpy as np
+import pytest
+from vtkmodules.util.numpy_support import vtk_to_numpy
+from vtkmodules.vtkImagingCore import vtkRTAnalyticSource
+
+from src.clipping import AXES_CLIP_MAX
+from src.contour import CONTOUR_CONFIG_DEFAULT
+from src.gradient import get_gradient_cache_filename, write_vti
+from src.mesh_export import (
+    PLY_FACE_DTYPE,
+    PLY_VERTEX_DTYPE,
+    MeshExportConfig,
+    MeshExporter,
+    export_meshes,
+    get_mesh_format,
+    prepare_volumes,
+)
+from src.params import IsovalueParams
+
+PARAMS_LIST = [
+    IsovalueParams(
+        value=150, gradient_range=(0.0, 1e9), color=(1.0, 0.5, 0.0), opacity=1.0
+    ),
+    IsovalueParams(
+        value=200, gradient_range=(10.0, 20.0), color=(0.0, 0.0, 1.0), opacity=0.5
+    ),
+    # Above the scalar range, so the surface is empty.
+    IsovalueParams(
+        value=1000, gradient_range=(0.0, 1e9), color=(0.0, 1.0, 0.0), opacity=1.0
+    ),
+]
+
+
+@pytest.fixture(name="config")
+def fixture_config(tmp_path: str):
+    source = vtkRTAnalyticSource()
+    source.SetWholeExtent(0, 20, 0, 20, 0, 20)
+    source.Update()
+    data_filename = os.path.join(tmp_path, "data.vti")
+    write_vti(source.GetOutput(), data_filename)
+    return MeshExportConfig(
+        input=data_filename, grad=None, clip=AXES_CLIP_MAX, color_by_gradient=False
+    )
+
+
+def read_ply(filename: str):
+    with open(filename, "rb") as f:
+        header = []
+        while not header or header[-1] != "end_header":
+            header.append(f.readline().decode("ascii").strip())
+        counts = [
+            int(line.split()[-1]) for line in header if line.startswith("element")
+        ]
+        vertices = np.fromfile(f, PLY_VERTEX_DTYPE, counts[0])
+        faces = np.fromfile(f, PLY_FACE_DTYPE, counts[1])
+        assert not f.read()
+    return header, vertices, faces
+
+
+def test_ply_indexes_vertices_of_all_surfaces(tmp_path: str, config: MeshExportConfig):
+    filename = os.path.join(tmp_path, "surfaces.ply")
+    parts = export_meshes(
+        filename, PARAMS_LIST, config, CONTOUR_CONFIG_DEFAULT, 64, workers=2
+    )
+
+    header, vertices, faces = read_ply(filename)
+    assert header[1] == "format binary_little_endian 1.0"
+    assert [part["triangle_count"] > 0 for part in parts] == [True, True, False]
+    first_count = parts[0]["vertex_count"]
+    assert len(vertices) == first_count + parts[1]["vertex_count"]
+    assert np.all(faces["count"] == 3)
+    first_faces = faces["vertex_indices"][: parts[0]["triangle_count"]]
+    second_faces = faces["vertex_indices"][parts[0]["triangle_count"] :]
+    assert first_faces.max() < first_count <= second_faces.min()
+    assert second_faces.max() < len(vertices)
+    assert np.all(vertices["red"][:first_count] == 255)
+    assert np.all(vertices["alpha"][first_count:] == 128)
+    # Only the vertices of triangles within the gradient range are kept.
+    second_gradients = vertices["gradient_magnitude"][second_faces]
+    assert np.all(second_gradients.max(axis=1) >= 10.0)
+    assert np.all(second_gradients.min(axis=1) <= 20.0)
+    assert not [name for name in os.listdir(tmp_path) if name.startswith(".export")]
+
+
+def test_gltf_positions_dequantize_to_surface(tmp_path: str, config: MeshExportConfig):
+    filename = os.path.join(tmp_path, "surfaces.gltf")
+    parts = export_meshes(
+        filename,
+        PARAMS_LIST,
+        MeshExportConfig(**{**config, "color_by_gradient": True}),
+        CONTOUR_CONFIG_DEFAULT,
+        64,
+        workers=1,
+    )
+
+    with open(filename, encoding="utf-8") as f:
+        gltf = json.load(f)
+    data = np.fromfile(os.path.join(tmp_path, "surfaces.bin"), np.uint8)
+    assert gltf["buffers"][0]["byteLength"] == len(data)
+    assert gltf["extensionsRequired"] == ["KHR_mesh_quantization"]
+    assert len(gltf["meshes"]) == 2
+    assert gltf["materials"][1]["alphaMode"] == "BLEND"
+
+    attributes = gltf["meshes"][0]["primitives"][0]["attributes"]
+    accessor = gltf["accessors"][attributes["POSITION"]]
+    view = gltf["bufferViews"][accessor["bufferView"]]
+    quantized = (
+        data[view["byteOffset"] : view["byteOffset"] + view["byteLength"]]
+        .view("<u2")
+        .reshape(-1, 4)[:, :3]
+    )
+    node = gltf["nodes"][0]
+    positions = quantized * np.array(node["scale"]) + np.array(node["translation"])
+    surface = MeshExporter(config, CONTOUR_CONFIG_DEFAULT, 64).extract(PARAMS_LIST[0])
+    expected = vtk_to_numpy(surface.GetPoints().GetData())
+    assert accessor["count"] == parts[0]["vertex_count"] == len(expected)
+    assert accessor["max"] == quantized.max(axis=0).tolist()
+    np.testing.assert_allclose(positions, expected, atol=np.max(node["scale"]))
+    assert "COLOR_0" in attributes
+
+
+def test_caches_are_written_before_workers_start(config: MeshExportConfig):
+    gradient_filename = get_gradient_cache_filename(config["input"])
+
+    worker_config = prepare_volumes(config)
+
+    assert os.path.exists(gradient_filename)
+    assert worker_config["grad"] == gradient_filename
+    assert worker_config["input"] == config["input"]
+
+
+def test_mesh_format_follows_extension():
+    assert get_mesh_format("surfaces.PLY") == "ply"
+    assert get_mesh_format("surfaces.gltf") == "gltf"
+    with pytest.raises(ValueError):
+        get_mesh_format("surfaces.obj")
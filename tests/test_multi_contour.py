@@ -0,0 +1,64 @@
+from vtkmodules.vtkFiltersCore import vtkContourFilter, vtkProbeFilter
+from vtkmodules.vtkImagingCore import vtkRTAnalyticSource
+
+from src.multi_contour import IsovalueSplitFilter, get_unique_values
+
+
+def build_source():
+    source = vtkRTAnalyticSource()
+    source.SetWholeExtent(-20, 20, -20, 20, -20, 20)
+    return source
+
+
+def build_split_filter(source: vtkRTAnalyticSource, values: list[float]):
+    contour_filter = vtkContourFilter()
+    for i, value in enumerate(get_unique_values(values)):
+        contour_filter.SetValue(i, value)
+    contour_filter.SetInputConnection(source.GetOutputPort())
+
+    probe_filter = vtkProbeFilter()
+    probe_filter.SetInputConnection(contour_filter.GetOutputPort())
+    probe_filter.SetSourceConnection(source.GetOutputPort())
+
+    split_filter = IsovalueSplitFilter(values)
+    split_filter.SetInputConnection(0, contour_filter.GetOutputPort())
+    split_filter.SetInputConnection(1, probe_filter.GetOutputPort())
+    split_filter.Update()
+    return split_filter, contour_filter
+
+
+def get_single_contour_cells(source: vtkRTAnalyticSource, value: float):
+    single_contour_filter = vtkContourFilter()
+    single_contour_filter.SetValue(0, value)
+    single_contour_filter.SetInputConnection(source.GetOutputPort())
+    single_contour_filter.Update()
+    return single_contour_filter.GetOutput().GetNumberOfCells()
+
+
+def test_split_matches_single_isovalue_contours():
+    source = build_source()
+    values = [100, 150, 200]
+
+    split_filter, _ = build_split_filter(source, values)
+
+    for i, value in enumerate(values):
+        assert split_filter.GetOutputDataObject(
+            i
+        ).GetNumberOfCells() == get_single_contour_cells(source, value)
+
+
+def test_rows_of_same_isovalue_share_triangles():
+    source = build_source()
+    values = [150, 100, 150]
+
+    split_filter, contour_filter = build_split_filter(source, values)
+
+    assert contour_filter.GetNumberOfContours() == 2
+    for i, value in enumerate(values):
+        assert split_filter.GetOutputDataObject(
+            i
+        ).GetNumberOfCells() == get_single_contour_cells(source, value)
+    assert (
+        split_filter.GetOutputDataObject(0).GetPolys()
+        is split_filter.GetOutputDataObject(2).GetPolys()
+    )
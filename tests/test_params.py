@@ -0,0 +1,22 @@
+import isocomplete
+from src.params import read_params
+
+
+def test_params_keep_alpha_apart_from_color(tmp_path):
+    filename = tmp_path / "params.txt"
+    filename.write_text(
+        "# <isovalue> <grad_min> <grad_max> <R> <G> <B> <alpha>\n"
+        "631 7156 66827 0.898 0.7098 0.631 0.3\n"
+        "1029 1473 31451 0.67 0.21 0.21\n",
+        encoding="utf-8",
+    )
+
+    params_list = read_params(str(filename))
+
+    assert params_list[0]["value"] == 631
+    assert params_list[0]["gradient_range"] == (7156.0, 66827.0)
+    assert params_list[0]["color"] == (0.898, 0.7098, 0.631)
+    assert params_list[0]["opacity"] == 0.3
+    assert params_list[1]["opacity"] == 1.0
+    # isocomplete.py reads its params file with the same reader.
+    assert isocomplete.read_params is read_params
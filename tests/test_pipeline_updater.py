@@ -0,0 +1,68 @@
+import time
+
+from PySide6.QtCore import QCoreApplication
+from vtkmodules.vtkFiltersCore import vtkContourFilter
+from vtkmodules.vtkImagingCore import vtkRTAnalyticSource
+from vtkmodules.vtkRenderingCore import vtkPolyDataMapper
+
+from src.pipeline_updater import ScheduledPipelineUpdater
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+
+class RenderWindowStub:
+    def __init__(self):
+        self.render_count = 0
+
+    def Render(self):  # pylint: disable=invalid-name
+        self.render_count += 1
+
+
+class WidgetStub:
+    def __init__(self):
+        self.render_window = RenderWindowStub()
+
+    def GetRenderWindow(self):  # pylint: disable=invalid-name
+        return self.render_window
+
+
+def process_events_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.001)
+
+
+def test_updates_are_coalesced_and_swapped_into_mapper():
+    source = vtkRTAnalyticSource()
+    source.SetWholeExtent(-20, 20, -20, 20, -20, 20)
+    contour_filter = vtkContourFilter()
+    contour_filter.SetInputConnection(source.GetOutputPort())
+    contour_filter.SetValue(0, 100)
+    mapper = vtkPolyDataMapper()
+    mapper.SetInputConnection(contour_filter.GetOutputPort())
+    widget = WidgetStub()
+
+    updater = ScheduledPipelineUpdater(widget, [mapper], 20)  # type: ignore
+    applied_values: list[int] = []
+
+    def set_value(value: int):
+        applied_values.append(value)
+        contour_filter.SetValue(0, value)
+
+    for value in range(100, 200, 10):
+        updater.update("isovalue", lambda value=value: set_value(value))
+    process_events_until(lambda: 190 in applied_values and updater.running.done())
+    process_events_until(lambda: widget.render_window.render_count == 2)
+
+    expected_filter = vtkContourFilter()
+    expected_filter.SetInputConnection(source.GetOutputPort())
+    expected_filter.SetValue(0, 190)
+    expected_filter.Update()
+
+    assert applied_values == [190]
+    assert mapper.GetInputAlgorithm().GetClassName() == "vtkTrivialProducer"
+    assert (
+        mapper.GetInput().GetNumberOfCells()
+        == expected_filter.GetOutput().GetNumberOfCells()
+    )
@@ -0,0 +1,69 @@
+import csv
+import json
+import os
+
+from vtkmodules.vtkFiltersCore import vtkContourFilter
+from vtkmodules.vtkImagingCore import vtkRTAnalyticSource
+
+from src.clipping import get_axes_clip_filter
+from src.profiling import PipelineProfiler, StageRecord
+
+
+def build_pipeline():
+    source = vtkRTAnalyticSource()
+    source.SetWholeExtent(0, 20, 0, 20, 0, 20)
+    contour_filter = vtkContourFilter()
+    contour_filter.SetValue(0, 150)
+    contour_filter.SetInputConnection(source.GetOutputPort())
+    clip_filter, set_clips = get_axes_clip_filter()
+    clip_filter.SetInputConnection(contour_filter.GetOutputPort())
+    return contour_filter, clip_filter, set_clips
+
+
+def test_profiler_records_every_stage():
+    contour_filter, clip_filter, set_clips = build_pipeline()
+    profiler = PipelineProfiler()
+    profiler.watch(contour_filter, "contour")
+    profiler.watch_pipeline(clip_filter)
+    listened: list[StageRecord] = []
+    profiler.listeners.append(listened.append)
+
+    clip_filter.Update()
+    set_clips(10, 10, 10)
+    clip_filter.Update()
+
+    assert [record["stage"] for record in profiler.records] == [
+        "vtkRTAnalyticSource",
+        "contour",
+        "vtkClipPolyData",
+        "vtkClipPolyData",
+    ]
+    assert listened == profiler.records
+    contour_record = profiler.records[1]
+    assert contour_record["input_cells"] == 20**3
+    assert contour_record["output_cells"] == (
+        contour_filter.GetOutput().GetNumberOfCells()
+    )
+    assert profiler.records[3]["input_cells"] == contour_record["output_cells"]
+    assert profiler.records[3]["output_cells"] < contour_record["output_cells"]
+
+
+def test_trace_is_written_as_csv_or_json(tmp_path: str):
+    _, clip_filter, _ = build_pipeline()
+    profiler = PipelineProfiler()
+    profiler.watch_pipeline(clip_filter)
+    clip_filter.Update()
+
+    csv_filename = os.path.join(tmp_path, "trace.csv")
+    profiler.write_trace(csv_filename)
+    with open(csv_filename, "r", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    json_filename = os.path.join(tmp_path, "trace.json")
+    profiler.write_trace(json_filename)
+    with open(json_filename, "r", encoding="utf-8") as f:
+        records = json.load(f)
+
+    assert [row["stage"] for row in rows] == [
+        record["stage"] for record in profiler.records
+    ]
+    assert records == profiler.records
@@ -0,0 +1,109 @@
+import os
+
+import numpy as np
+from vtkmodules.util.numpy_support import vtk_to_numpy
+from vtkmodules.vtkImagingCore import vtkRTAnalyticSource
+
+from src.gradient import compute_gradient_magnitude, write_vti
+from src.raw_volume import get_raw_volume_filename, read_raw_volume, write_raw_volume
+from src.read_vti import read_vti
+
+
+def build_image():
+    source = vtkRTAnalyticSource()
+    source.SetWholeExtent(-4, 12, 0, 9, 2, 7)
+    source.Update()
+    image = source.GetOutput()
+    image.GetPointData().AddArray(
+        compute_gradient_magnitude(image).GetPointData().GetScalars()
+    )
+    return image
+
+
+def test_raw_volume_round_trip(tmp_path: str):
+    image = build_image()
+    raw_filename = get_raw_volume_filename(os.path.join(tmp_path, "data.vti"))
+
+    write_raw_volume(image, raw_filename)
+    mapped = read_raw_volume(raw_filename)
+
+    assert mapped is not None
+    assert mapped.GetExtent() == image.GetExtent()
+    assert mapped.GetOrigin() == image.GetOrigin()
+    assert mapped.GetSpacing() == image.GetSpacing()
+    assert mapped.GetPointData().GetScalars().GetName() == "RTData"
+    for name in ("RTData", "GradientMagnitude"):
+        np.testing.assert_array_equal(
+            vtk_to_numpy(mapped.GetPointData().GetArray(name)),
+            vtk_to_numpy(image.GetPointData().GetArray(name)),
+        )
+
+
+def test_read_vti_maps_the_cached_copy(tmp_path: str):
+    data_filename = os.path.join(tmp_path, "data.vti")
+    write_vti(build_image(), data_filename)
+
+    parsed = read_vti(data_filename)
+    assert os.path.exists(get_raw_volume_filename(data_filename))
+    mapped = read_vti(data_filename)
+
+    scalars = mapped.GetOutput().GetPointData().GetScalars()
+    # numpy_to_vtk keeps a view of the wrapped NumPy array on the VTK array.
+    view = scalars._numpy_reference  # pylint: disable=protected-access
+    assert isinstance(view.base, np.memmap)
+    assert np.shares_memory(vtk_to_numpy(scalars), view)
+    np.testing.assert_array_equal(
+        vtk_to_numpy(scalars),
+        vtk_to_numpy(parsed.GetOutput().GetPointData().GetScalars()),
+    )
+    assert mapped.GetFileName() == data_filename
+
+
+def test_stale_cache_is_rewritten(tmp_path: str):
+    data_filename = os.path.join(tmp_path, "data.vti")
+    write_vti(build_image(), data_filename)
+    read_vti(data_filename)
+    raw_filename = get_raw_volume_filename(data_filename)
+    data_mtime = os.path.getmtime(data_filename)
+    os.utime(raw_filename, (data_mtime - 10, data_mtime - 10))
+
+    read_vti(data_filename)
+
+    assert os.path.getmtime(raw_filename) >= data_mtime
+
+
+def test_cache_leaves_raw_datasets_alone(tmp_path: str):
+    data_filename = os.path.join(tmp_path, "data.vti")
+    raw_dataset = os.path.join(tmp_path, "data.raw")
+    with open(raw_dataset, "wb") as f:
+        f.write(b"\0" * 64)
+    write_vti(build_image(), data_filename)
+
+    read_vti(data_filename)
+
+    assert get_raw_volume_filename(data_filename) != raw_dataset
+    with open(raw_dataset, "rb") as f:
+        assert f.read() == b"\0" * 64
+
+
+def test_unreadable_cache_is_rewritten(tmp_path: str):
+    data_filename = os.path.join(tmp_path, "data.vti")
+    write_vti(build_image(), data_filename)
+    read_vti(data_filename)
+    raw_filename = get_raw_volume_filename(data_filename)
+    size = os.path.getsize(raw_filename)
+
+    for content in (b"not a cache", b"{}", None):
+        if content is None:
+            os.truncate(raw_filename, size - 1)
+        else:
+            with open(raw_filename, "wb") as f:
+                f.write(content)
+        assert read_raw_volume(raw_filename) is None
+
+        reader = read_vti(data_filename)
+
+        assert os.path.getsize(raw_filename) == size
+        assert (
+            reader.GetOutput().GetNumberOfPoints() == build_image().GetNumberOfPoints()
+        )
@@ -0,0 +1,193 @@
+import io
+import os
+import threading
+
+import numpy as np
+import pytest
+from vtkmodules.util.numpy_support import vtk_to_numpy
+from vtkmodules.vtkCommonDataModel import vtkImageData
+from vtkmodules.vtkFiltersCore import vtkContourFilter
+from vtkmodules.vtkImagingCore import vtkExtractVOI, vtkRTAnalyticSource
+
+from src.contour import CONTOUR_CONFIG_DEFAULT
+from src.gradient import GRADIENT_ARRAY_NAME, write_vti
+from src.render_server import (
+    RemoteContourFilter,
+    RenderClient,
+    RenderServer,
+    decode_surface,
+    encode_surface,
+    read_message,
+    write_message,
+)
+
+
+def build_image(maximum: float = 255.0):
+    source = vtkRTAnalyticSource()
+    source.SetWholeExtent(0, 20, 0, 20, 0, 20)
+    source.SetMaximum(maximum)
+    source.Update()
+    return source.GetOutput()
+
+
+def contour(value: float, image: vtkImageData | None = None):
+    contour_filter = vtkContourFilter()
+    contour_filter.SetInputData(image if image is not None else build_image())
+    contour_filter.SetValue(0, value)
+    contour_filter.Update()
+    return contour_filter.GetOutput()
+
+
+@pytest.fixture(name="server")
+def fixture_server(tmp_path: str):
+    write_vti(build_image(), os.path.join(tmp_path, "data.vti"))
+    render_server = RenderServer(
+        os.path.join(tmp_path, "server.sock"), CONTOUR_CONFIG_DEFAULT, 64
+    )
+    thread = threading.Thread(target=render_server.serve_forever, daemon=True)
+    thread.start()
+    yield render_server
+    render_server.shutdown()
+    render_server.server_close()
+
+
+def test_messages_keep_their_payload():
+    stream = io.BytesIO()
+    write_message(stream, {"command": "info"}, b"\0payload")
+    write_message(stream, {"values": [1.5]})
+    stream.seek(0)
+
+    assert read_message(stream) == ({"command": "info"}, b"\0payload")
+    assert read_message(stream) == ({"values": [1.5]}, b"")
+    with pytest.raises(ConnectionError):
+        read_message(stream)
+
+
+def test_decoded_surface_matches_encoded():
+    surface = contour(150.0)
+
+    decoded = decode_surface(*encode_surface(surface))
+
+    for get_array in (
+        lambda polydata: polydata.GetPoints().GetData(),
+        lambda polydata: polydata.GetPolys().GetConnectivityArray(),
+        lambda polydata: polydata.GetPointData().GetScalars(),
+    ):
+        np.testing.assert_array_equal(
+            vtk_to_numpy(get_array(decoded)), vtk_to_numpy(get_array(surface))
+        )
+    assert decoded.GetPointData().GetScalars().GetName() == "RTData"
+
+
+def test_clients_share_volumes_loaded_once(tmp_path: str, server: RenderServer):
+    data_filename = os.path.join(tmp_path, "data.vti")
+    clients = [RenderClient(server.server_address) for _ in range(2)]
+
+    surfaces = [client.contour(data_filename, [150.0]) for client in clients]
+    reader = clients[1].read_volume(data_filename)
+
+    assert len(server.renderer.scenes) == 1
+    assert all(
+        surface.GetNumberOfCells() == contour(150.0).GetNumberOfCells()
+        for surface in surfaces
+    )
+    assert reader.scalar_range == build_image().GetScalarRange()
+    assert reader.GetOutput().GetPointData().GetNumberOfArrays() == 0
+    for client in clients:
+        client.close()
+
+
+def test_remote_contour_filter_extracts_input_extent(
+    tmp_path: str, server: RenderServer
+):
+    data_filename = os.path.join(tmp_path, "data.vti")
+    client = RenderClient(server.server_address)
+    reader = client.read_volume(data_filename)
+    voi = vtkExtractVOI()
+    voi.SetInputConnection(reader.GetOutputPort())
+    voi.SetVOI(0, 10, 0, 20, 0, 20)
+    contour_filter = RemoteContourFilter(client, data_filename)
+    contour_filter.SetInputConnection(voi.GetOutputPort())
+    contour_filter.SetValue(0, 150.0)
+    contour_filter.Update()
+
+    bounds = contour_filter.GetOutputDataObject(0).GetBounds()
+    assert 0 < bounds[1] <= 10
+    gradient_surface = client.contour(data_filename, [150.0], gradient=True)
+    assert gradient_surface.GetPointData().GetScalars().GetName() == (
+        GRADIENT_ARRAY_NAME
+    )
+    client.close()
+
+
+def test_server_errors_reach_client(tmp_path: str, server: RenderServer):
+    client = RenderClient(server.server_address)
+
+    with pytest.raises(RuntimeError, match="FileNotFoundError"):
+        client.contour(os.path.join(tmp_path, "missing.vti"), [150.0])
+    # The connection outlives the error.
+    info = client.get_info(os.path.join(tmp_path, "data.vti"))
+    assert info["extent"] == list(build_image().GetExtent())
+    client.close()
+
+
+def test_datasets_of_same_geometry_keep_their_surfaces(
+    tmp_path: str, server: RenderServer
+):
+    other_filename = os.path.join(tmp_path, "other.vti")
+    write_vti(build_image(maximum=400.0), other_filename)
+    client = RenderClient(server.server_address)
+
+    surfaces = [
+        client.contour(data_filename, [150.0])
+        for data_filename in (os.path.join(tmp_path, "data.vti"), other_filename)
+    ]
+
+    assert surfaces[0].GetBounds() != surfaces[1].GetBounds()
+    assert surfaces[1].GetNumberOfCells() == (
+        contour(150.0, build_image(maximum=400.0)).GetNumberOfCells()
+    )
+    client.close()
+
+
+@pytest.mark.parametrize(
+    "request_fields",
+    [
+        {"command": "contour", "values": "150"},
+        {"command": "contour", "values": [150.0], "extent": [0, 10]},
+        {"command": "contour", "values": [150.0], "gradient": "yes"},
+        {"command": "render", "job": {"output": 1}},
+        {"command": "render", "job": {"output": "out.png", "size": ["64", 64]}},
+    ],
+)
+def test_invalid_requests_reach_client_as_errors(
+    tmp_path: str, server: RenderServer, request_fields: dict[str, object]
+):
+    data_filename = os.path.join(tmp_path, "data.vti")
+    client = RenderClient(server.server_address)
+    request = {**request_fields}
+    if request["command"] == "render":
+        request["job"] = {"input": data_filename, **request["job"]}
+    else:
+        request["input"] = data_filename
+
+    with pytest.raises(RuntimeError, match="TypeError"):
+        client.request(request)
+    assert client.get_info(data_filename)["extent"] == list(build_image().GetExtent())
+    client.close()
+
+
+def test_unexpected_server_errors_reach_client(
+    tmp_path: str, server: RenderServer, monkeypatch: pytest.MonkeyPatch
+):
+    def get_info(_data_filename: str):
+        raise RuntimeError("unexpected")
+
+    client = RenderClient(server.server_address)
+    monkeypatch.setattr(server, "get_info", get_info)
+
+    with pytest.raises(RuntimeError, match="RuntimeError: unexpected"):
+        client.get_info(os.path.join(tmp_path, "data.vti"))
+    monkeypatch.undo()
+    assert client.get_info(os.path.join(tmp_path, "data.vti"))
+    client.close()
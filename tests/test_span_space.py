@@ -0,0 +1,124 @@
+import numpy as np
+from vtkmodules.util.numpy_support import numpy_to_vtk, vtk_to_numpy
+from vtkmodules.vtkCommonDataModel import vtkImageData
+from vtkmodules.vtkFiltersCore import vtkContourFilter
+from vtkmodules.vtkImagingCore import vtkRTAnalyticSource
+
+from src.span_space import (
+    SpanSpaceContourFilter,
+    build_span_space_index,
+    get_active_bricks,
+    get_active_extents,
+    get_image_scalars,
+)
+
+
+def build_source():
+    source = vtkRTAnalyticSource()
+    source.SetWholeExtent(-20, 20, -20, 20, -25, 25)
+    source.Update()
+    return source
+
+
+def build_sphere_image(size: int):
+    z, y, x = np.mgrid[:size, :size, :size] - (size - 1) / 2
+    image = vtkImageData()
+    image.SetDimensions(size, size, size)
+    image.GetPointData().SetScalars(
+        numpy_to_vtk(np.sqrt(x * x + y * y + z * z).ravel(), deep=True)
+    )
+    return image
+
+
+def test_index_covers_brick_points():
+    image = build_source().GetOutput()
+    index = build_span_space_index(image, 8)
+    scalars = get_image_scalars(image)
+
+    for k, j, i in [(0, 0, 0), (2, 3, 1), (6, 4, 4)]:
+        brick = scalars[k * 8 : k * 8 + 9, j * 8 : j * 8 + 9, i * 8 : i * 8 + 9]
+        assert index["mins"][k, j, i] == brick.min()
+        assert index["maxs"][k, j, i] == brick.max()
+
+
+def test_span_space_contour_matches_contour_filter():
+    source = build_source()
+    span_space_filter = SpanSpaceContourFilter(8)
+    span_space_filter.SetInputConnection(source.GetOutputPort())
+    contour_filter = vtkContourFilter()
+    contour_filter.SetInputConnection(source.GetOutputPort())
+
+    for value in (100, 200, 270):
+        span_space_filter.SetValue(0, value)
+        span_space_filter.Update()
+        contour_filter.SetValue(0, value)
+        contour_filter.Update()
+
+        assert (
+            span_space_filter.GetOutputDataObject(0).GetNumberOfCells()
+            == contour_filter.GetOutput().GetNumberOfCells()
+        )
+
+
+def test_parallel_contour_merges_seam_vertices():
+    source = build_source()
+    span_space_filter = SpanSpaceContourFilter(8, workers=4)
+    span_space_filter.SetInputConnection(source.GetOutputPort())
+    span_space_filter.SetValue(0, 200)
+    span_space_filter.Update()
+    contour_filter = vtkContourFilter()
+    contour_filter.SetInputConnection(source.GetOutputPort())
+    contour_filter.SetValue(0, 200)
+    contour_filter.Update()
+
+    output = span_space_filter.GetOutputDataObject(0)
+    assert output.GetNumberOfPoints() == contour_filter.GetOutput().GetNumberOfPoints()
+    assert output.GetNumberOfCells() == contour_filter.GetOutput().GetNumberOfCells()
+
+
+def test_active_extents_skip_shell_interior():
+    image = build_sphere_image(33)
+    index = build_span_space_index(image, 4)
+    value = 14.0
+
+    extents = get_active_extents(index, [value])
+
+    center = (16, 16, 16)
+    assert not any(
+        all(extent[2 * axis] < center[axis] < extent[2 * axis + 1] for axis in range(3))
+        for extent in extents
+    )
+    # Every active brick is covered.
+    active = get_active_bricks(index, [value])
+    for k, j, i in zip(*np.nonzero(active)):
+        assert any(
+            extent[0] <= i * 4 < extent[1]
+            and extent[2] <= j * 4 < extent[3]
+            and extent[4] == k * 4
+            for extent in extents
+        )
+
+
+def test_parallel_contour_keeps_point_arrays():
+    image = build_sphere_image(33)
+    extra = numpy_to_vtk(np.arange(33**3, dtype=np.float32), deep=True)
+    extra.SetName("extra")
+    image.GetPointData().AddArray(extra)
+    span_space_filter = SpanSpaceContourFilter(4, workers=4)
+    span_space_filter.SetInputDataObject(0, image)
+    span_space_filter.SetValue(0, 10.0)
+    span_space_filter.Update()
+    contour_filter = vtkContourFilter()
+    contour_filter.SetInputData(image)
+    contour_filter.SetValue(0, 10.0)
+    contour_filter.Update()
+
+    output = span_space_filter.GetOutputDataObject(0)
+    expected = contour_filter.GetOutput()
+    assert output.GetNumberOfCells() == expected.GetNumberOfCells()
+    assert output.GetPointData().GetArray("extra") is not None
+    np.testing.assert_allclose(
+        np.sort(vtk_to_numpy(output.GetPointData().GetArray("extra"))),
+        np.sort(vtk_to_numpy(expected.GetPointData().GetArray("extra"))),
+        rtol=1e-5,
+    )
@@ -0,0 +1,121 @@
+import os
+
+import numpy as np
+import pytest
+from vtkmodules.vtkFiltersCore import vtkContourFilter
+from vtkmodules.vtkImagingCore import vtkRTAnalyticSource
+from vtkmodules.vtkIOXML import vtkXMLImageDataReader
+
+from src.gradient import (
+    build_gradient_filter,
+    compute_gradient_magnitude,
+    get_contour_input,
+    get_gradient_cache_filename,
+    read_volumes,
+    write_streaming_gradient,
+    write_vti,
+)
+from src.read_vti import ImageDataProducer, StreamingVolumeReader, get_scalar_range
+from src.span_space import get_image_scalars
+from src.streaming import StreamingContourFilter, get_slab_extents
+
+
+def build_image():
+    source = vtkRTAnalyticSource()
+    source.SetWholeExtent(-10, 10, -10, 10, -12, 12)
+    source.Update()
+    return source.GetOutput()
+
+
+def write_image(directory: str):
+    data_filename = os.path.join(directory, "data.vti")
+    write_vti(build_image(), data_filename)
+    return data_filename
+
+
+def get_contour_cell_count(image_source, values: list[float]):
+    contour_filter = vtkContourFilter()
+    for i, value in enumerate(values):
+        contour_filter.SetValue(i, value)
+    contour_filter.SetInputConnection(image_source.GetOutputPort())
+    contour_filter.Update()
+    return contour_filter.GetOutput().GetNumberOfCells()
+
+
+def test_slabs_share_one_layer():
+    assert get_slab_extents((0, 9, 0, 9, -12, 12), 10) == [
+        (0, 9, 0, 9, -12, -2),
+        (0, 9, 0, 9, -2, 8),
+        (0, 9, 0, 9, 8, 12),
+    ]
+    assert get_slab_extents((0, 9, 0, 9, 0, 0), 10) == [(0, 9, 0, 9, 0, 0)]
+
+
+@pytest.mark.parametrize("slab_size", [1, 7, 100])
+def test_streaming_contour_reads_slabs_only(tmp_path: str, slab_size: int):
+    reader = vtkXMLImageDataReader()
+    reader.SetFileName(write_image(tmp_path))
+    read_extents = []
+    reader.AddObserver(
+        "EndEvent",
+        lambda caller, _: read_extents.append(caller.GetOutput().GetExtent()),
+    )
+    contour_filter = StreamingContourFilter(slab_size)
+    contour_filter.SetValue(0, 150)
+    contour_filter.SetValue(1, 200)
+    contour_filter.SetInputConnection(reader.GetOutputPort())
+    contour_filter.Update()
+
+    expected = get_contour_cell_count(ImageDataProducer(build_image()), [150, 200])
+    assert contour_filter.GetOutputDataObject(0).GetNumberOfCells() == expected
+    assert read_extents == get_slab_extents(build_image().GetExtent(), slab_size)
+
+
+def test_streaming_contour_crops_loaded_volumes():
+    producer = ImageDataProducer(build_image())
+    contour_filter = StreamingContourFilter(4)
+    contour_filter.SetValue(0, 150)
+    contour_filter.SetInputConnection(producer.GetOutputPort())
+    contour_filter.Update()
+
+    expected = get_contour_cell_count(producer, [150])
+    assert contour_filter.GetOutputDataObject(0).GetNumberOfCells() == expected
+
+
+def test_streamed_gradient_matches_loaded(tmp_path: str):
+    data_filename = write_image(tmp_path)
+    gradient_filename = get_gradient_cache_filename(data_filename)
+
+    assert write_streaming_gradient(data_filename, gradient_filename, 4)
+
+    reader = vtkXMLImageDataReader()
+    reader.SetFileName(gradient_filename)
+    reader.Update()
+    np.testing.assert_allclose(
+        get_image_scalars(reader.GetOutput()),
+        get_image_scalars(compute_gradient_magnitude(build_image())),
+        rtol=1e-6,
+    )
+
+
+def test_streamed_volumes_match_loaded(tmp_path: str):
+    data_filename = write_image(tmp_path)
+    isovalue_reader, gradient_reader = read_volumes(data_filename, None, None, 5)
+    assert isinstance(isovalue_reader, StreamingVolumeReader)
+    assert get_scalar_range(isovalue_reader) == build_image().GetScalarRange()
+
+    ranges = []
+    for readers in (
+        (isovalue_reader, gradient_reader),
+        read_volumes(data_filename, None),
+    ):
+        contour_input = get_contour_input(*readers, True)
+        contour_filter = StreamingContourFilter(5)
+        contour_filter.SetValue(0, 150)
+        contour_filter.SetInputConnection(contour_input.GetOutputPort())
+        gradient_filter = build_gradient_filter(readers[1], True)
+        gradient_filter.SetInputConnection(contour_filter.GetOutputPort())
+        gradient_filter.Update()
+        ranges.append(gradient_filter.GetOutput().GetScalarRange())
+
+    np.testing.assert_allclose(ranges[0], ranges[1], rtol=1e-6)
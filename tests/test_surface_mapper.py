@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+from vtkmodules.util.numpy_support import numpy_to_vtk, vtk_to_numpy
+from vtkmodules.vtkCommonCore import VTK_DOUBLE, VTK_FLOAT, VTK_ID_TYPE, vtkPoints
+from vtkmodules.vtkCommonDataModel import vtkCellArray, vtkPolyData
+from vtkmodules.vtkFiltersCore import vtkContourFilter
+from vtkmodules.vtkImagingCore import vtkRTAnalyticSource
+
+from src.multi_contour import IsovalueSplitFilter
+from src.surface_mapper import CompactSurfaceFilter
+
+
+def build_double_surface(values: list[float]):
+    """Contour the values and split them, leaving the points of all values
+    in double precision in the surface of each."""
+    source = vtkRTAnalyticSource()
+    source.SetWholeExtent(-10, 10, -10, 10, -10, 10)
+    contour_filter = vtkContourFilter()
+    for i, value in enumerate(values):
+        contour_filter.SetValue(i, value)
+    contour_filter.SetInputConnection(source.GetOutputPort())
+    contour_filter.Update()
+
+    surface = vtkPolyData()
+    surface.DeepCopy(contour_filter.GetOutput())
+    points = vtkPoints()
+    points.SetData(
+        numpy_to_vtk(vtk_to_numpy(surface.GetPoints().GetData()).astype(np.float64))
+    )
+    surface.SetPoints(points)
+    scalars = numpy_to_vtk(
+        vtk_to_numpy(surface.GetPointData().GetScalars()).astype(np.float64)
+    )
+    scalars.SetName("RTData")
+    surface.GetPointData().SetScalars(scalars)
+
+    split_filter = IsovalueSplitFilter(values)
+    split_filter.SetInputDataObject(0, surface)
+    split_filter.SetInputDataObject(1, surface)
+    return split_filter
+
+
+def get_triangle_points(surface):
+    points = vtk_to_numpy(surface.GetPoints().GetData())
+    connectivity = vtk_to_numpy(surface.GetPolys().GetConnectivityArray())
+    return points[connectivity]
+
+
+@pytest.mark.parametrize("color_by_scalars", [False, True])
+def test_compact_surface_keeps_triangles_only(color_by_scalars: bool):
+    split_filter = build_double_surface([100, 150])
+    compact_filter = CompactSurfaceFilter(color_by_scalars)
+    compact_filter.SetInputConnection(split_filter.GetOutputPort(1))
+    compact_filter.Update()
+
+    surface = split_filter.GetOutputDataObject(1)
+    compact = compact_filter.GetOutputDataObject(0)
+
+    assert surface.GetPoints().GetDataType() == VTK_DOUBLE
+    assert surface.GetPointData().GetScalars().GetDataType() == VTK_DOUBLE
+    assert compact.GetPoints().GetDataType() == VTK_FLOAT
+    assert not compact.GetPolys().IsStorage64Bit()
+    assert compact.GetNumberOfPolys() == surface.GetNumberOfPolys()
+    assert compact.GetNumberOfPoints() < surface.GetNumberOfPoints()
+    np.testing.assert_allclose(
+        get_triangle_points(compact), get_triangle_points(surface), rtol=1e-6
+    )
+
+    point_data = compact.GetPointData()
+    assert point_data.GetNormals().GetDataType() == VTK_FLOAT
+    if color_by_scalars:
+        assert point_data.GetNumberOfArrays() == 2
+        assert point_data.GetScalars().GetDataType() == VTK_FLOAT
+        assert np.all(vtk_to_numpy(point_data.GetScalars()) == 150)
+    else:
+        assert point_data.GetNumberOfArrays() == 1
+
+
+def build_contour_filter():
+    source = vtkRTAnalyticSource()
+    source.SetWholeExtent(-10, 10, -10, 10, -10, 10)
+    contour_filter = vtkContourFilter()
+    contour_filter.SetValue(0, 150)
+    contour_filter.SetInputConnection(source.GetOutputPort())
+    contour_filter.Update()
+    return contour_filter
+
+
+def test_compact_surface_passes_compact_surface_through():
+    contour_filter = build_contour_filter()
+    compact_filter = CompactSurfaceFilter()
+    compact_filter.SetInputConnection(contour_filter.GetOutputPort())
+    recompact_filter = CompactSurfaceFilter()
+    recompact_filter.SetInputConnection(compact_filter.GetOutputPort())
+    recompact_filter.Update()
+
+    compact = compact_filter.GetOutputDataObject(0)
+    recompact = recompact_filter.GetOutputDataObject(0)
+    assert recompact.GetPoints().GetData() is compact.GetPoints().GetData()
+    assert recompact.GetPolys() is compact.GetPolys()
+    assert recompact.GetPointData().GetScalars() is compact.GetPointData().GetScalars()
+
+
+def test_compact_surface_welds_duplicate_points():
+    contour_filter = build_contour_filter()
+    surface = contour_filter.GetOutput()
+    point_count = surface.GetNumberOfPoints()
+    # Give every other triangle its own copy of its points.
+    points = vtk_to_numpy(surface.GetPoints().GetData())
+    connectivity = vtk_to_numpy(surface.GetPolys().GetConnectivityArray()).copy()
+    connectivity.reshape(-1, 3)[::2] += point_count
+    duplicated = vtkPolyData()
+    duplicated_points = vtkPoints()
+    duplicated_points.SetData(numpy_to_vtk(np.concatenate([points, points])))
+    duplicated.SetPoints(duplicated_points)
+    polys = vtkCellArray()
+    polys.SetData(
+        numpy_to_vtk(
+            vtk_to_numpy(surface.GetPolys().GetOffsetsArray()),
+            deep=True,
+            array_type=VTK_ID_TYPE,
+        ),
+        numpy_to_vtk(connectivity, deep=True, array_type=VTK_ID_TYPE),
+    )
+    duplicated.SetPolys(polys)
+
+    compact_filter = CompactSurfaceFilter(False)
+    compact_filter.SetInputDataObject(duplicated)
+    compact_filter.Update()
+
+    compact = compact_filter.GetOutputDataObject(0)
+    assert compact.GetNumberOfPoints() == point_count
+    assert compact.GetNumberOfPolys() == surface.GetNumberOfPolys()
+    np.testing.assert_allclose(
+        get_triangle_points(compact), get_triangle_points(surface), rtol=1e-6
+    )
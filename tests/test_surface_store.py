@@ -0,0 +1,139 @@
+import os
+
+import numpy as np
+from vtkmodules.util.numpy_support import vtk_to_numpy
+from vtkmodules.vtkFiltersCore import vtkContourFilter
+from vtkmodules.vtkImagingCore import vtkRTAnalyticSource
+
+from src.contour import CONTOUR_CONFIG_DEFAULT, ContourConfig, get_surface_config
+from src.contour_cache import CachedContourFilter, ContourCache
+from src.surface_store import SURFACE_FILE_SUFFIX, SurfaceStore, get_image_digest
+
+
+def build_source():
+    source = vtkRTAnalyticSource()
+    source.SetWholeExtent(0, 15, 0, 15, 0, 15)
+    source.Update()
+    return source
+
+
+SURFACE_CONFIG = get_surface_config(CONTOUR_CONFIG_DEFAULT)
+
+
+def build_stored_contour_filter(
+    source: vtkRTAnalyticSource,
+    store: SurfaceStore,
+    executions: list[object],
+    config: ContourConfig = CONTOUR_CONFIG_DEFAULT,
+):
+    contour_filter = vtkContourFilter()
+    contour_filter.AddObserver("EndEvent", lambda *_: executions.append(None))
+    cached_contour_filter = CachedContourFilter(
+        contour_filter, ContourCache(0, store), config
+    )
+    cached_contour_filter.SetInputConnection(source.GetOutputPort())
+    return cached_contour_filter
+
+
+def test_stored_surface_skips_extraction(tmp_path: str):
+    source = build_source()
+    executions: list[object] = []
+    surfaces = []
+    # A new cache and store per launch, sharing the same directory.
+    for _ in range(2):
+        contour_filter = build_stored_contour_filter(
+            source, SurfaceStore(tmp_path), executions
+        )
+        contour_filter.SetValue(0, 150)
+        contour_filter.Update()
+        surfaces.append(contour_filter.GetOutputDataObject(0))
+
+    assert len(executions) == 1
+    extracted, loaded = surfaces[0], surfaces[1]
+    assert loaded.GetNumberOfPolys() == extracted.GetNumberOfPolys()
+    np.testing.assert_array_equal(
+        vtk_to_numpy(loaded.GetPoints().GetData()),
+        vtk_to_numpy(extracted.GetPoints().GetData()),
+    )
+    np.testing.assert_array_equal(
+        vtk_to_numpy(loaded.GetPolys().GetConnectivityArray()),
+        vtk_to_numpy(extracted.GetPolys().GetConnectivityArray()),
+    )
+    assert loaded.GetPointData().GetScalars().GetName() == "RTData"
+    np.testing.assert_array_equal(
+        vtk_to_numpy(loaded.GetPointData().GetArray("Normals")),
+        vtk_to_numpy(extracted.GetPointData().GetArray("Normals")),
+    )
+
+
+def test_surfaces_are_keyed_by_volume_content(tmp_path: str):
+    store = SurfaceStore(tmp_path)
+    image = build_source().GetOutput()
+    key = store.get_key(get_image_digest(image), (150.0,), SURFACE_CONFIG)
+
+    assert (
+        store.get_key(
+            get_image_digest(build_source().GetOutput()), (150.0,), SURFACE_CONFIG
+        )
+        == key
+    )
+    assert store.get_key(get_image_digest(image), (151.0,), SURFACE_CONFIG) != key
+    image.GetPointData().GetScalars().SetValue(0, 0.0)
+    image.Modified()
+    assert store.get_key(get_image_digest(image), (150.0,), SURFACE_CONFIG) != key
+
+
+def test_surfaces_are_keyed_by_contour_config(tmp_path: str):
+    source = build_source()
+    executions: list[object] = []
+    for config in (
+        CONTOUR_CONFIG_DEFAULT,
+        ContourConfig(**{**CONTOUR_CONFIG_DEFAULT, "vertex_gradient": True}),
+        ContourConfig(**{**CONTOUR_CONFIG_DEFAULT, "voi_clip": True}),
+        CONTOUR_CONFIG_DEFAULT,
+    ):
+        contour_filter = build_stored_contour_filter(
+            source, SurfaceStore(tmp_path), executions, config
+        )
+        contour_filter.SetValue(0, 150)
+        contour_filter.Update()
+
+    assert len(executions) == 3
+    assert len(os.listdir(tmp_path)) == 3
+
+
+def test_least_recently_used_surfaces_are_evicted(tmp_path: str):
+    source = build_source()
+    store = SurfaceStore(tmp_path)
+    executions: list[object] = []
+    contour_filter = build_stored_contour_filter(source, store, executions)
+    for value in (100, 150, 200):
+        contour_filter.SetValue(0, value)
+        contour_filter.Update()
+    filenames = sorted(
+        entry.path
+        for entry in os.scandir(tmp_path)
+        if entry.name.endswith(SURFACE_FILE_SUFFIX)
+    )
+    assert len(filenames) == 3
+
+    for i, filename in enumerate(
+        store.get_filename(
+            store.get_key(
+                get_image_digest(source.GetOutput()), (value,), SURFACE_CONFIG
+            )
+        )
+        for value in (100.0, 150.0, 200.0)
+    ):
+        os.utime(filename, (i, i))
+    store.size_budget = sum(os.path.getsize(filename) for filename in filenames) - 1
+    store.evict()
+
+    assert not os.path.exists(
+        store.get_filename(
+            store.get_key(
+                get_image_digest(source.GetOutput()), (100.0,), SURFACE_CONFIG
+            )
+        )
+    )
+    assert len(os.listdir(tmp_path)) == 2
@@ -0,0 +1,33 @@
+from vtkmodules.vtkRenderingCore import vtkRenderer
+
+from src.transparency import INTERACTIVE_OCCLUSION_RATIO, PeelBudget, get_peel_budget
+
+
+def test_peel_budget_converges_to_frame_time():
+    assert get_peel_budget(8, 50.0, 33.0, 8) == 4
+    assert get_peel_budget(1, 50.0, 33.0, 8) == 1
+    assert get_peel_budget(4, 20.0, 33.0, 8) == 4
+    assert get_peel_budget(4, 10.0, 33.0, 8) == 5
+    assert get_peel_budget(8, 10.0, 33.0, 8) == 8
+
+
+def test_peel_budget_only_adapts_while_interacting():
+    renderer = vtkRenderer()
+    budget = PeelBudget(renderer, 8, 33.0)
+
+    budget.record_frame(100.0)
+    assert renderer.GetMaximumNumberOfPeels() == 8
+
+    budget.set_interacting(True)
+    budget.record_frame(100.0)
+    budget.record_frame(100.0)
+    assert renderer.GetMaximumNumberOfPeels() == 2
+    assert renderer.GetOcclusionRatio() == INTERACTIVE_OCCLUSION_RATIO
+
+    budget.set_interacting(False)
+    assert renderer.GetMaximumNumberOfPeels() == 8
+    assert renderer.GetOcclusionRatio() == 0.0
+
+    # The next interaction starts from the budget reached by the last one.
+    budget.set_interacting(True)
+    assert renderer.GetMaximumNumberOfPeels() == 2